@@ -0,0 +1,174 @@
+"""
+Almacenamiento de archivos subidos (documentos, fotos, firmas y huellas).
+
+Cada archivo se guarda una sola vez, con su sha256 como nombre, en un árbol
+de directorios repartido por los primeros caracteres del hash
+(uploads/objetos/ab/cd/abcd...): el mismo escaneo subido dos veces ocupa un
+solo archivo y ningún directorio acumula miles de entradas. La tabla
+documentos registra cada subida y apunta al objeto.
+
+Las subidas no se arman en memoria: con SolicitudSubidas, Werkzeug escribe
+cada archivo del formulario multipart directamente en un temporal del
+almacén (ArchivoEntrante) que calcula el sha256 y detecta el tipo mientras
+llegan los bloques. Guardarlo es solo renombrar el temporal.
+"""
+import contextlib
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+
+from flask import Request
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Tipos aceptados, detectados por los primeros bytes y no por la extensión
+FIRMAS_ARCHIVO = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+]
+MIME_DOCUMENTO = {'application/pdf', 'image/png', 'image/jpeg'}
+MIME_IMAGEN = {'image/png', 'image/jpeg'}
+
+_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+def detectar_tipo(cabecera):
+    """Tipo MIME según los primeros bytes del archivo (None si no se reconoce)"""
+    for firma, tipo in FIRMAS_ARCHIVO:
+        if cabecera.startswith(firma):
+            return tipo
+    return None
+
+
+class ArchivoEntrante(io.FileIO):
+    """Temporal del almacén que calcula el sha256 a medida que se escribe
+
+    Si se cierra sin haberse guardado en el almacén (subida rechazada,
+    duplicada o error en la petición) el temporal se borra.
+    """
+
+    def __init__(self, directorio):
+        fd, self.ruta = tempfile.mkstemp(dir=directorio, prefix='subida_')
+        super().__init__(fd, 'r+')
+        self.sha256 = hashlib.sha256()
+        self.tamano = 0
+        self.cabecera = b''
+        self.guardado = False
+
+    def write(self, datos):
+        vista = memoryview(datos).cast('B')
+        while vista:
+            escritos = super().write(vista)
+            self.sha256.update(vista[:escritos])
+            if len(self.cabecera) < 16:
+                self.cabecera += bytes(vista[:16 - len(self.cabecera)])
+            self.tamano += escritos
+            vista = vista[escritos:]
+        return len(datos)
+
+    def close(self):
+        cerrado = self.closed
+        super().close()
+        if not cerrado and not self.guardado:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.ruta)
+
+
+class AlmacenArchivos:
+    """Archivos direccionados por contenido (sha256) bajo un directorio raíz"""
+
+    def __init__(self, raiz='uploads', niveles=2):
+        self.raiz = raiz
+        self.niveles = niveles
+        self.objetos = os.path.join(raiz, 'objetos')
+        # En el mismo sistema de archivos que los objetos: guardar es un rename
+        self.temporales = os.path.join(raiz, 'tmp')
+        os.makedirs(self.objetos, exist_ok=True)
+        os.makedirs(self.temporales, exist_ok=True)
+
+    def ruta_relativa(self, sha256):
+        """Ruta del objeto dentro del almacén, p. ej. 'ab/cd/abcd...'"""
+        if not _SHA256.match(sha256):
+            raise ValueError(f"Hash sha256 inválido: {sha256}")
+        return '/'.join([sha256[2 * i:2 * i + 2] for i in range(self.niveles)] + [sha256])
+
+    def ruta(self, relativa):
+        """Ruta absoluta de un objeto a partir de su ruta relativa (o de su hash)"""
+        sha256 = relativa.rsplit('/', 1)[-1]
+        return os.path.abspath(os.path.join(self.objetos, *self.ruta_relativa(sha256).split('/')))
+
+    def nuevo_temporal(self):
+        return ArchivoEntrante(self.temporales)
+
+    def _recibir(self, stream):
+        """Copiar un stream cualquiera a un temporal del almacén, por bloques"""
+        temporal = self.nuevo_temporal()
+        try:
+            for bloque in iter(lambda: stream.read(TAMANO_BLOQUE), b''):
+                temporal.write(bloque)
+        except BaseException:
+            temporal.close()
+            raise
+        return temporal
+
+    def guardar(self, archivo, tipos=MIME_DOCUMENTO):
+        """Guardar un archivo subido (FileStorage) o un stream binario
+
+        Devuelve {'sha256', 'ruta', 'tamano', 'tipo_mime', 'nuevo'}; 'nuevo'
+        es False si el contenido ya estaba en el almacén. Lanza ValueError si
+        el archivo está vacío o su tipo no está en `tipos`.
+        """
+        stream = getattr(archivo, 'stream', archivo)
+        propio = isinstance(stream, ArchivoEntrante) and not stream.closed \
+            and os.path.dirname(stream.ruta) == os.path.abspath(self.temporales)
+        temporal = stream if propio else self._recibir(stream)
+        try:
+            tipo = detectar_tipo(temporal.cabecera)
+            if not temporal.tamano:
+                raise ValueError("El archivo está vacío")
+            if tipo not in tipos:
+                raise ValueError("Tipo de archivo no permitido (se acepta " +
+                                 ', '.join(sorted(t.split('/')[1].upper() for t in tipos)) + ")")
+
+            sha256 = temporal.sha256.hexdigest()
+            relativa = self.ruta_relativa(sha256)
+            destino = self.ruta(relativa)
+            nuevo = not os.path.exists(destino)
+            if nuevo:
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                temporal.flush()
+                os.fsync(temporal.fileno())
+                os.chmod(temporal.ruta, 0o644)
+                # Dos subidas simultáneas del mismo contenido reemplazan bytes iguales
+                os.replace(temporal.ruta, destino)
+                temporal.guardado = True
+        finally:
+            if not propio:
+                temporal.close()
+        return {'sha256': sha256, 'ruta': relativa, 'tamano': temporal.tamano,
+                'tipo_mime': tipo, 'nuevo': nuevo}
+
+    def limpiar_temporales(self, antiguedad=3600):
+        """Borrar temporales abandonados (p. ej. de un worker que murió a mitad de una subida)"""
+        limite = time.time() - antiguedad
+        borrados = 0
+        for entrada in os.scandir(self.temporales):
+            with contextlib.suppress(FileNotFoundError):
+                if entrada.stat().st_mtime < limite:
+                    os.unlink(entrada.path)
+                    borrados += 1
+        return borrados
+
+
+def clase_solicitud(almacen):
+    """Request de Flask cuyos archivos multipart se escriben en el almacén"""
+
+    class SolicitudSubidas(Request):
+        def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+            return almacen.nuevo_temporal()
+
+    return SolicitudSubidas
@@ -1,9 +1,19 @@
+import atexit
+import io
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import (Flask, render_template, request, redirect, url_for, flash, session, jsonify,
+                   Response, stream_with_context, send_file, abort)
 from dotenv import load_dotenv
-from database import Database
+from database import DOMINIO_CORREO, Database
 from auth import Auth
+from almacenamiento import MIME_IMAGEN, AlmacenArchivos, clase_solicitud
+from derivados import VARIANTES, GeneradorDerivados
+from hashing import COSTO_POR_DEFECTO, ServicioHash
+from importacion import ImportadorFuncionarios, formato_por_nombre
+from exportacion import FORMATOS, exportar
+from metricas import Metricas, instrumentar
 from datetime import datetime, timedelta
+from urllib.parse import quote
 
 # Cargar variables de entorno
 load_dotenv()
@@ -15,10 +25,43 @@ app.secret_key = os.environ.get('SECRET_KEY') or 'clave_secreta_default'
 # Configuración
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+# Entrega de archivos por el servidor web: X-Sendfile (Apache, lighttpd) o
+# X-Accel-Redirect con el prefijo interno que apunta a uploads/objetos (nginx)
+app.config['USE_X_SENDFILE'] = os.environ.get('X_SENDFILE') == '1'
+app.config['X_ACCEL_REDIRECT'] = os.environ.get('X_ACCEL_REDIRECT', '')
+
+# Instrumentación (latencias, SQL por petición, consultas lentas); apagada por defecto
+metricas = Metricas(lenta_ms=float(os.environ.get('METRICAS_LENTA_MS', 100))) \
+    if os.environ.get('METRICAS') == '1' else None
+if metricas:
+    instrumentar(app, metricas, cabecera_debug=os.environ.get('METRICAS_DEBUG') == '1')
+
+# Pool de procesos de hash: antes que los hilos de la base (ver ServicioHash.iniciar)
+servicio_hash = ServicioHash(costo=int(os.environ.get('HASH_COSTO', COSTO_POR_DEFECTO)),
+                             procesos=int(os.environ.get('HASH_PROCESOS', 2)))
+servicio_hash.iniciar()
 
 # Inicializar base de datos y autenticación
-db = Database()
-auth = Auth(db)
+db = Database(pool_size=int(os.environ.get('DB_POOL_SIZE', 5)),
+              perfil=os.environ.get('DB_PERFIL', 'wal'),
+              fichas_compartidas=os.environ.get('FICHAS_CACHE_COMPARTIDA'),
+              metricas=metricas)
+auth = Auth(db, servicio_hash)
+
+# Archivos subidos: almacén direccionado por contenido, Werkzeug escribe
+# cada archivo del formulario directamente en él
+almacen = AlmacenArchivos(app.config['UPLOAD_FOLDER'])
+almacen.limpiar_temporales()
+app.request_class = clase_solicitud(almacen)
+
+# Miniaturas y variantes de impresión de foto, firma y huella (requiere Pillow)
+derivados = GeneradorDerivados(almacen, hilos=int(os.environ.get('DERIVADOS_HILOS', 2)))
+if not derivados.disponible:
+    print("⚠️ Pillow no instalado: las imágenes se sirven sin miniaturas")
+atexit.register(derivados.cerrar)
+
+# Escribir las escrituras diferidas pendientes al terminar el proceso
+atexit.register(db.cerrar)
 
 # Crear carpetas necesarias
 os.makedirs('instance', exist_ok=True)
@@ -32,9 +75,10 @@ os.makedirs('static/js', exist_ok=True)
 @app.route('/')
 def index():
     """Página principal"""
-    if 'user_id' in session:
+    identidad = auth.identidad()
+    if identidad.autenticado:
         # Redirigir al dashboard según rol
-        rol = session.get('rol')
+        rol = identidad.rol
         if rol == 'admin':
             return redirect(url_for('dashboard_admin'))
         elif rol == 'funcionario':
@@ -47,7 +91,7 @@ def index():
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Página de login"""
-    if 'user_id' in session:
+    if auth.identidad().autenticado:
         return redirect(url_for('index'))
     
     # Generar código de verificación si no existe en sesión
@@ -76,15 +120,16 @@ def login():
             if auth.verify_password(password, usuario['password_hash']):
                 # Verificar que el rol coincida
                 if usuario['rol'] == tipo_usuario:
+                    # Actualizar hashes antiguos (sha256 o costo menor) al formato actual
+                    if auth.necesita_rehash(usuario['password_hash']):
+                        db.actualizar_password_hash(usuario['id'], auth.hash_password(password))
+                    
                     # Iniciar sesión
-                    session['user_id'] = usuario['id']
-                    session['username'] = usuario['username']
-                    session['ci'] = usuario['ci']
-                    session['email'] = usuario['email']
-                    session['rol'] = usuario['rol']
+                    auth.iniciar_sesion(usuario)
                     
-                    # Actualizar último acceso
+                    # Actualizar último acceso (se escribe en diferido, en lote)
                     db.actualizar_ultimo_acceso(usuario['id'])
+                    db.registrar_evento(usuario['id'], 'login')
                     
                     flash(f'¡Bienvenido(a) {usuario["username"]}!', 'success')
                     
@@ -110,7 +155,10 @@ def login():
 @app.route('/logout')
 def logout():
     """Cerrar sesión"""
-    session.clear()
+    identidad = auth.identidad()
+    if identidad.autenticado:
+        db.registrar_evento(identidad.user_id, 'logout')
+    auth.cerrar_sesion()
     flash('Sesión cerrada exitosamente', 'info')
     return redirect(url_for('index'))
 
@@ -127,22 +175,117 @@ def generar_codigo():
 @auth.role_required(['admin'])
 def dashboard_admin():
     """Dashboard para administradores"""
-    # Obtener estadísticas
+    # Obtener estadísticas (conteos materializados, sin recorrer funcionarios)
     conteo_estados = db.contar_funcionarios_por_estado()
     total_funcionarios = sum(conteo_estados.values())
     
     return render_template('dashboard_admin.html',
                          total_funcionarios=total_funcionarios,
+                         conteo_estados=conteo_estados,
                          pendientes=conteo_estados['pendiente'],
-                         activos=conteo_estados['activo'])
+                         en_proceso=conteo_estados['en_proceso'],
+                         activos=conteo_estados['activo'],
+                         inactivos_baja=conteo_estados['inactivo'] + conteo_estados['baja'],
+                         por_unidad=db.get_estadisticas('unidad_organizacional'),
+                         por_administracion=db.get_estadisticas('administracion'))
 
 @app.route('/admin/funcionarios')
 @auth.login_required
 @auth.role_required(['admin'])
 def funcionarios_lista():
-    """Lista de funcionarios"""
-    funcionarios = db.get_all_funcionarios()
-    return render_template('funcionarios_lista.html', funcionarios=funcionarios)
+    """Lista de funcionarios (paginada en el servidor)"""
+    filtros = {
+        'estado': request.args.get('estado', ''),
+        'unidad': request.args.get('unidad', ''),
+        'cargo': request.args.get('cargo', ''),
+        'orden': request.args.get('orden', 'fecha_registro'),
+    }
+    tamano = min(max(request.args.get('tamano', 50, type=int), 10), 200)
+    busqueda = request.args.get('q', '').strip()
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
+    hay_mas = False
+    
+    if busqueda:
+        # Búsqueda de texto completo: resultados por relevancia, por páginas
+        funcionarios, hay_mas = db.buscar_funcionarios(
+            busqueda, pagina=pagina, tamano=tamano, **filtros)
+        siguiente = anterior = None
+    else:
+        funcionarios, siguiente, anterior = db.listar_funcionarios(
+            tamano=tamano,
+            despues=request.args.get('despues'),
+            antes=request.args.get('antes'),
+            **filtros)
+    progresos = db.calcular_progreso_funcionarios(f['id'] for f in funcionarios)
+    
+    return render_template('funcionarios_lista.html',
+                         funcionarios=funcionarios,
+                         progresos=progresos,
+                         filtros=filtros,
+                         tamano=tamano,
+                         busqueda=busqueda,
+                         pagina=pagina,
+                         hay_mas=hay_mas,
+                         siguiente=siguiente,
+                         anterior=anterior,
+                         unidades=db.get_valores_filtro('unidad_organizacional'),
+                         cargos=db.get_valores_filtro('cargo'))
+
+@app.route('/api/funcionarios/sugerencias')
+@auth.login_required
+@auth.role_required(['admin', 'jefe'])
+def funcionarios_sugerencias():
+    """Sugerencias JSON por prefijo de CI o apellido (autocompletado)
+
+    La url de la ficha (funcionario_ver) solo se incluye para administración;
+    los jefes reciben los datos de la sugerencia sin enlace.
+    """
+    limite = min(max(request.args.get('limite', 10, type=int), 1), 25)
+    es_admin = auth.identidad().rol == 'admin'
+    resultados = []
+    for fila in db.sugerir_funcionarios(request.args.get('q', ''), limite):
+        sugerencia = dict(fila, nombre=' '.join(filter(None, [
+            fila['primer_apellido'], fila['segundo_apellido'], fila['primer_nombre']])))
+        if es_admin:
+            sugerencia['url'] = url_for('funcionario_ver', ci=fila['ci'])
+        resultados.append(sugerencia)
+    
+    # El navegador reutiliza la respuesta del mismo prefijo mientras se escribe
+    respuesta = jsonify(resultados=resultados)
+    respuesta.cache_control.private = True
+    respuesta.cache_control.max_age = 30
+    respuesta.vary.add('Cookie')
+    return respuesta
+
+@app.route('/admin/funcionarios/exportar')
+@auth.login_required
+@auth.role_required(['admin'])
+def funcionarios_exportar():
+    """Descargar funcionarios en CSV o XLSX (se genera mientras se envía)"""
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATOS:
+        flash('Formato de exportación no soportado', 'danger')
+        return redirect(url_for('funcionarios_lista'))
+    
+    columnas = [c for c in request.args.get('columnas', '').split(',') if c] or None
+    filtros = {filtro: request.args.get(filtro, '') for filtro in ('estado', 'unidad', 'cargo')}
+    try:
+        filas = db.iterar_exportacion(columnas, **filtros)
+        encabezado = next(filas)  # Valida las columnas antes de empezar la respuesta
+    except ValueError as e:
+        flash(f'❌ {str(e)}', 'danger')
+        return redirect(url_for('funcionarios_lista'))
+    
+    def con_encabezado():
+        yield encabezado
+        yield from filas
+    
+    db.registrar_evento(auth.identidad().user_id, 'exportar_funcionarios', f"{formato} {filtros}")
+    nombre = f"funcionarios_{datetime.now().strftime('%Y%m%d_%H%M')}.{formato}"
+    return Response(stream_with_context(exportar(con_encabezado(), formato)),
+                    mimetype=FORMATOS[formato],
+                    headers={'Content-Disposition': f'attachment; filename="{nombre}"',
+                             'Cache-Control': 'no-store'})
 
 @app.route('/admin/funcionarios/nuevo', methods=['GET', 'POST'])
 @auth.login_required
@@ -181,48 +324,32 @@ def funcionario_nuevo():
                 'direccion_oficina': request.form.get('direccion_oficina'),
                 'piso_interno': request.form.get('piso_interno'),
                 
-                # Archivos (por ahora solo nombres)
-                'firma_path': '',  # Aquí irían las rutas si subimos archivos
-                'foto_path': '',
-                'huella_path': '',
             }
             
-            # Generar usuario y datos automáticos
-            primer_nombre = datos['primer_nombre'].lower()
-            primer_apellido = datos['primer_apellido'].lower()
-            username_base = f"{primer_nombre}.{primer_apellido}"
-            
-            # Verificar si el username ya existe
-            usuario_existente = db.get_usuario_by_username(username_base)
-            contador = 1
-            username_final = username_base
-            
-            while usuario_existente:
-                if datos.get('segundo_apellido'):
-                    inicial = datos['segundo_apellido'][0].lower()
-                    username_final = f"{username_base}.{inicial}"
-                else:
-                    username_final = f"{username_base}{contador}"
-                    contador += 1
-                usuario_existente = db.get_usuario_by_username(username_final)
+            # Firma, foto y huella: se guardan antes de crear el registro para
+            # rechazar archivos inválidos sin dejar un funcionario a medias
+            imagenes = {}
+            for campo in db.CAMPOS_IMAGEN:
+                archivo = request.files.get(campo)
+                if archivo and archivo.filename:
+                    try:
+                        imagenes[campo] = (archivo.filename, almacen.guardar(archivo, tipos=MIME_IMAGEN))
+                    except ValueError as e:
+                        raise ValueError(f"{campo.capitalize()}: {e}")
             
-            # Agregar datos generados al diccionario
-            datos['usuario_aplicacion'] = username_final
+            # Generar usuario y datos automáticos
             datos['clave_generada'] = datos['ci']  # Contraseña inicial = CI
-            datos['correo_interno'] = f"{username_final}@gobierno.talento.bo"
-            
-            # Crear funcionario
-            funcionario_id = db.crear_funcionario(datos)
-            
-            # Crear usuario para el funcionario
             password_hash = auth.hash_password(datos['ci'])
-            user_id = db.crear_usuario(
-                ci=datos['ci'],
-                username=username_final,
-                email=datos['correo_interno'],
-                password_hash=password_hash,
-                rol='funcionario'
-            )
+            
+            # Crear funcionario y su usuario (el username libre se elige
+            # con una sola consulta por prefijo)
+            funcionario_id, username_final = db.crear_funcionario_con_usuario(
+                datos, password_hash, rol='funcionario')
+            datos['correo_interno'] = f"{username_final}@{DOMINIO_CORREO}"
+            for campo, (nombre, guardado) in imagenes.items():
+                db.registrar_documento(funcionario_id, campo, nombre, guardado)
+                derivados.programar(guardado['sha256'], guardado['tipo_mime'])
+            db.registrar_evento(auth.identidad().user_id, 'crear_funcionario', datos['ci'])
             
             flash(f'✅ Funcionario registrado exitosamente!', 'success')
             flash(f'📋 Usuario: {username_final}', 'info')
@@ -236,6 +363,35 @@ def funcionario_nuevo():
     
     return render_template('funcionario_nuevo.html')
 
+@app.route('/admin/funcionarios/importar', methods=['GET', 'POST'])
+@auth.login_required
+@auth.role_required(['admin'])
+def funcionarios_importar():
+    """Migración de datos: importar funcionarios desde CSV o JSON lines"""
+    resumen = None
+    
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if not archivo or not archivo.filename:
+            flash('Seleccione un archivo CSV o JSON lines', 'warning')
+            return redirect(url_for('funcionarios_importar'))
+        
+        try:
+            # Leer el archivo como stream de texto, sin cargarlo completo
+            texto = io.TextIOWrapper(archivo.stream, encoding='utf-8-sig', newline='')
+            importador = ImportadorFuncionarios(db, auth.servicio_hash)
+            resumen = importador.importar(texto, formato_por_nombre(archivo.filename))
+            db.registrar_evento(auth.identidad().user_id, 'importar_funcionarios',
+                                f"{archivo.filename}: {resumen['importados']} de {resumen['procesados']}")
+            
+            flash(f'✅ {resumen["importados"]} de {resumen["procesados"]} funcionarios importados', 'success')
+            if resumen['rechazados']:
+                flash(f'⚠️ {len(resumen["rechazados"])} registros rechazados', 'warning')
+        except Exception as e:
+            flash(f'❌ Error al importar: {str(e)}', 'danger')
+    
+    return render_template('funcionarios_importar.html', resumen=resumen)
+
 # ==================== RUTAS DE FUNCIONARIO ====================
 
 # ==================== RUTAS PARA GESTIÓN DE FUNCIONARIOS ====================
@@ -250,7 +406,9 @@ def funcionario_ver(ci):
         flash('Funcionario no encontrado', 'danger')
         return redirect(url_for('funcionarios_lista'))
     
-    return render_template('funcionario_ver.html', funcionario=funcionario)
+    documentos = db.get_documentos(funcionario['id'])
+    return render_template('funcionario_ver.html', funcionario=funcionario, documentos=documentos,
+                           tipos_documento=TIPOS_DOCUMENTO)
 
 @app.route('/admin/funcionarios/editar/<ci>', methods=['GET', 'POST'])
 @auth.login_required
@@ -264,41 +422,9 @@ def funcionario_editar(ci):
     
     if request.method == 'POST':
         try:
-            # Actualizar los datos (simplificado por ahora)
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            
-            # Datos actualizables (excluyendo CI y campos generados)
-            campos_actualizables = [
-                'primer_apellido', 'segundo_apellido', 'tercer_apellido',
-                'primer_nombre', 'segundo_nombre', 'tercer_nombre',
-                'tipo_identificacion', 'nro_resolucion', 'fecha_resolucion',
-                'fecha_posesion', 'nro_memorandum_designacion', 'fecha_memorandum',
-                'nro_item', 'administracion', 'jerarquia', 'depende_de',
-                'unidad_organizacional', 'cargo', 'puesto', 'direccion_oficina',
-                'piso_interno', 'estado'
-            ]
-            
-            # Construir query de actualización
-            set_clause = []
-            valores = []
-            
-            for campo in campos_actualizables:
-                valor = request.form.get(campo)
-                if valor is not None:
-                    set_clause.append(f"{campo} = ?")
-                    valores.append(valor)
-            
-            # Agregar fecha de actualización
-            set_clause.append("fecha_actualizacion = CURRENT_TIMESTAMP")
-            
-            # Agregar CI al final para WHERE
-            valores.append(ci)
-            
-            query = f"UPDATE funcionarios SET {', '.join(set_clause)} WHERE ci = ?"
-            cursor.execute(query, valores)
-            conn.commit()
-            conn.close()
+            # Actualizar los datos (excluyendo CI y campos generados)
+            db.actualizar_funcionario(ci, request.form)
+            db.registrar_evento(auth.identidad().user_id, 'editar_funcionario', ci)
             
             flash('✅ Funcionario actualizado correctamente', 'success')
             return redirect(url_for('funcionario_ver', ci=ci))
@@ -328,26 +454,10 @@ def funcionario_baja(ci):
             nro_memorandum = request.form.get('nro_memorandum_retiro')
             fecha_retiro = request.form.get('fecha_retiro')
             
-            # Actualizar estado del funcionario
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            UPDATE funcionarios 
-            SET estado = 'baja', 
-                fecha_actualizacion = CURRENT_TIMESTAMP
-            WHERE ci = ?
-            ''', (ci,))
-            
-            # También desactivar usuario asociado
-            cursor.execute('''
-            UPDATE usuarios 
-            SET activo = 0 
-            WHERE ci = ?
-            ''', (ci,))
-            
-            conn.commit()
-            conn.close()
+            # Actualizar estado del funcionario y desactivar usuario asociado
+            db.dar_baja_funcionario(ci)
+            db.registrar_evento(auth.identidad().user_id, 'baja_funcionario',
+                                f"{ci} | {motivo or ''} | {nro_memorandum or ''} | {fecha_retiro or ''}")
             
             flash(f'✅ Funcionario {funcionario["primer_nombre"]} {funcionario["primer_apellido"]} dado de baja', 'success')
             return redirect(url_for('funcionarios_lista'))
@@ -363,25 +473,9 @@ def funcionario_baja(ci):
 def funcionario_activar(ci):
     """Reactivar un funcionario dado de baja"""
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        UPDATE funcionarios 
-        SET estado = 'activo', 
-            fecha_actualizacion = CURRENT_TIMESTAMP
-        WHERE ci = ?
-        ''', (ci,))
-        
-        # Reactivar usuario asociado
-        cursor.execute('''
-        UPDATE usuarios 
-        SET activo = 1 
-        WHERE ci = ?
-        ''', (ci,))
-        
-        conn.commit()
-        conn.close()
+        # Reactivar funcionario y usuario asociado
+        db.activar_funcionario(ci)
+        db.registrar_evento(auth.identidad().user_id, 'activar_funcionario', ci)
         
         flash('✅ Funcionario reactivado correctamente', 'success')
         
@@ -397,7 +491,7 @@ def funcionario_activar(ci):
 @auth.role_required(['funcionario'])
 def funcionario_completar_ficha():
     """Página principal para completar la ficha TALENTO"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
+    funcionario = auth.identidad().funcionario
     
     # Calcular progreso (simulado por ahora)
     progreso = 25
@@ -418,43 +512,20 @@ def funcionario_completar_ficha():
 @auth.role_required(['funcionario'])
 def funcionario_datos_personales():
     """Funcionario completa sus datos personales (Actividad 5)"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
+    funcionario = auth.identidad().funcionario
     
     if not funcionario:
         flash('Funcionario no encontrado', 'danger')
         return redirect(url_for('dashboard_funcionario'))
     
-    # Obtener parámetros para los dropdowns
-    parametros = {
-        'genero': db.get_parametros('genero'),
-        'departamentos': db.get_parametros('departamentos'),
-        'paises': db.get_parametros('paises'),
-        'estado_civil': db.get_parametros('estado_civil'),
-        'tipo_sangre': db.get_parametros('tipo_sangre'),
-        'gestora': db.get_parametros('gestora'),
-        'parentesco': db.get_parametros('parentesco'),
-        'nacionalidad': db.get_parametros('nacionalidad')
-    }
+    # Obtener parámetros para los dropdowns (caché de catálogos)
+    parametros = db.get_all_parametros()
     
     # Obtener datos adicionales existentes
     datos_adicionales = db.get_datos_adicionales(funcionario['id'])
     
-    # Obtener parientes existentes
-    parientes = db.get_parientes(funcionario['id'])
-    
-    # Enriquecer parientes con nombres de parámetros
-    for pariente in parientes:
-        # Buscar nombre del parentesco
-        for parent in parametros['parentesco']:
-            if parent['codigo'] == pariente['parentesco']:
-                pariente['parentesco_nombre'] = parent['nombre']
-                break
-        
-        # Buscar nombre de nacionalidad
-        for nac in parametros['nacionalidad']:
-            if nac['codigo'] == pariente['nacionalidad']:
-                pariente['nacionalidad_nombre'] = nac['nombre']
-                break
+    # Obtener parientes existentes con nombres de parámetros
+    parientes = db.enriquecer_codigos(db.get_parientes(funcionario['id']), 'parientes')
     
     if request.method == 'POST':
         try:
@@ -509,8 +580,9 @@ def funcionario_datos_personales():
                                      hoy=datetime.now().strftime('%Y-%m-%d'),
                                      fecha_max_nacimiento=(datetime.now() - timedelta(days=365*18)).strftime('%Y-%m-%d'))
             
-            # Guardar datos adicionales
-            db.guardar_datos_adicionales(funcionario['id'], datos)
+            # Todos los cambios del formulario se aplican en una sola transacción
+            cambios = db.unidad_de_trabajo(funcionario['id'])
+            cambios.guardar_datos_adicionales(datos)
             
             # 2. Procesar parientes nuevos
             parientes_nuevos = []
@@ -533,21 +605,18 @@ def funcionario_datos_personales():
             
             # Guardar parientes nuevos
             for pariente in parientes_nuevos:
-                db.guardar_pariente(funcionario['id'], pariente)
+                cambios.insertar('parientes', pariente)
             
             # 3. Procesar parientes a eliminar
             parientes_eliminar = request.form.getlist('parientes_eliminar[]')
             for pariente_id in parientes_eliminar:
-                db.eliminar_pariente(pariente_id)
-            
-            flash('✅ Datos personales guardados correctamente', 'success')
+                cambios.eliminar('parientes', pariente_id)
             
             # Actualizar estado del funcionario si es la primera vez
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE funcionarios SET estado = 'en_proceso' WHERE id = ?", (funcionario['id'],))
-            conn.commit()
-            conn.close()
+            cambios.actualizar_estado('en_proceso')
+            cambios.aplicar()
+            
+            flash('✅ Datos personales guardados correctamente', 'success')
             
             return redirect(url_for('funcionario_completar_ficha'))
             
@@ -571,17 +640,14 @@ def funcionario_datos_personales():
 @auth.role_required(['funcionario'])
 def funcionario_formacion_academica():
     """Funcionario completa formación académica (Actividad 6)"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
+    funcionario = auth.identidad().funcionario
     
     if not funcionario:
         flash('Funcionario no encontrado', 'danger')
         return redirect(url_for('dashboard_funcionario'))
     
-    # Obtener parámetros para dropdowns
-    parametros = {
-        'paises': db.get_parametros('paises'),
-        'departamentos': db.get_parametros('departamentos')
-    }
+    # Obtener parámetros para dropdowns (caché de catálogos)
+    parametros = db.get_all_parametros()
     
     # Obtener datos existentes
     formacion_data = db.get_formacion_academica(funcionario['id'])
@@ -596,8 +662,11 @@ def funcionario_formacion_academica():
                 'ultimo_curso_vencido': request.form.get('ultimo_curso_vencido')
             }
             
+            # Todos los cambios del formulario se aplican en una sola transacción
+            cambios = db.unidad_de_trabajo(funcionario['id'])
+            
             if bachillerato['es_bachiller']:
-                db.guardar_bachillerato(funcionario['id'], bachillerato)
+                cambios.guardar_bachillerato(bachillerato)
             
             # 2. Procesar estudios superiores nuevos
             i = 0
@@ -619,7 +688,7 @@ def funcionario_formacion_academica():
                     'nro_titulo_academico': request.form.get(f'estudios_nuevos[{i}][nro_titulo_academico]'),
                     'fecha_emision_titulo': request.form.get(f'estudios_nuevos[{i}][fecha_emision_titulo]')
                 }
-                db.guardar_estudio_superior(funcionario['id'], estudio)
+                cambios.insertar('formacion_academica', estudio)
                 i += 1
             
             # 3. Procesar cursos nuevos
@@ -640,7 +709,7 @@ def funcionario_formacion_academica():
                     'depto_estudio': request.form.get(f'cursos_nuevos[{j}][depto_estudio]'),
                     'capacitacion': request.form.get(f'cursos_nuevos[{j}][capacitacion]')
                 }
-                db.guardar_curso(funcionario['id'], curso)
+                cambios.insertar('cursos', curso)
                 j += 1
             
             # 4. Procesar idiomas nuevos
@@ -652,39 +721,25 @@ def funcionario_formacion_academica():
                     'escribe': request.form.get(f'idiomas_nuevos[{k}][escribe]'),
                     'lee': request.form.get(f'idiomas_nuevos[{k}][lee]')
                 }
-                db.guardar_idioma(funcionario['id'], idioma)
+                cambios.insertar('idiomas', idioma)
                 k += 1
             
             # 5. Procesar elementos a eliminar
             estudios_eliminar = request.form.getlist('estudios_eliminar[]')
             for estudio_id in estudios_eliminar:
-                db.eliminar_estudio_superior(estudio_id)
+                cambios.eliminar('formacion_academica', estudio_id)
             
             cursos_eliminar = request.form.getlist('cursos_eliminar[]')
             for curso_id in cursos_eliminar:
-                db.eliminar_curso(curso_id)
+                cambios.eliminar('cursos', curso_id)
             
             idiomas_eliminar = request.form.getlist('idiomas_eliminar[]')
             for idioma_id in idiomas_eliminar:
-                db.eliminar_idioma(idioma_id)
-            
-            # 6. Actualizar progreso en la ficha
-            conn = db.get_connection()
-            cursor = conn.cursor()
+                cambios.eliminar('idiomas', idioma_id)
             
-            # Verificar si tiene datos en formación académica
-            cursor.execute("SELECT COUNT(*) FROM formacion_academica WHERE funcionario_id = ?", (funcionario['id'],))
-            tiene_formacion = cursor.fetchone()[0] > 0
-            
-            cursor.execute("SELECT COUNT(*) FROM bachillerato WHERE funcionario_id = ?", (funcionario['id'],))
-            tiene_bachillerato = cursor.fetchone()[0] > 0
-            
-            if tiene_formacion or tiene_bachillerato:
-                # Marcar como completada la sección de formación
-                # Esto actualizará el progreso automáticamente
-                pass
-            
-            conn.close()
+            # 6. Escribir todo junto; el progreso de la sección se calcula
+            # en el dashboard (calcular_progreso_funcionario)
+            cambios.aplicar()
             
             flash('✅ Formación académica guardada correctamente', 'success')
             return redirect(url_for('funcionario_completar_ficha'))
@@ -705,7 +760,7 @@ def funcionario_formacion_academica():
 @auth.role_required(['funcionario'])
 def funcionario_seguro_social():
     """Funcionario completa seguro social (Actividad 7)"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
+    funcionario = auth.identidad().funcionario
     
     if request.method == 'POST':
         flash('Seguro social guardado correctamente', 'success')
@@ -718,7 +773,7 @@ def funcionario_seguro_social():
 @auth.role_required(['funcionario'])
 def funcionario_experiencia_laboral():
     """Funcionario completa experiencia laboral (Actividad 8)"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
+    funcionario = auth.identidad().funcionario
     
     if request.method == 'POST':
         flash('Experiencia laboral guardada correctamente', 'success')
@@ -726,36 +781,169 @@ def funcionario_experiencia_laboral():
     
     return render_template('funcionario/experiencia_laboral.html', funcionario=funcionario)
 
-@app.route('/funcionario/documentos')
+# Documentos de soporte que sube el funcionario (foto, firma y huella se suben en el registro)
+TIPOS_DOCUMENTO = {
+    'ci': 'Cédula de identidad',
+    'titulo_academico': 'Título académico',
+    'certificado_curso': 'Certificado de curso',
+    'libreta_militar': 'Libreta de servicio militar',
+    'certificado_trabajo': 'Certificado de trabajo',
+    'otro': 'Otro',
+}
+
+@app.route('/funcionario/documentos', methods=['GET', 'POST'])
 @auth.login_required
 @auth.role_required(['funcionario'])
 def funcionario_documentos():
     """Funcionario sube documentos de soporte"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
-    return render_template('funcionario/documentos.html', funcionario=funcionario)
+    funcionario = auth.identidad().funcionario
+    if not funcionario:
+        flash('Funcionario no encontrado', 'danger')
+        return redirect(url_for('dashboard_funcionario'))
+    
+    if request.method == 'POST':
+        tipo_documento = request.form.get('tipo_documento')
+        archivo = request.files.get('archivo')
+        if tipo_documento not in TIPOS_DOCUMENTO:
+            flash('Seleccione el tipo de documento', 'warning')
+        elif not archivo or not archivo.filename:
+            flash('Seleccione un archivo PDF o imagen', 'warning')
+        else:
+            try:
+                guardado = almacen.guardar(archivo)
+                db.registrar_documento(funcionario['id'], tipo_documento, archivo.filename, guardado)
+                db.registrar_evento(auth.identidad().user_id, 'subir_documento',
+                                    f"{tipo_documento} {guardado['sha256'][:12]}")
+                flash('✅ Documento subido correctamente', 'success')
+                return redirect(url_for('funcionario_documentos'))
+            except ValueError as e:
+                flash(f'❌ {str(e)}', 'danger')
+    
+    documentos = db.get_documentos(funcionario['id'])
+    return render_template('funcionario/documentos.html', funcionario=funcionario, documentos=documentos,
+                           tipos_documento=TIPOS_DOCUMENTO)
+
+@app.route('/documentos/<int:documento_id>')
+@auth.login_required
+def documento_descargar(documento_id):
+    """Entregar un documento subido (admin y jefe: todos; funcionario: los suyos)"""
+    documento = db.get_documento(documento_id)
+    if not documento or not documento['sha256']:
+        abort(404)
+    identidad = auth.identidad()
+    if identidad.rol not in ('admin', 'jefe'):
+        funcionario = identidad.funcionario
+        if not funcionario or funcionario['id'] != documento['funcionario_id']:
+            abort(403)
+    
+    descarga = request.args.get('descargar') == '1'
+    if app.config['X_ACCEL_REDIRECT']:
+        # nginx lee el archivo y atiende Range/If-None-Match por su cuenta
+        disposicion = 'attachment' if descarga else 'inline'
+        return Response(headers={
+            'X-Accel-Redirect': f"{app.config['X_ACCEL_REDIRECT'].rstrip('/')}/{documento['ruta_archivo']}",
+            'Content-Type': documento['tipo_mime'],
+            'Content-Disposition': f"{disposicion}; filename*=UTF-8''{quote(documento['nombre_archivo'])}",
+            'Cache-Control': 'private, max-age=3600',
+        })
+    
+    # Condicional (ETag = sha256, 304) y con soporte de Range; sin X-Sendfile el
+    # servidor WSGI usa wsgi.file_wrapper (sendfile en gunicorn)
+    respuesta = send_file(almacen.ruta(documento['ruta_archivo']), mimetype=documento['tipo_mime'],
+                          as_attachment=descarga, download_name=documento['nombre_archivo'],
+                          conditional=True, etag=documento['sha256'], max_age=3600)
+    respuesta.cache_control.public = False
+    respuesta.cache_control.private = True
+    return respuesta
+
+@app.route('/imagenes/<sha256>/<variante>')
+@auth.login_required
+def imagen_derivada(sha256, variante):
+    """Miniatura o variante de impresión de una foto, firma o huella
+
+    La URL lleva el sha256 del original: su contenido no cambia nunca, así
+    que el navegador la guarda como inmutable y no vuelve a pedirla.
+    """
+    if variante not in VARIANTES:
+        abort(404)
+    identidad = auth.identidad()
+    funcionario_id = None
+    if identidad.rol not in ('admin', 'jefe'):
+        funcionario = identidad.funcionario
+        if not funcionario:
+            abort(403)
+        funcionario_id = funcionario['id']
+    tipo_mime = db.get_tipo_imagen(sha256, funcionario_id)
+    if not tipo_mime:
+        abort(404)
+    
+    ruta = derivados.obtener(sha256, variante, tipo_mime)
+    if ruta:
+        respuesta = send_file(ruta, mimetype=tipo_mime, conditional=True,
+                              etag=f'{sha256[:16]}-{variante}', max_age=365 * 24 * 3600)
+        respuesta.cache_control.immutable = True
+    else:
+        # Sin derivado (sin Pillow, imagen ilegible o generación demorada) se
+        # entrega el original, que no debe quedar guardado bajo esta URL
+        respuesta = send_file(almacen.ruta(sha256), mimetype=tipo_mime, conditional=True,
+                              etag=sha256, max_age=0)
+        respuesta.cache_control.no_cache = True
+    respuesta.cache_control.public = False
+    respuesta.cache_control.private = True
+    return respuesta
+
+@app.template_global()
+def url_imagen(ruta, variante='miniatura'):
+    """URL del derivado de una imagen del registro (foto_path, firma_path o huella_path)"""
+    if not ruta:
+        return None
+    return url_for('imagen_derivada', sha256=ruta.rsplit('/', 1)[-1], variante=variante)
 
 @app.route('/funcionario/revisar-formulario')
 @auth.login_required
 @auth.role_required(['funcionario'])
 def funcionario_revisar_formulario():
     """Funcionario revisa formulario completo (Actividad 9)"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
-    return render_template('funcionario/revisar_formulario.html', funcionario=funcionario)
+    funcionario = auth.identidad().funcionario
+    
+    if not funcionario:
+        flash('Funcionario no encontrado', 'danger')
+        return redirect(url_for('dashboard_funcionario'))
+    
+    # Ficha completa en una sola consulta, con nombres de catálogo
+    ficha = db.get_ficha_completa(funcionario['id'])
+    if ficha is None:
+        flash('Funcionario no encontrado', 'danger')
+        return redirect(url_for('dashboard_funcionario'))
+    ficha = db.enriquecer_ficha(ficha)
+    return render_template('funcionario/revisar_formulario.html', **ficha)
 
 @app.route('/funcionario/imprimir-formulario')
 @auth.login_required
 @auth.role_required(['funcionario'])
 def funcionario_imprimir_formulario():
     """Funcionario imprime formulario (Actividad 10)"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
-    return render_template('funcionario/imprimir_formulario.html', funcionario=funcionario)
+    funcionario = auth.identidad().funcionario
+    
+    if not funcionario:
+        flash('Funcionario no encontrado', 'danger')
+        return redirect(url_for('dashboard_funcionario'))
+    
+    # El R-100 impreso muestra nombres, no códigos de catálogo; toda la
+    # ficha llega en una sola consulta
+    ficha = db.get_ficha_completa(funcionario['id'])
+    if ficha is None:
+        flash('Funcionario no encontrado', 'danger')
+        return redirect(url_for('dashboard_funcionario'))
+    ficha = db.enriquecer_ficha(ficha)
+    return render_template('funcionario/imprimir_formulario.html', **ficha)
 
 @app.route('/funcionario/ver-tramite')
 @auth.login_required
 @auth.role_required(['funcionario'])
 def funcionario_tramite():
     """Funcionario ve número de trámite (Actividad 11)"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
+    funcionario = auth.identidad().funcionario
     
     # Generar número de trámite ficticio
     import random
@@ -771,7 +959,7 @@ def funcionario_tramite():
 @auth.role_required(['funcionario'])
 def dashboard_funcionario():
     """Dashboard para funcionarios"""
-    funcionario = db.get_funcionario_by_ci(session.get('ci', ''))
+    funcionario = auth.identidad().funcionario
     
     if not funcionario:
         flash('Funcionario no encontrado', 'danger')
@@ -785,6 +973,25 @@ def dashboard_funcionario():
                          progreso=progreso,
                          secciones=secciones)
 
+# ==================== MÉTRICAS ====================
+
+@app.route('/metrics')
+def metrics():
+    """Métricas en formato Prometheus (solo con METRICAS=1)"""
+    if not metricas:
+        return 'Métricas desactivadas', 404
+    token = os.environ.get('METRICAS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return 'No autorizado', 401
+    return Response(metricas.exponer(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/metricas/consultas-lentas')
+@auth.login_required
+@auth.role_required(['admin'])
+def metricas_consultas_lentas():
+    """Últimas consultas lentas con su plan de ejecución (JSON)"""
+    return jsonify(consultas=metricas.consultas_lentas() if metricas else [])
+
 # ==================== RUTAS DE JEFE ====================
 
 @app.route('/jefe/dashboard')
@@ -796,8 +1003,27 @@ def dashboard_jefe():
 
 # ==================== EJECUCIÓN ====================
 
+def crear_app():
+    """Aplicación para el servidor WSGI de producción (ver wsgi.py y gunicorn.conf.py)"""
+    app.debug = False
+    if not os.environ.get('SECRET_KEY'):
+        print("⚠️ SECRET_KEY no configurada: las sesiones usan la clave por defecto")
+    return app
+
+def preparar_fork():
+    """En el proceso maestro (preload), antes de crear los workers"""
+    db.preparar_fork()
+    auth.servicio_hash.cerrar()  # Cada worker crea el suyo
+
+def reiniciar_tras_fork():
+    """En cada worker recién creado: pool de hash, conexiones e hilos propios"""
+    auth.servicio_hash.reiniciar_tras_fork()  # Antes de arrancar hilos
+    db.reiniciar_tras_fork()
+    derivados.reiniciar_tras_fork()
+
 if __name__ == '__main__':
+    # Servidor de desarrollo (un proceso); en producción: gunicorn -c gunicorn.conf.py wsgi:app
     print("🚀 Iniciando Sistema Talento Humano...")
     print("🌐 Accede en: http://localhost:5000")
     print("👤 Usuario admin: admin / admin123")
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', port=5000)
\ No newline at end of file
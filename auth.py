@@ -1,27 +1,99 @@
-import hashlib
 import secrets
 from datetime import datetime
-from functools import wraps
-from flask import session, redirect, url_for, flash
+from functools import cached_property, wraps
+from flask import g, session, redirect, url_for, flash
+
+from hashing import ServicioHash
+
+class Identidad:
+    """Usuario de la petición actual (se construye una vez desde la sesión)
+
+    Los datos básicos vienen de la cookie de sesión; las filas de usuarios
+    y funcionarios se consultan solo si una ruta las pide y se reutilizan
+    durante el resto de la petición.
+    """
+
+    def __init__(self, db, user_id=None, rol=None, ci=None):
+        self.db = db
+        self.user_id = user_id
+        self.rol = rol
+        self.ci = ci
+
+    @property
+    def autenticado(self):
+        return self.user_id is not None
+
+    @cached_property
+    def usuario(self):
+        """Fila de usuarios del usuario actual (o None)"""
+        if not self.autenticado:
+            return None
+        return self.db.get_usuario_by_id(self.user_id)
+
+    @cached_property
+    def funcionario(self):
+        """Fila de funcionarios asociada al CI de la sesión (o None)"""
+        if not self.ci:
+            return None
+        return self.db.get_funcionario_by_ci(self.ci)
+
+    def invalidar(self):
+        """Descartar las filas memorizadas (después de modificarlas)"""
+        self.__dict__.pop('usuario', None)
+        self.__dict__.pop('funcionario', None)
+
 
 class Auth:
-    def __init__(self, db):
+    def __init__(self, db, servicio_hash=None):
         self.db = db
+        self.servicio_hash = servicio_hash or ServicioHash()
     
     def hash_password(self, password):
-        """Hash simple de contraseña (para desarrollo)"""
-        salt = "talento_humano_2025"
-        return hashlib.sha256((password + salt).encode()).hexdigest()
+        """Hash de contraseña (scrypt con sal propia, en el pool de procesos)"""
+        return self.servicio_hash.hash(password)
+    
+    def hash_passwords(self, passwords):
+        """Hash de varias contraseñas en paralelo (alta de cuentas en bloque)"""
+        return self.servicio_hash.hash_lote(passwords)
     
     def verify_password(self, password, password_hash):
         """Verificar contraseña"""
-        return self.hash_password(password) == password_hash
+        return self.servicio_hash.verificar(password, password_hash)
+    
+    def necesita_rehash(self, password_hash):
+        """True si el hash es de un formato anterior o de menor costo"""
+        return self.servicio_hash.necesita_actualizar(password_hash)
+    
+    def identidad(self):
+        """Identidad de la petición actual (guardada en flask.g)"""
+        if 'identidad' not in g:
+            g.identidad = Identidad(self.db, session.get('user_id'),
+                                    session.get('rol'), session.get('ci'))
+        return g.identidad
+    
+    def iniciar_sesion(self, usuario):
+        """Guardar el usuario autenticado en la sesión y en la petición actual"""
+        session['user_id'] = usuario['id']
+        session['username'] = usuario['username']
+        session['ci'] = usuario['ci']
+        session['email'] = usuario['email']
+        session['rol'] = usuario['rol']
+        
+        identidad = Identidad(self.db, usuario['id'], usuario['rol'], usuario['ci'])
+        identidad.usuario = usuario  # Ya consultado, no se vuelve a leer
+        g.identidad = identidad
+        return identidad
+    
+    def cerrar_sesion(self):
+        """Limpiar la sesión y la identidad de la petición"""
+        session.clear()
+        g.pop('identidad', None)
     
     def login_required(self, f):
         """Decorador para requerir login"""
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'user_id' not in session:
+            if not self.identidad().autenticado:
                 flash('Por favor inicie sesión para acceder a esta página.', 'warning')
                 return redirect(url_for('login'))
             return f(*args, **kwargs)
@@ -32,13 +104,14 @@ class Auth:
         def decorator(f):
             @wraps(f)
             def decorated_function(*args, **kwargs):
-                if 'user_id' not in session:
+                identidad = self.identidad()
+                if not identidad.autenticado:
                     flash('Por favor inicie sesión.', 'warning')
                     return redirect(url_for('login'))
                 
-                if session.get('rol') not in roles:
+                if identidad.rol not in roles:
                     flash('No tiene permisos para acceder a esta página.', 'danger')
-                    return redirect(url_for('dashboard'))
+                    return redirect(url_for('index'))
                 
                 return f(*args, **kwargs)
             return decorated_function
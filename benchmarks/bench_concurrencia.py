@@ -0,0 +1,124 @@
+"""
+Benchmark de concurrencia lectores/escritores por perfil de almacenamiento.
+
+Compara el perfil 'clasico' (rollback journal) con 'wal' ejecutando hilos
+lectores (consulta del listado de admin) mientras otros hilos escriben
+parientes, como ocurre cuando los funcionarios guardan su ficha.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_concurrencia --segundos 10 --lectores 8 --escritores 2
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from database import Database
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) de una lista de latencias"""
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[indice]
+
+
+def poblar(db, cantidad):
+    """Insertar funcionarios de prueba en una sola transacción"""
+    with db.conexion() as conn:
+        conn.executemany(
+            "INSERT INTO funcionarios (ci, primer_apellido, primer_nombre, cargo) VALUES (?, ?, ?, ?)",
+            [(f"B{i:07d}", f"APELLIDO{i}", f"NOMBRE{i}", 'TECNICO') for i in range(cantidad)])
+
+
+def ejecutar(perfil, segundos, lectores, escritores, funcionarios):
+    """Correr lectores y escritores en paralelo y devolver las métricas"""
+    # La base y su WAL se borran al terminar la medición
+    with tempfile.TemporaryDirectory(prefix=f'bench_{perfil}_') as directorio:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(os.path.join(directorio, 'talento.db'), perfil=perfil,
+                          pool_size=lectores + escritores)
+        poblar(db, funcionarios)
+
+        lat_lectura, lat_escritura = [], []
+        errores = {'lectura': 0, 'escritura': 0}
+        lock = threading.Lock()
+        fin = time.monotonic() + segundos
+
+        def lector():
+            locales, fallos = [], 0
+            while time.monotonic() < fin:
+                inicio = time.perf_counter()
+                try:
+                    conn = db.get_connection()
+                    conn.execute("SELECT * FROM funcionarios ORDER BY fecha_registro DESC LIMIT 200").fetchall()
+                    conn.close()
+                    locales.append(time.perf_counter() - inicio)
+                except sqlite3.OperationalError:
+                    fallos += 1
+            with lock:
+                lat_lectura.extend(locales)
+                errores['lectura'] += fallos
+
+        def escritor(semilla):
+            azar = random.Random(semilla)
+            locales, fallos = [], 0
+            while time.monotonic() < fin:
+                inicio = time.perf_counter()
+                try:
+                    db.guardar_pariente(azar.randint(1, funcionarios), {
+                        'parentesco': 'HIJ', 'nombres': 'PRUEBA', 'nacionalidad': 'BOL'})
+                    locales.append(time.perf_counter() - inicio)
+                except sqlite3.OperationalError:
+                    fallos += 1
+            with lock:
+                lat_escritura.extend(locales)
+                errores['escritura'] += fallos
+
+        hilos = [threading.Thread(target=lector) for _ in range(lectores)]
+        hilos += [threading.Thread(target=escritor, args=(i,)) for i in range(escritores)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        db.cerrar()
+
+    return {
+        'perfil': perfil,
+        'lecturas_s': len(lat_lectura) / segundos,
+        'escrituras_s': len(lat_escritura) / segundos,
+        'lectura_p50_ms': percentil(lat_lectura, 50) * 1000,
+        'lectura_p99_ms': percentil(lat_lectura, 99) * 1000,
+        'escritura_media_ms': (statistics.mean(lat_escritura) * 1000) if lat_escritura else 0.0,
+        'errores_bloqueo': errores['lectura'] + errores['escritura'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--lectores', type=int, default=8)
+    parser.add_argument('--escritores', type=int, default=2)
+    parser.add_argument('--funcionarios', type=int, default=2000)
+    parser.add_argument('--perfiles', nargs='+', default=['clasico', 'wal'],
+                        choices=sorted(Database.PERFILES_ALMACENAMIENTO))
+    args = parser.parse_args()
+
+    print(f"{'perfil':<10}{'lect/s':>10}{'escr/s':>10}{'lect p50':>11}{'lect p99':>11}{'escr media':>12}{'bloqueos':>10}")
+    for perfil in args.perfiles:
+        r = ejecutar(perfil, args.segundos, args.lectores, args.escritores, args.funcionarios)
+        print(f"{r['perfil']:<10}{r['lecturas_s']:>10.0f}{r['escrituras_s']:>10.0f}"
+              f"{r['lectura_p50_ms']:>9.2f}ms{r['lectura_p99_ms']:>9.2f}ms"
+              f"{r['escritura_media_ms']:>10.2f}ms{r['errores_bloqueo']:>10}")
+
+
+if __name__ == '__main__':
+    main()
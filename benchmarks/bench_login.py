@@ -0,0 +1,100 @@
+"""
+Latencia del login según el costo de hash de contraseñas.
+
+Levanta la aplicación con una base temporal y, para cada costo scrypt,
+ejecuta logins concurrentes a través del cliente de pruebas de Flask
+(ruta /login completa: búsqueda de usuario, verificación en el pool de
+procesos y actualización del último acceso). Reporta logins/s y latencia
+p50/p95/p99.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_login --costos 12 14 15 --hilos 8 --logins 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_concurrencia import percentil
+
+
+def medir(args):
+    """Logins concurrentes con cada costo de args.costos"""
+    if args.procesos is not None:
+        os.environ['HASH_PROCESOS'] = str(args.procesos)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as aplicacion
+
+    db, auth = aplicacion.db, aplicacion.auth
+    try:
+        admin = db.get_usuario_by_username('admin')
+
+        print(f"{'costo':>5}{'logins/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for costo in args.costos:
+            # Mismo pool (creado antes que los hilos de la base), otro costo
+            auth.servicio_hash.costo = costo
+            db.actualizar_password_hash(admin['id'], auth.hash_password('admin123'))
+
+            latencias = []
+            lock = threading.Lock()
+            pendientes = iter(range(args.logins))
+
+            def trabajador():
+                cliente = aplicacion.app.test_client()
+                while True:
+                    with lock:
+                        if next(pendientes, None) is None:
+                            return
+                    with cliente.session_transaction() as sesion:
+                        sesion.clear()
+                        sesion['codigo_verificacion'] = '0000'
+                    inicio = time.perf_counter()
+                    respuesta = cliente.post('/login', data={
+                        'tipo_usuario': 'admin', 'ci': '0000000', 'username': 'admin',
+                        'password': 'admin123', 'codigo_verificacion': '0000'})
+                    duracion = time.perf_counter() - inicio
+                    if respuesta.status_code != 302:
+                        print(f"❌ Login falló con estado {respuesta.status_code}", file=sys.stderr)
+                    with lock:
+                        latencias.append(duracion)
+
+            hilos = [threading.Thread(target=trabajador) for _ in range(args.hilos)]
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            total = time.perf_counter() - inicio
+
+            print(f"{costo:>5}{len(latencias) / total:>10.1f}"
+                  + ''.join(f"{percentil(latencias, p) * 1000:>8.1f}ms" for p in (50, 95, 99)))
+    finally:
+        auth.servicio_hash.cerrar()
+        db.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--costos', type=int, nargs='+', default=[12, 14, 15])
+    parser.add_argument('--hilos', type=int, default=8, help='Logins concurrentes')
+    parser.add_argument('--logins', type=int, default=200, help='Logins por costo')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos del pool de hash')
+    args = parser.parse_args()
+
+    # La aplicación crea instance/talento.db relativo al directorio actual;
+    # se borra al terminar
+    original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_login_') as directorio:
+        os.chdir(directorio)
+        try:
+            medir(args)
+        finally:
+            os.chdir(original)
+
+
+if __name__ == '__main__':
+    main()
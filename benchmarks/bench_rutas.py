@@ -0,0 +1,259 @@
+"""
+Benchmark de extremo a extremo de las rutas principales.
+
+Genera (o copia) una base con benchmarks.generar_datos, levanta la
+aplicación y ejecuta cada escenario con hilos concurrentes a través del
+cliente de pruebas de Flask: login, dashboard del admin, listado de
+funcionarios (con filtros y búsqueda), datos personales (GET) y guardado de
+formación académica (POST). Reporta peticiones/s y latencia p50/p95/p99.
+
+Los resultados se pueden guardar como línea base (JSON con el commit) y
+comparar con otra corrida; con --comparar el proceso termina con código 1
+si el p95 de algún escenario empeora más que la tolerancia.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_rutas --funcionarios 10000 --guardar base.json
+    python -m benchmarks.bench_rutas --db /tmp/talento_10k.db --comparar base.json
+    python -m benchmarks.bench_rutas --escenarios login funcionarios_lista --hilos 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.bench_concurrencia import percentil
+
+LISTADOS = ['', '?estado=activo', '?unidad=Sistemas', '?cargo=Técnico', '?estado=en_proceso&tamano=100',
+            '?q=mamani', '?q=ingenieria+umsa', '?q=300']
+
+FORMACION = {
+    'es_bachiller': 'SI', 'ano_bachiller': '2005', 'unidad_educativa': 'U.E. Bolívar',
+    'ultimo_curso_vencido': '6to de secundaria',
+    'estudios_nuevos[0][pais_estudio]': 'BOL', 'estudios_nuevos[0][estado_instruccion]': 'Concluido',
+    'estudios_nuevos[0][nivel_instruccion]': 'Licenciatura', 'estudios_nuevos[0][carrera]': 'Economía',
+    'estudios_nuevos[0][institucion_academica]': 'UMSA', 'estudios_nuevos[0][titulado]': 'SI',
+    'cursos_nuevos[0][nombre_curso]': 'Gestión Pública', 'cursos_nuevos[0][nro_horas]': '40',
+    'idiomas_nuevos[0][idioma]': 'INGLÉS', 'idiomas_nuevos[0][habla]': 'Intermedio',
+    'idiomas_nuevos[0][escribe]': 'Intermedio', 'idiomas_nuevos[0][lee]': 'Avanzado',
+}
+
+
+def iniciar_sesion(cliente, rol, ci, username, password):
+    """Login por la ruta real (el código de verificación se fija en la sesión)"""
+    with cliente.session_transaction() as sesion:
+        sesion.clear()
+        sesion['codigo_verificacion'] = '0000'
+    return cliente.post('/login', data={'tipo_usuario': rol, 'ci': ci, 'username': username,
+                                        'password': password, 'codigo_verificacion': '0000'})
+
+
+# Escenario: (rol de la sesión previa o None, petición(cliente, n, usuarios), estado esperado)
+ESCENARIOS = {
+    'login': (None, lambda cliente, n, usuarios: iniciar_sesion(
+        cliente, 'funcionario', *usuarios[n % len(usuarios)], usuarios[n % len(usuarios)][0]), 302),
+    'dashboard_admin': ('admin', lambda cliente, n, usuarios: cliente.get('/admin/dashboard'), 200),
+    'funcionarios_lista': ('admin', lambda cliente, n, usuarios: cliente.get(
+        '/admin/funcionarios' + LISTADOS[n % len(LISTADOS)]), 200),
+    'funcionario_datos_personales': ('funcionario', lambda cliente, n, usuarios: cliente.get(
+        '/funcionario/datos-personales'), 200),
+    'funcionario_formacion_academica': ('funcionario', lambda cliente, n, usuarios: cliente.post(
+        '/funcionario/formacion-academica', data=FORMACION), 302),
+}
+
+
+def preparar_base(destino, args):
+    """Copiar la base indicada o generar una nueva en `destino`"""
+    if args.db:
+        origen = sqlite3.connect(args.db)
+        copia = sqlite3.connect(destino)
+        origen.backup(copia)
+        copia.close()
+        origen.close()
+        return
+
+    from benchmarks.generar_datos import generar
+    from database import Database
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(destino, intervalo_escritura=0, intervalo_checkpoint=0)
+    try:
+        resumen = generar(db, args.funcionarios, args.semilla, costo=args.costo)
+    finally:
+        db.cerrar()
+    print(f"📦 {resumen['funcionarios']} funcionarios generados en {resumen['segundos']:.1f}s")
+
+
+def correr_escenario(aplicacion, nombre, usuarios, hilos, peticiones, calentamiento):
+    """Ejecutar un escenario con `hilos` clientes y devolver sus métricas"""
+    rol, peticion, esperado = ESCENARIOS[nombre]
+    latencias, errores = [], []
+    lock = threading.Lock()
+    contador = iter(range(calentamiento + peticiones))
+    listos = threading.Barrier(hilos + 1)
+
+    def trabajador(numero):
+        cliente = aplicacion.app.test_client()
+        if rol == 'admin':
+            iniciar_sesion(cliente, 'admin', '0000000', 'admin', 'admin123')
+        elif rol == 'funcionario':
+            ci, username = usuarios[numero % len(usuarios)]
+            iniciar_sesion(cliente, 'funcionario', ci, username, ci)
+        listos.wait()
+        while True:
+            with lock:
+                n = next(contador, None)
+            if n is None:
+                return
+            inicio = time.perf_counter()
+            respuesta = peticion(cliente, n, usuarios)
+            duracion = time.perf_counter() - inicio
+            if n < calentamiento:
+                continue
+            with lock:
+                latencias.append(duracion)
+                if respuesta.status_code != esperado:
+                    errores.append(respuesta.status_code)
+
+    hilos_ = [threading.Thread(target=trabajador, args=(numero,)) for numero in range(hilos)]
+    for hilo in hilos_:
+        hilo.start()
+    listos.wait()
+    inicio = time.perf_counter()
+    for hilo in hilos_:
+        hilo.join()
+    total = time.perf_counter() - inicio
+
+    return {
+        'peticiones': len(latencias),
+        'errores': len(errores),
+        'segundos': round(total, 3),
+        'peticiones_s': round(len(latencias) / total, 1) if total else 0.0,
+        **{f'p{p}_ms': round(percentil(latencias, p) * 1000, 2) for p in (50, 95, 99)},
+    }
+
+
+def commit_actual():
+    """Commit del código medido (vacío si no es un repositorio git)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        return ''
+
+
+def comparar(resultados, base, tolerancia, parametros):
+    """Imprimir la diferencia con la línea base; devuelve los escenarios que empeoraron"""
+    distintos = [clave for clave in ('funcionarios', 'semilla', 'costo', 'db', 'hilos')
+                 if base.get('parametros', {}).get(clave) != parametros.get(clave)]
+    if distintos:
+        print(f"⚠️ La línea base se midió con otros parámetros: {', '.join(distintos)}")
+    print(f"\nComparación con {base.get('commit') or 'línea base'} ({base.get('fecha', '')[:19]}):")
+    print(f"{'escenario':<34}{'pet/s':>24}{'p95 (ms)':>25}")
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base['resultados'].get(nombre)
+        if not anterior:
+            print(f"{nombre:<34}{'(sin línea base)':>18}")
+            continue
+        delta_rps = (actual['peticiones_s'] / anterior['peticiones_s'] - 1) * 100 if anterior['peticiones_s'] else 0
+        delta_p95 = (actual['p95_ms'] / anterior['p95_ms'] - 1) * 100 if anterior['p95_ms'] else 0
+        marca = ''
+        if delta_p95 > tolerancia:
+            regresiones.append(nombre)
+            marca = ' ⚠️'
+        print(f"{nombre:<34}{anterior['peticiones_s']:>7.1f} → {actual['peticiones_s']:<7.1f}{delta_rps:>+6.1f}%"
+              f"{anterior['p95_ms']:>8.1f} → {actual['p95_ms']:<7.1f}{delta_p95:>+6.1f}%{marca}")
+    return regresiones
+
+
+def medir(args, guardar, base):
+    """Generar la base, levantar la aplicación y correr los escenarios"""
+    os.makedirs('instance')
+    preparar_base(os.path.join('instance', 'talento.db'), args)
+
+    # Mismo costo que los hashes generados: el login no los vuelve a calcular
+    os.environ['HASH_COSTO'] = str(args.costo)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as aplicacion
+
+    try:
+        with aplicacion.db.conexion() as conn:
+            usuarios = [tuple(fila) for fila in conn.execute("""
+                SELECT u.ci, u.username FROM usuarios u
+                WHERE u.rol = 'funcionario' AND u.activo = 1
+                  AND EXISTS (SELECT 1 FROM funcionarios f WHERE f.ci = u.ci)
+                ORDER BY u.id LIMIT 1000
+            """)]
+        if not usuarios:
+            print("❌ La base no tiene usuarios funcionario activos")
+            return 1
+
+        resultados = {}
+        print(f"{'escenario':<34}{'pet':>6}{'err':>5}{'pet/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for nombre in args.escenarios:
+            with contextlib.redirect_stdout(io.StringIO()):
+                medicion = correr_escenario(aplicacion, nombre, usuarios, args.hilos, args.peticiones,
+                                            args.calentamiento)
+            resultados[nombre] = medicion
+            print(f"{nombre:<34}{medicion['peticiones']:>6}{medicion['errores']:>5}{medicion['peticiones_s']:>9.1f}"
+                  + ''.join(f"{medicion[f'p{p}_ms']:>8.1f}ms" for p in (50, 95, 99)))
+
+        if guardar:
+            with open(guardar, 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'commit': commit_actual(),
+                    'fecha': datetime.now().isoformat(),
+                    'parametros': {clave: valor for clave, valor in vars(args).items()
+                                   if clave not in ('guardar', 'comparar')},
+                    'resultados': resultados,
+                }, archivo, ensure_ascii=False, indent=2)
+            print(f"📄 Línea base guardada en: {guardar}")
+
+        if base and comparar(resultados, base, args.tolerancia, vars(args)):
+            return 1
+        return 0
+    finally:
+        aplicacion.db.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--funcionarios', type=int, default=1000, help='Tamaño de la base generada')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--costo', type=int, default=8, help='Costo scrypt de datos generados y aplicación')
+    parser.add_argument('--db', help='Usar una copia de esta base en lugar de generar una')
+    parser.add_argument('--escenarios', nargs='+', choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument('--hilos', type=int, default=4, help='Clientes concurrentes')
+    parser.add_argument('--peticiones', type=int, default=200, help='Peticiones medidas por escenario')
+    parser.add_argument('--calentamiento', type=int, default=20, help='Peticiones previas sin medir')
+    parser.add_argument('--guardar', help='Guardar los resultados como línea base (JSON)')
+    parser.add_argument('--comparar', help='Comparar con una línea base guardada')
+    parser.add_argument('--tolerancia', type=float, default=20.0, help='Empeoramiento de p95 tolerado (%%)')
+    args = parser.parse_args()
+
+    guardar = os.path.abspath(args.guardar) if args.guardar else None
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+
+    # La aplicación usa instance/talento.db relativo al directorio actual; la
+    # base generada (hasta 1M de funcionarios) se borra al terminar
+    original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_rutas_') as directorio:
+        os.chdir(directorio)
+        try:
+            return medir(args, guardar, base)
+        finally:
+            os.chdir(original)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
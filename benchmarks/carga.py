@@ -0,0 +1,404 @@
+"""
+Prueba de carga con varios workers de gunicorn en una sola máquina.
+
+Levanta gunicorn (gunicorn.conf.py, wsgi:app) sobre una copia de una base
+de benchmarks.generar_datos y lanza usuarios virtuales con sesiones de
+admin, funcionario y jefe. Cada usuario inicia sesión por /login y repite
+tareas ponderadas (al estilo de locust) sin pausas, así que la carga es la
+máxima que el servidor acepta: para cada cantidad de workers y de usuarios
+se reporta pet/s, latencias, errores HTTP y errores "database is locked"
+(en las respuestas y en el log del servidor). La mayor tasa por cantidad de
+workers es el punto de saturación.
+
+Los usuarios virtuales corren como hilos de este proceso en la misma
+máquina: con muchos workers el cliente también compite por CPU.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.carga --workers 1 2 4 --usuarios 8 32 --segundos 20
+    python -m benchmarks.carga --db /tmp/talento_10k.db --workers 2 --usuarios 16 64
+    python -m benchmarks.carga --url http://127.0.0.1:8000 --db instance/talento.db --usuarios 16
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from benchmarks.bench_concurrencia import percentil
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOQUEO = b'database is locked'
+_CODIGO = re.compile(rb'id="codigo-display">\s*(\w+)')
+
+FILTROS = ['', '?estado=activo', '?unidad=Sistemas', '?cargo=Técnico', '?estado=en_proceso',
+           '?unidad=Recursos+Humanos&estado=activo']
+PREFIJOS = ['MA', 'QUI', 'FLO', 'CHO', 'GU', 'VAR', '30', '301', 'CON', 'PER']
+
+DATOS_PERSONALES = {
+    'genero': 'F', 'expedido_en': 'LP', 'fecha_nacimiento': '1990-05-10', 'pais_nacimiento': 'BOL',
+    'estado_civil': 'S', 'tipo_sangre': 'O+', 'gestora': 'CNS', 'direccion_domicilio': 'Calle 5',
+    'ciudad_localidad': 'La Paz', 'telefono_celular1': '70000000',
+}
+FORMACION = {
+    'idiomas_nuevos[0][idioma]': 'INGLÉS', 'idiomas_nuevos[0][habla]': 'Básico',
+    'idiomas_nuevos[0][escribe]': 'Básico', 'idiomas_nuevos[0][lee]': 'Intermedio',
+}
+
+
+class SesionHTTP:
+    """Cliente HTTP con keep-alive y la cookie de sesión de Flask"""
+
+    def __init__(self, host, puerto):
+        self.host, self.puerto = host, puerto
+        self.cookies = {}
+        self._conn = None
+
+    def pedir(self, metodo, ruta, datos=None):
+        """(estado, cuerpo) de la petición; reconecta una vez si el worker cerró la conexión"""
+        ruta = urllib.parse.quote(ruta, safe="/?=&+%")
+        cuerpo = urllib.parse.urlencode(datos) if datos is not None else None
+        cabeceras = {'Cookie': '; '.join(f'{k}={v}' for k, v in self.cookies.items())}
+        if cuerpo is not None:
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        for intento in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.puerto, timeout=60)
+            try:
+                self._conn.request(metodo, ruta, cuerpo, cabeceras)
+                respuesta = self._conn.getresponse()
+                contenido = respuesta.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                self._conn.close()
+                self._conn = None
+                if intento == 2:
+                    raise
+        for cookie in respuesta.headers.get_all('Set-Cookie') or []:
+            nombre, _, valor = cookie.split(';', 1)[0].partition('=')
+            self.cookies[nombre] = valor
+        return respuesta.status, contenido
+
+    def iniciar_sesion(self, rol, ci, username, password):
+        _, pagina = self.pedir('GET', '/login')
+        codigo = _CODIGO.search(pagina)
+        return self.pedir('POST', '/login', {
+            'tipo_usuario': rol, 'ci': ci, 'username': username, 'password': password,
+            'codigo_verificacion': codigo.group(1).decode() if codigo else ''})
+
+    def cerrar(self):
+        if self._conn is not None:
+            self._conn.close()
+
+
+# Tareas por rol: nombre -> (peso, función(sesion, rnd, cis) -> (estado, cuerpo), estado esperado)
+TAREAS = {
+    'admin': {
+        'dashboard': (3, lambda s, rnd, cis: s.pedir('GET', '/admin/dashboard'), 200),
+        'listado': (4, lambda s, rnd, cis: s.pedir('GET', '/admin/funcionarios' + rnd.choice(FILTROS)), 200),
+        'busqueda': (2, lambda s, rnd, cis: s.pedir(
+            'GET', '/admin/funcionarios?q=' + rnd.choice(['mamani', 'quispe', 'sistemas', 'umsa'])), 200),
+        'sugerencias': (3, lambda s, rnd, cis: s.pedir(
+            'GET', '/api/funcionarios/sugerencias?q=' + rnd.choice(PREFIJOS)), 200),
+        'ver_funcionario': (2, lambda s, rnd, cis: s.pedir('GET', f'/admin/funcionarios/ver/{rnd.choice(cis)}'), 200),
+    },
+    'funcionario': {
+        'dashboard': (3, lambda s, rnd, cis: s.pedir('GET', '/funcionario/dashboard'), 200),
+        'completar_ficha': (2, lambda s, rnd, cis: s.pedir('GET', '/funcionario/completar-ficha'), 200),
+        'datos_personales': (2, lambda s, rnd, cis: s.pedir('GET', '/funcionario/datos-personales'), 200),
+        'formacion': (2, lambda s, rnd, cis: s.pedir('GET', '/funcionario/formacion-academica'), 200),
+        'guardar_datos_personales': (1, lambda s, rnd, cis: s.pedir(
+            'POST', '/funcionario/datos-personales', DATOS_PERSONALES), 302),
+        'guardar_formacion': (1, lambda s, rnd, cis: s.pedir(
+            'POST', '/funcionario/formacion-academica', FORMACION), 302),
+    },
+    'jefe': {
+        'dashboard': (3, lambda s, rnd, cis: s.pedir('GET', '/jefe/dashboard'), 200),
+        'sugerencias': (2, lambda s, rnd, cis: s.pedir(
+            'GET', '/api/funcionarios/sugerencias?q=' + rnd.choice(PREFIJOS)), 200),
+    },
+}
+
+
+def cuentas(db_path, cantidad):
+    """Credenciales de prueba por rol (contraseña = CI, como en generar_datos)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        por_rol = {'admin': [('0000000', 'admin', 'admin123')]}
+        for rol in ('funcionario', 'jefe'):
+            por_rol[rol] = [(ci, username, ci) for ci, username in conn.execute("""
+                SELECT u.ci, u.username FROM usuarios u
+                WHERE u.rol = ? AND u.activo = 1 AND EXISTS (SELECT 1 FROM funcionarios f WHERE f.ci = u.ci)
+                ORDER BY u.id LIMIT ?
+            """, (rol, cantidad))]
+        cis = [ci for (ci,) in conn.execute("SELECT ci FROM funcionarios ORDER BY id LIMIT 5000")]
+    finally:
+        conn.close()
+    return por_rol, cis
+
+
+def repartir_roles(usuarios, mezcla):
+    """Lista de roles para `usuarios` usuarios virtuales según la mezcla {rol: peso}"""
+    activos = [rol for rol, peso in mezcla.items() if peso > 0]
+    # Al menos un usuario por rol si alcanza; el resto por mayor residuo
+    cantidades = {rol: 1 if usuarios >= len(activos) else 0 for rol in activos}
+    resto = usuarios - sum(cantidades.values())
+    total = sum(mezcla[rol] for rol in activos)
+    cuotas = {rol: resto * mezcla[rol] / total for rol in activos}
+    for rol in activos:
+        cantidades[rol] += int(cuotas[rol])
+    faltan = usuarios - sum(cantidades.values())
+    for rol in sorted(activos, key=lambda rol: cuotas[rol] - int(cuotas[rol]), reverse=True)[:faltan]:
+        cantidades[rol] += 1
+    return [rol for rol in activos for _ in range(cantidades[rol])]
+
+
+def correr_carga(host, puerto, roles, por_rol, cis, segundos, semilla):
+    """Usuarios virtuales durante `segundos`; devuelve latencias y errores"""
+    resultados = {'latencias': [], 'por_tarea': {}, 'errores': 0, 'bloqueos': 0, 'sesiones_fallidas': 0}
+    lock = threading.Lock()
+    inicio, fin = [0.0], [0.0]
+
+    def arrancar():
+        # Cuando todos iniciaron sesión, antes de liberar a los hilos
+        inicio[0] = time.monotonic()
+        fin[0] = inicio[0] + segundos
+
+    listos = threading.Barrier(len(roles) + 1, action=arrancar)
+
+    def usuario_virtual(numero, rol):
+        rnd = random.Random(semilla + numero)
+        sesion = SesionHTTP(host, puerto)
+        credenciales = por_rol[rol][numero % len(por_rol[rol])]
+        try:
+            estado, _ = sesion.iniciar_sesion(rol, *credenciales)
+        except (OSError, http.client.HTTPException):
+            estado = 0
+        if estado != 302:
+            with lock:
+                resultados['sesiones_fallidas'] += 1
+        nombres = list(TAREAS[rol])
+        pesos = [TAREAS[rol][nombre][0] for nombre in nombres]
+        locales = []
+        listos.wait()
+        try:
+            while time.monotonic() < fin[0]:
+                nombre = rnd.choices(nombres, pesos)[0]
+                _, tarea, esperado = TAREAS[rol][nombre]
+                inicio = time.perf_counter()
+                try:
+                    estado, cuerpo = tarea(sesion, rnd, cis)
+                except (OSError, http.client.HTTPException):
+                    estado, cuerpo = 0, b''
+                locales.append((f'{rol}.{nombre}', time.perf_counter() - inicio,
+                                estado != esperado, BLOQUEO in cuerpo))
+        finally:
+            sesion.cerrar()
+            with lock:
+                for clave, duracion, error, bloqueo in locales:
+                    resultados['latencias'].append(duracion)
+                    resultados['por_tarea'].setdefault(clave, []).append(duracion)
+                    resultados['errores'] += error
+                    resultados['bloqueos'] += bloqueo
+
+    hilos = [threading.Thread(target=usuario_virtual, args=(numero, rol), daemon=True)
+             for numero, rol in enumerate(roles)]
+    for hilo in hilos:
+        hilo.start()
+    listos.wait()
+    for hilo in hilos:
+        hilo.join()
+    resultados['segundos'] = time.monotonic() - inicio[0]
+    return resultados
+
+
+class Servidor:
+    """gunicorn con N workers sobre una copia propia de la base"""
+
+    def __init__(self, db_origen, workers, puerto, costo, hilos):
+        self.directorio = tempfile.mkdtemp(prefix=f'carga_{workers}w_')
+        os.makedirs(os.path.join(self.directorio, 'instance'))
+        origen = sqlite3.connect(db_origen)
+        copia = sqlite3.connect(os.path.join(self.directorio, 'instance', 'talento.db'))
+        origen.backup(copia)
+        copia.close()
+        origen.close()
+
+        self.puerto = puerto
+        self.log = os.path.join(self.directorio, 'gunicorn.log')
+        entorno = dict(os.environ, PYTHONPATH=RAIZ, GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(hilos),
+                       GUNICORN_BIND=f'127.0.0.1:{puerto}', HASH_COSTO=str(costo),
+                       SECRET_KEY=os.urandom(16).hex())
+        with open(self.log, 'wb') as log:
+            self.proceso = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', os.path.join(RAIZ, 'gunicorn.conf.py'), 'wsgi:app'],
+                cwd=self.directorio, env=entorno, stdout=log, stderr=subprocess.STDOUT)
+
+    def esperar(self, limite=60):
+        """Esperar a que el servidor responda"""
+        tope = time.monotonic() + limite
+        while time.monotonic() < tope:
+            if self.proceso.poll() is not None:
+                raise RuntimeError(f"gunicorn terminó al arrancar; ver {self.log}")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.puerto, timeout=2)
+                conn.request('GET', '/login')
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"gunicorn no respondió en {limite}s; ver {self.log}")
+
+    def detener(self):
+        """Terminar el servidor y devolver los 'database is locked' de su log"""
+        self.proceso.send_signal(signal.SIGTERM)
+        try:
+            self.proceso.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            self.proceso.kill()
+        with open(self.log, 'rb') as log:
+            bloqueos = log.read().count(BLOQUEO)
+        shutil.rmtree(self.directorio, ignore_errors=True)
+        return bloqueos
+
+
+def resumen(workers, usuarios, resultados, bloqueos_log):
+    latencias = resultados['latencias']
+    return {
+        'workers': workers,
+        'usuarios': usuarios,
+        'peticiones': len(latencias),
+        'peticiones_s': round(len(latencias) / resultados['segundos'], 1) if resultados['segundos'] else 0.0,
+        **{f'p{p}_ms': round(percentil(latencias, p) * 1000, 2) for p in (50, 95, 99)},
+        'errores': resultados['errores'],
+        'bloqueos': resultados['bloqueos'],
+        'bloqueos_log': bloqueos_log,
+        'sesiones_fallidas': resultados['sesiones_fallidas'],
+        'por_tarea': {tarea: {'peticiones': len(valores), 'p95_ms': round(percentil(valores, 95) * 1000, 2)}
+                      for tarea, valores in sorted(resultados['por_tarea'].items())},
+    }
+
+
+def imprimir_fila(fila):
+    print(f"{fila['workers'] or '-':>7}{fila['usuarios']:>9}{fila['peticiones']:>8}{fila['peticiones_s']:>9.1f}"
+          + ''.join(f"{fila[f'p{p}_ms']:>8.1f}ms" for p in (50, 95, 99))
+          + f"{fila['errores']:>8}{fila['bloqueos']:>9}{fila['bloqueos_log'] if fila['bloqueos_log'] is not None else '-':>10}",
+          flush=True)
+
+
+def medir(args, mezcla, db_path):
+    """Correr la carga contra cada cantidad de workers y usuarios e imprimir los resultados"""
+    por_rol, cis = cuentas(db_path, max(args.usuarios))
+    faltantes = [rol for rol in mezcla if not por_rol.get(rol)]
+    if faltantes:
+        print(f"❌ La base no tiene usuarios activos con rol: {', '.join(faltantes)}")
+        return 1
+
+    print(f"{'workers':>7}{'usuarios':>9}{'pet':>8}{'pet/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}"
+          f"{'errores':>8}{'bloqueos':>9}{'en log':>10}")
+    filas = []
+    for workers in ([None] if args.url else args.workers):
+        servidor = None
+        if args.url:
+            destino = urllib.parse.urlsplit(args.url)
+            host, puerto = destino.hostname, destino.port or 80
+        else:
+            host, puerto = '127.0.0.1', args.puerto
+            servidor = Servidor(db_path, workers, puerto, args.costo, args.hilos)
+            servidor.esperar()
+
+        medidas = []
+        try:
+            for usuarios in args.usuarios:
+                resultados = correr_carga(host, puerto, repartir_roles(usuarios, mezcla), por_rol, cis,
+                                          args.segundos, args.semilla)
+                medidas.append(resumen(workers, usuarios, resultados, None))
+        finally:
+            bloqueos_log = servidor.detener() if servidor else None
+
+        # El log del servidor es uno solo por cantidad de workers
+        if medidas:
+            medidas[-1]['bloqueos_log'] = bloqueos_log
+        for fila in medidas:
+            imprimir_fila(fila)
+            if fila['sesiones_fallidas']:
+                print(f"⚠️ {fila['sesiones_fallidas']} usuarios virtuales no pudieron iniciar sesión")
+            if args.detalle:
+                for tarea, datos in fila['por_tarea'].items():
+                    print(f"{'':>16}{tarea:<40}{datos['peticiones']:>8}{datos['p95_ms']:>10.1f}ms")
+        filas += medidas
+
+    print("\nSaturación (máximo pet/s por cantidad de workers):")
+    for workers in dict.fromkeys(fila['workers'] for fila in filas):
+        mejor = max((fila for fila in filas if fila['workers'] == workers), key=lambda fila: fila['peticiones_s'])
+        print(f"  {workers or '-'} workers: {mejor['peticiones_s']:.1f} pet/s con {mejor['usuarios']} usuarios "
+              f"(p95 {mejor['p95_ms']:.1f}ms, {mejor['bloqueos']} bloqueos)")
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as archivo:
+            json.dump({'parametros': vars(args), 'resultados': filas}, archivo, ensure_ascii=False, indent=2)
+        print(f"📄 Resultados guardados en: {args.guardar}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Workers de gunicorn a probar')
+    parser.add_argument('--hilos', type=int, default=4, help='Hilos por worker (gthread)')
+    parser.add_argument('--usuarios', type=int, nargs='+', default=[8, 32], help='Usuarios virtuales a probar')
+    parser.add_argument('--segundos', type=float, default=20, help='Duración de cada medición')
+    parser.add_argument('--mezcla', default='admin=1,jefe=1,funcionario=8', help='Peso de cada rol')
+    parser.add_argument('--db', help='Base generada con benchmarks.generar_datos (por defecto se genera)')
+    parser.add_argument('--funcionarios', type=int, default=5000, help='Tamaño de la base generada')
+    parser.add_argument('--costo', type=int, default=8, help='Costo scrypt de la base generada y del servidor')
+    parser.add_argument('--url', help='Servidor ya levantado (no se inicia gunicorn; requiere --db)')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--guardar', help='Guardar los resultados en JSON')
+    parser.add_argument('--detalle', action='store_true', help='Mostrar p95 por tarea')
+    args = parser.parse_args()
+
+    mezcla = {rol: float(peso) for rol, _, peso in (parte.partition('=') for parte in args.mezcla.split(','))}
+    desconocidos = set(mezcla) - set(TAREAS)
+    if desconocidos:
+        parser.error(f"Roles desconocidos en --mezcla: {', '.join(desconocidos)}")
+    if args.url and not args.db:
+        parser.error("--url requiere --db para tomar las credenciales de prueba")
+
+    if args.db:
+        return medir(args, mezcla, args.db)
+
+    # Sin --db se genera una base que se borra al terminar (las copias de
+    # cada worker las borra Servidor.detener)
+    from benchmarks.generar_datos import generar
+    from database import Database
+    directorio = tempfile.mkdtemp(prefix='carga_base_')
+    try:
+        db_path = os.path.join(directorio, 'talento.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(db_path, intervalo_escritura=0, intervalo_checkpoint=0)
+        try:
+            generado = generar(db, args.funcionarios, args.semilla, costo=args.costo)
+        finally:
+            db.cerrar()
+        print(f"📦 {generado['funcionarios']} funcionarios generados en {generado['segundos']:.1f}s")
+        return medir(args, mezcla, db_path)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Generador determinista de datos de prueba.
+
+Llena una base nueva con funcionarios y sus usuarios (rol funcionario o
+jefe, contraseña = CI con hash scrypt válido) y todas las tablas de la
+ficha en proporciones realistas: datos adicionales, 0-8 parientes, 1-4
+estudios, bachillerato, 0-6 cursos, 1-3 idiomas, experiencia laboral,
+capacitaciones impartidas, documentos y eventos de auditoría. Con la misma
+semilla y cantidad se obtiene siempre la misma base (salvo sales y fechas
+de los hashes). Escala de mil a un millón de funcionarios: se genera y
+escribe por lotes, una transacción por lote.
+
+El costo scrypt por defecto es bajo para que generar sea rápido; el login
+actualiza el hash al costo de la aplicación la primera vez.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.generar_datos --funcionarios 10000 --db /tmp/talento_10k.db
+    python -m benchmarks.generar_datos --funcionarios 1000000 --db /tmp/talento_1m.db --lote 5000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from database import DOMINIO_CORREO, Database, base_username, siguiente_username
+from hashing import ServicioHash
+
+PRIMER_CI = 3000000
+FECHA_BASE = date(2025, 1, 1)  # Fechas relativas a un día fijo: misma base en cada corrida
+
+APELLIDOS = [
+    'MAMANI', 'QUISPE', 'FLORES', 'CHOQUE', 'GUTIERREZ', 'LOPEZ', 'VARGAS', 'RODRIGUEZ', 'FERNANDEZ',
+    'CONDORI', 'GARCIA', 'MARTINEZ', 'PEREZ', 'ROJAS', 'APAZA', 'TICONA', 'ALVAREZ', 'SANCHEZ',
+    'GONZALES', 'TORREZ', 'CRUZ', 'RAMOS', 'MENDOZA', 'LIMACHI', 'HUANCA', 'CALLE', 'ARANDA',
+    'VILLCA', 'COLQUE', 'POMA', 'SALAZAR', 'MORALES', 'AGUILAR', 'CARDENAS', 'ORTIZ', 'SUAREZ',
+]
+NOMBRES_M = ['JUAN', 'CARLOS', 'JOSE', 'LUIS', 'MARIO', 'JORGE', 'FREDDY', 'VICTOR', 'RENE', 'DANIEL',
+             'MIGUEL', 'ROBERTO', 'EDWIN', 'MARCELO', 'SERGIO', 'WILLY', 'ALVARO', 'RAUL']
+NOMBRES_F = ['MARIA', 'ANA', 'ROSA', 'CARMEN', 'PATRICIA', 'SANDRA', 'ELIZABETH', 'MARTHA', 'JUANA',
+             'VERONICA', 'LUCIA', 'GABRIELA', 'CLAUDIA', 'NORMA', 'SILVIA', 'MONICA', 'DANIELA', 'ROXANA']
+
+# (valor, peso)
+ESTADOS = [('activo', 60), ('en_proceso', 15), ('pendiente', 15), ('inactivo', 5), ('baja', 5)]
+ADMINISTRACIONES = [('Central', 70), ('Desconcentrada', 20), ('Descentralizada', 10)]
+UNIDADES = [
+    ('Dirección General', 3), ('Recursos Humanos', 8), ('Administración y Finanzas', 12),
+    ('Asesoría Jurídica', 5), ('Planificación', 6), ('Sistemas', 7), ('Auditoría Interna', 4),
+    ('Comunicación', 3), ('Contrataciones', 6), ('Archivo Central', 3), ('Salud Ocupacional', 2),
+    ('Servicios Generales', 10), ('Proyectos', 9), ('Atención al Ciudadano', 12), ('Transparencia', 2),
+]
+CARGOS = [('Técnico', 30), ('Profesional', 25), ('Asistente', 15), ('Analista', 10), ('Auxiliar', 10),
+          ('Jefe de Unidad', 5), ('Responsable', 4), ('Director', 1)]
+JERARQUIAS = {'Director': 'Director', 'Jefe de Unidad': 'Jefatura', 'Responsable': 'Jefatura'}
+
+# Códigos de los catálogos sembrados por la migración 0000
+DEPARTAMENTOS = ['LP', 'CB', 'SC', 'OR', 'PT', 'TJ', 'CH', 'BN', 'PD']
+PAISES = ['BOL'] * 20 + ['ARG', 'BRA', 'CHL', 'PER']
+ESTADO_CIVIL = ['S', 'C', 'C', 'D', 'V', 'U']
+TIPOS_SANGRE = ['O+', 'O+', 'O+', 'A+', 'A+', 'B+', 'O-', 'A-', 'AB+', 'B-', 'AB-']
+GESTORAS = ['CSS', 'CPS', 'CNS', 'CSM', 'CSR']
+PARENTESCOS = ['PAD', 'MAD', 'CON', 'HIJ', 'HIJ', 'HER', 'OTR']
+NACIONALIDADES = ['BOL'] * 20 + ['ARG', 'BRA', 'CHL', 'PER', 'OTR']
+
+INSTITUCIONES = ['UMSA', 'UCB', 'UMSS', 'UAGRM', 'UPEA', 'UTO', 'UATF', 'UAJMS', 'UNIVALLE', 'UPSA', 'EMI']
+CARRERAS = ['Derecho', 'Administración de Empresas', 'Contaduría Pública', 'Economía', 'Ingeniería de Sistemas',
+            'Ingeniería Civil', 'Psicología', 'Trabajo Social', 'Comunicación Social', 'Arquitectura',
+            'Informática', 'Auditoría', 'Ciencias Políticas', 'Medicina', 'Enfermería']
+NIVELES = ['Técnico Medio', 'Técnico Superior', 'Licenciatura', 'Licenciatura', 'Diplomado',
+           'Especialidad', 'Maestría', 'Doctorado']
+CURSOS = ['Gestión Pública', 'Ley 1178 SAFCO', 'Excel Avanzado', 'Atención al Cliente', 'Ética Pública',
+          'Contrataciones Estatales', 'Presupuesto Público', 'Seguridad Informática', 'Liderazgo',
+          'Primeros Auxilios', 'Archivística', 'Redacción Administrativa']
+IDIOMAS = ['QUECHUA', 'AYMARA', 'INGLÉS', 'GUARANÍ', 'PORTUGUÉS', 'FRANCÉS']
+NIVELES_IDIOMA = ['Básico', 'Intermedio', 'Avanzado']
+ENTIDADES = ['Ministerio de Economía', 'Gobierno Autónomo Municipal', 'Banco Unión', 'YPFB', 'ENTEL',
+             'Caja Nacional de Salud', 'Empresa privada', 'ONG', 'Gobernación', 'Servicio de Impuestos']
+TIPOS_DOCUMENTO = ['CI', 'Título', 'Certificado', 'Memorándum', 'Declaración Jurada']
+
+# Tablas hijas: (tabla, columnas) en el orden de los valores generados
+COLUMNAS = {
+    'datos_adicionales': [
+        'genero', 'expedido_en', 'fecha_nacimiento', 'pais_nacimiento', 'depto_nacimiento',
+        'lugar_nacimiento', 'nro_libreta_militar', 'gestora', 'nro_nua', 'tipo_sangre', 'fecha_caducidad_ci',
+        'estado_civil', 'nro_hijos', 'nro_dependientes', 'direccion_domicilio', 'nro_domicilio',
+        'zona_domicilio', 'ciudad_localidad', 'correo_electronico1', 'telefono_celular1'],
+    'parientes': [
+        'parentesco', 'primer_apellido', 'segundo_apellido', 'nombres', 'nacionalidad', 'telefono',
+        'genero', 'fecha_nacimiento', 'tipo_identificacion', 'numero_identificacion'],
+    'formacion_academica': [
+        'pais_estudio', 'estado_instruccion', 'nivel_instruccion', 'area', 'tipo_entidad_academica',
+        'institucion_academica', 'nombre_institucion', 'carrera', 'titulado', 'fecha_inicio', 'fecha_final',
+        'nro_titulo_academico'],
+    'bachillerato': ['es_bachiller', 'ano', 'unidad_educativa', 'ultimo_curso_vencido'],
+    'cursos': [
+        'nivel_instruccion', 'area', 'nombre_curso', 'tipo_entidad_academica', 'institucion_academica',
+        'nro_horas', 'fecha_inicio', 'fecha_final', 'pais_estudio', 'depto_estudio', 'capacitacion'],
+    'idiomas': ['idioma', 'habla', 'escribe', 'lee'],
+    'experiencia_laboral': [
+        'entidad_empresa', 'area_departamento', 'tipo_entidad', 'puesto', 'fecha_inicio', 'fecha_final',
+        'forma_ingreso', 'causa_retiro', 'haber_basico', 'pais'],
+    'capacitaciones_impartidas': [
+        'tipo_entidad_academica', 'institucion_academica', 'tipo_capacitacion', 'asignatura_tema',
+        'nro_horas', 'fecha_desde', 'fecha_hasta'],
+    'documentos': ['tipo_documento', 'nombre_archivo', 'ruta_archivo'],
+}
+
+COLUMNAS_FUNCIONARIO = [
+    'ci', 'primer_apellido', 'segundo_apellido', 'primer_nombre', 'segundo_nombre', 'tipo_identificacion',
+    'estado', 'fecha_registro', 'nro_item', 'administracion', 'jerarquia', 'unidad_organizacional', 'cargo',
+    'puesto', 'usuario_aplicacion', 'correo_interno']
+
+
+def _ponderado(rnd, opciones):
+    return rnd.choices([valor for valor, _ in opciones], weights=[peso for _, peso in opciones])[0]
+
+
+def _fecha(rnd, desde_dias, hasta_dias):
+    """Fecha ISO entre FECHA_BASE - desde_dias y FECHA_BASE - hasta_dias"""
+    return (FECHA_BASE - timedelta(days=rnd.randint(hasta_dias, desde_dias))).isoformat()
+
+
+class GeneradorDatos:
+    """Arma funcionarios y filas de la ficha a partir de una semilla"""
+
+    def __init__(self, semilla=42):
+        self.rnd = random.Random(semilla)
+        self.ocupados = set()  # Usernames asignados
+        self.contadores = {}
+
+    def funcionario(self, indice):
+        """Registro de funcionarios y usuarios (sin hash) y datos para sus filas hijas"""
+        rnd = self.rnd
+        genero = rnd.choice('MF')
+        nombres = NOMBRES_M if genero == 'M' else NOMBRES_F
+        ci = str(PRIMER_CI + indice)
+        primer_apellido, segundo_apellido = rnd.choice(APELLIDOS), rnd.choice(APELLIDOS)
+        primer_nombre = rnd.choice(nombres)
+        cargo = _ponderado(rnd, CARGOS)
+        username = siguiente_username(base_username(primer_nombre, primer_apellido),
+                                      segundo_apellido, self.ocupados, self.contadores)
+        self.ocupados.add(username)
+        fecha_registro = (f"{_fecha(rnd, 5 * 365, 0)} "
+                          f"{rnd.randint(8, 18):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}")
+        return {
+            'ci': ci,
+            'primer_apellido': primer_apellido,
+            'segundo_apellido': segundo_apellido,
+            'primer_nombre': primer_nombre,
+            'segundo_nombre': rnd.choice(nombres) if rnd.random() < 0.6 else None,
+            'tipo_identificacion': 'CI',
+            'estado': _ponderado(rnd, ESTADOS),
+            'fecha_registro': fecha_registro,
+            'nro_item': str(rnd.randint(1, 9999)),
+            'administracion': _ponderado(rnd, ADMINISTRACIONES),
+            'jerarquia': JERARQUIAS.get(cargo, 'Operativo'),
+            'unidad_organizacional': _ponderado(rnd, UNIDADES),
+            'cargo': cargo,
+            'puesto': f"{cargo} {rnd.randint(1, 20)}",
+            'usuario_aplicacion': username,
+            'correo_interno': f"{username}@{DOMINIO_CORREO}",
+            'rol': 'jefe' if cargo in JERARQUIAS else 'funcionario',
+            'genero': genero,
+        }
+
+    def filas_hijas(self, datos):
+        """{tabla: [valores]} de la ficha; los pendientes aún no la completaron"""
+        rnd = self.rnd
+        filas = {tabla: [] for tabla in COLUMNAS}
+        if datos['estado'] == 'pendiente':
+            return filas
+
+        genero = datos['genero']
+        filas['datos_adicionales'].append([
+            genero, rnd.choice(DEPARTAMENTOS), _fecha(rnd, 65 * 365, 19 * 365), rnd.choice(PAISES),
+            rnd.choice(DEPARTAMENTOS), 'Capital', f"LM-{rnd.randint(100000, 999999)}" if genero == 'M' else None,
+            rnd.choice(GESTORAS), str(rnd.randint(10000000, 99999999)), rnd.choice(TIPOS_SANGRE),
+            _fecha(rnd, -30, -3650), rnd.choice(ESTADO_CIVIL), rnd.randint(0, 4), rnd.randint(0, 3),
+            f"Calle {rnd.randint(1, 80)}", str(rnd.randint(1, 3000)), f"Zona {rnd.choice(APELLIDOS).title()}",
+            'La Paz', f"{datos['usuario_aplicacion']}@correo.bo", f"7{rnd.randint(0, 9999999):07d}"])
+
+        for _ in range(rnd.randint(0, 8)):
+            filas['parientes'].append([
+                rnd.choice(PARENTESCOS), rnd.choice(APELLIDOS), rnd.choice(APELLIDOS),
+                rnd.choice(NOMBRES_M + NOMBRES_F), rnd.choice(NACIONALIDADES), f"7{rnd.randint(0, 9999999):07d}",
+                rnd.choice('MF'), _fecha(rnd, 90 * 365, 0), 'CI', str(rnd.randint(1000000, 9999999))])
+
+        for _ in range(rnd.randint(1, 4)):
+            inicio = rnd.randint(365 * 2, 365 * 30)
+            filas['formacion_academica'].append([
+                rnd.choice(PAISES), rnd.choice(['Concluido', 'Concluido', 'En curso']), rnd.choice(NIVELES),
+                rnd.choice(['Ciencias Sociales', 'Ingeniería', 'Salud', 'Económicas']),
+                rnd.choice(['Pública', 'Privada']), rnd.choice(INSTITUCIONES), rnd.choice(INSTITUCIONES),
+                rnd.choice(CARRERAS), rnd.choice(['SI', 'SI', 'NO']), _fecha(rnd, inicio, inicio),
+                _fecha(rnd, inicio - 365, max(inicio - 365 * 5, 0)),
+                str(rnd.randint(1000, 99999))])
+
+        filas['bachillerato'].append(['SI', rnd.randint(1975, 2015), f"U.E. {rnd.choice(APELLIDOS).title()}",
+                                      '6to de secundaria'])
+
+        for _ in range(rnd.randint(0, 6)):
+            inicio = rnd.randint(60, 365 * 10)
+            filas['cursos'].append([
+                rnd.choice(NIVELES[:2]), rnd.choice(['Gestión', 'Tecnología', 'Legal', 'Salud']),
+                rnd.choice(CURSOS), rnd.choice(['Pública', 'Privada']), rnd.choice(INSTITUCIONES),
+                rnd.choice([20, 40, 60, 80, 120]), _fecha(rnd, inicio, inicio),
+                _fecha(rnd, inicio - 1, max(inicio - 60, 0)),
+                rnd.choice(PAISES), rnd.choice(DEPARTAMENTOS), rnd.choice(['SI', 'NO'])])
+
+        filas['idiomas'].append(['CASTELLANO', 'Avanzado', 'Avanzado', 'Avanzado'])
+        for idioma in rnd.sample(IDIOMAS, rnd.randint(0, 2)):
+            filas['idiomas'].append([idioma, rnd.choice(NIVELES_IDIOMA), rnd.choice(NIVELES_IDIOMA),
+                                     rnd.choice(NIVELES_IDIOMA)])
+
+        for _ in range(rnd.randint(0, 4)):
+            inicio = rnd.randint(365 * 2, 365 * 25)
+            filas['experiencia_laboral'].append([
+                rnd.choice(ENTIDADES), rnd.choice(UNIDADES)[0], rnd.choice(['Pública', 'Privada']),
+                _ponderado(rnd, CARGOS), _fecha(rnd, inicio, inicio), _fecha(rnd, inicio - 180, 365),
+                rnd.choice(['Convocatoria', 'Invitación directa', 'Designación']),
+                rnd.choice(['Renuncia', 'Conclusión de contrato', 'Traslado']),
+                rnd.randint(3000, 15000), 'BOL'])
+
+        if rnd.random() < 0.2:
+            for _ in range(rnd.randint(1, 2)):
+                inicio = rnd.randint(30, 365 * 8)
+                filas['capacitaciones_impartidas'].append([
+                    rnd.choice(['Pública', 'Privada']), rnd.choice(INSTITUCIONES),
+                    rnd.choice(['Taller', 'Curso', 'Seminario']), rnd.choice(CURSOS),
+                    rnd.choice([4, 8, 16, 40]), _fecha(rnd, inicio, inicio), _fecha(rnd, inicio, max(inicio - 5, 0))])
+
+        for tipo in rnd.sample(TIPOS_DOCUMENTO, rnd.randint(0, 3)):
+            nombre = f"{datos['ci']}_{tipo.lower().replace(' ', '_')}.pdf"
+            filas['documentos'].append([tipo, nombre, f"uploads/{datos['ci']}/{nombre}"])
+        return filas
+
+
+def generar(db, funcionarios=1000, semilla=42, lote=2000, costo=8, procesos=None, progreso=None):
+    """Llenar `db` (Database sin funcionarios) y devolver filas insertadas por tabla"""
+    with db.conexion() as conn:
+        if conn.execute("SELECT 1 FROM funcionarios LIMIT 1").fetchone():
+            raise ValueError("La base ya tiene funcionarios; el generador espera una base nueva")
+
+    generador = GeneradorDatos(semilla)
+    servicio_hash = ServicioHash(costo=costo, procesos=procesos)
+    resumen = {'funcionarios': 0, 'usuarios': 0, 'auditoria': 0, **{tabla: 0 for tabla in COLUMNAS},
+               'segundos': 0.0}
+    inicio = time.monotonic()
+    try:
+        for desde in range(0, funcionarios, lote):
+            registros = [generador.funcionario(i) for i in range(desde, min(desde + lote, funcionarios))]
+            hijas = [generador.filas_hijas(datos) for datos in registros]
+            hashes = servicio_hash.hash_lote(datos['ci'] for datos in registros)  # Contraseña inicial = CI
+
+            with db.conexion() as conn:
+                conn.executemany(f"""
+                    INSERT INTO funcionarios ({', '.join(COLUMNAS_FUNCIONARIO)})
+                    VALUES ({', '.join(['?'] * len(COLUMNAS_FUNCIONARIO))})
+                """, ([datos[campo] for campo in COLUMNAS_FUNCIONARIO] for datos in registros))
+                conn.executemany("""
+                    INSERT INTO usuarios (ci, username, email, password_hash, rol, activo, fecha_creacion)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, ((datos['ci'], datos['usuario_aplicacion'], datos['correo_interno'], password_hash,
+                       datos['rol'], int(datos['estado'] != 'baja'), datos['fecha_registro'])
+                      for datos, password_hash in zip(registros, hashes)))
+
+                ids = dict(conn.execute("SELECT ci, id FROM funcionarios WHERE ci BETWEEN ? AND ?",
+                                        (registros[0]['ci'], registros[-1]['ci'])).fetchall())
+                for tabla, columnas in COLUMNAS.items():
+                    valores = [[ids[datos['ci']]] + fila for datos, filas in zip(registros, hijas)
+                               for fila in filas[tabla]]
+                    conn.executemany(f"""
+                        INSERT INTO {tabla} (funcionario_id, {', '.join(columnas)})
+                        VALUES ({', '.join(['?'] * (len(columnas) + 1))})
+                    """, valores)
+                    resumen[tabla] += len(valores)
+
+                # Eventos de auditoría de quienes ya completaron la ficha
+                eventos = [(datos['ci'], 'login', None, datos['fecha_registro'])
+                           for datos in registros if datos['estado'] != 'pendiente']
+                conn.executemany("""
+                    INSERT INTO auditoria (usuario_id, accion, detalle, fecha)
+                    SELECT id, ?, ?, ? FROM usuarios WHERE ci = ?
+                """, ((accion, detalle, fecha, ci) for ci, accion, detalle, fecha in eventos))
+                resumen['auditoria'] += len(eventos)
+
+            resumen['funcionarios'] += len(registros)
+            resumen['usuarios'] += len(registros)
+            resumen['segundos'] = time.monotonic() - inicio
+            if progreso:
+                progreso(resumen)
+    finally:
+        servicio_hash.cerrar()
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--funcionarios', type=int, default=1000)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--lote', type=int, default=2000, help='Funcionarios por transacción')
+    parser.add_argument('--costo', type=int, default=8, help='Costo scrypt de los hashes generados')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos para hashear (0 = sin pool)')
+    parser.add_argument('--db', default='instance/talento.db', help='Ruta de la base de datos (nueva)')
+    args = parser.parse_args()
+
+    def mostrar_progreso(resumen):
+        print(f"\r⏳ {resumen['funcionarios']}/{args.funcionarios} funcionarios | "
+              f"{resumen['segundos']:.1f}s", end='', flush=True)
+
+    db = Database(args.db, intervalo_escritura=0, intervalo_checkpoint=0)
+    try:
+        resumen = generar(db, args.funcionarios, args.semilla, args.lote, args.costo, args.procesos,
+                          progreso=mostrar_progreso)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.cerrar()
+    print()
+    for tabla, cantidad in resumen.items():
+        if tabla != 'segundos':
+            print(f"  {tabla:<28}{cantidad:>10}")
+    print(f"✅ Datos generados en {resumen['segundos']:.1f}s: {args.db}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Verificación de planes de consulta de las lecturas frecuentes.
+
+Crea una base temporal con el esquema completo (migraciones incluidas),
+llama a los métodos de Database que sirven las pantallas principales y
+revisa con EXPLAIN QUERY PLAN cada SELECT que ejecutan: el SQL sale de los
+propios métodos (capturado con la instrumentación de métricas), no de una
+copia que pueda quedar desactualizada. Termina con código 1 si alguna
+consulta recorre una tabla completa (SCAN sin índice), para poder usarlo
+en CI.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.planes_consulta
+"""
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+
+from database import Database
+from metricas import Metricas
+
+
+class CapturaSQL(Metricas):
+    """Métricas que además guardan cada SELECT ejecutado con sus parámetros"""
+
+    def __init__(self):
+        super().__init__()
+        self.sentencias = []
+
+    def registrar_sql(self, sql, duracion, conn=None, params=(), inicio_escritura=False):
+        if sql.lstrip()[:6].upper() in ('SELECT', 'WITH'):
+            self.sentencias.append((sql, tuple(params)))
+
+
+def _cursor(orden, valor, fila_id=10):
+    return Database._codificar_cursor({orden: valor, 'id': fila_id}, orden)
+
+
+# Lecturas que se ejecutan en cada petición de las pantallas principales
+CONSULTAS_FRECUENTES = {
+    'usuario por username': lambda db: db.get_usuario_by_username('admin'),
+    'usernames por prefijo': lambda db: db.get_usernames_con_prefijo('juan.perez'),
+    'usuario por ci': lambda db: db.get_usuario_by_ci('0'),
+    'funcionario por ci': lambda db: db.get_funcionario_by_ci('0'),
+    'listado por fecha': lambda db: db.listar_funcionarios(),
+    'listado filtrado por estado': lambda db: db.listar_funcionarios(
+        estado='activo', despues=_cursor('fecha_registro', '2025-01-01')),
+    'listado filtrado por unidad': lambda db: db.listar_funcionarios(unidad='SISTEMAS'),
+    'listado filtrado por cargo': lambda db: db.listar_funcionarios(cargo='TECNICO'),
+    'listado por apellido': lambda db: db.listar_funcionarios(
+        orden='primer_apellido', despues=_cursor('primer_apellido', 'PEREZ')),
+    'listado hacia atras': lambda db: db.listar_funcionarios(antes=_cursor('fecha_registro', '2025-01-01')),
+    'datos adicionales': lambda db: db.get_datos_adicionales(1),
+    'parientes': lambda db: db.get_parientes(1),
+    'formacion academica': lambda db: db.get_formacion_academica(1),
+    'ficha completa': lambda db: db.get_fichas_completas([1]),
+    'documentos': lambda db: db.get_documentos(1),
+    'estadisticas del dashboard': lambda db: db.get_estadisticas('total'),
+    'busqueda de texto completo': lambda db: db.buscar_funcionarios('perez'),
+    'sugerencias por ci': lambda db: db.sugerir_funcionarios('10'),
+    'sugerencias por apellido': lambda db: db.sugerir_funcionarios('per'),
+    'progreso de ficha': lambda db: db.calcular_progreso_funcionarios([1, 2]),
+}
+
+# "SCAN tabla" sin "USING ... INDEX" es un recorrido completo de la tabla
+SCAN_COMPLETO = re.compile(r'^SCAN (\w+)$')
+# ...salvo que "tabla" sea una subconsulta (recorre solo las filas que ella produjo)
+SUBCONSULTA = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\w+)$')
+
+
+def revisar(db, captura):
+    """Devolver {nombre: plan} de las consultas que hacen SCAN completo"""
+    fallidas = {}
+    for nombre, consulta in CONSULTAS_FRECUENTES.items():
+        captura.sentencias.clear()
+        consulta(db)
+        if not captura.sentencias:
+            raise RuntimeError(f"{nombre}: el método no ejecutó ningún SELECT")
+        for query, params in captura.sentencias:
+            plan = db.plan_consulta(query, params)
+            subconsultas = {m.group(1) for m in map(SUBCONSULTA.match, plan) if m}
+            if any(m.group(1) not in subconsultas for m in map(SCAN_COMPLETO.match, plan) if m):
+                fallidas.setdefault(nombre, []).extend(plan)
+    return fallidas
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directorio:
+        captura = CapturaSQL()
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(os.path.join(directorio, 'talento.db'), intervalo_checkpoint=0,
+                          metricas=captura)
+        fallidas = revisar(db, captura)
+        db.cerrar()
+
+    for nombre, plan in fallidas.items():
+        print(f"❌ {nombre}: {' | '.join(plan)}")
+    if fallidas:
+        return 1
+    print(f"✅ {len(CONSULTAS_FRECUENTES)} lecturas frecuentes usan índices")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
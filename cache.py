@@ -0,0 +1,182 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheCatalogos:
+    """Caché en memoria de las tablas parametros_* (catálogos)
+
+    Todos los catálogos se cargan juntos con una sola consulta y se guardan
+    como listas (para los dropdowns) y como diccionarios código -> nombre.
+    Se invalida al incrementar la versión (cuando se edita un catálogo en
+    este proceso) o al vencer el TTL (cambios hechos por otros procesos).
+    """
+
+    def __init__(self, cargar, ttl=300):
+        self._cargar = cargar  # Función que devuelve {tipo: [{'codigo', 'nombre'}]}
+        self.ttl = ttl
+        self.version = 0
+        self._lock = threading.Lock()
+        self._listas = None
+        self._mapas = None
+        self._version_cargada = -1
+        self._vence = 0
+
+    def _vigente(self):
+        return (self._listas is not None
+                and self._version_cargada == self.version
+                and time.monotonic() < self._vence)
+
+    def _asegurar_cargado(self):
+        """Recargar los catálogos si la copia en memoria no es vigente"""
+        if self._vigente():
+            return
+        with self._lock:
+            if self._vigente():
+                return
+            version = self.version
+            listas = self._cargar()
+            self._mapas = {
+                tipo: {fila['codigo']: fila['nombre'] for fila in filas}
+                for tipo, filas in listas.items()
+            }
+            self._listas = listas
+            self._version_cargada = version
+            self._vence = time.monotonic() + self.ttl
+
+    def invalidar(self):
+        """Descartar la copia en memoria (se recarga en el próximo acceso)"""
+        with self._lock:
+            self.version += 1
+
+    def get_todos(self):
+        """Todos los catálogos {tipo: [filas]} (tratar como solo lectura)"""
+        self._asegurar_cargado()
+        return self._listas
+
+    def get_mapa(self, tipo):
+        """Diccionario código -> nombre de un catálogo"""
+        self._asegurar_cargado()
+        return self._mapas.get(tipo, {})
+
+
+class CacheFichas:
+    """Caché LRU de fichas armadas, por funcionario_id y versión de ficha
+
+    Cada escritura sobre la ficha incrementa funcionarios.version_ficha, así
+    que una entrada guardada con otra versión nunca se entrega. Las fichas
+    se guardan como JSON (cada lectura recibe su propia copia) y se
+    descartan por tamaño (LRU) o por TTL. Con `ruta_compartida` se usa
+    además un archivo SQLite local como segundo nivel compartido entre los
+    workers de la misma máquina.
+    """
+
+    def __init__(self, capacidad=1000, ttl=300, ruta_compartida=None):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.ruta_compartida = ruta_compartida
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # funcionario_id -> (version, vence, json)
+        self._lock_compartida = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._contadores = {'aciertos': 0, 'aciertos_compartidos': 0, 'fallos': 0,
+                            'desalojos': 0, 'vencidas': 0, 'obsoletas': 0}
+
+    def _contar(self, nombre):
+        with self._lock:
+            self._contadores[nombre] += 1
+
+    def obtener(self, funcionario_id, version):
+        """Ficha guardada para esa versión, o None si no hay una vigente"""
+        with self._lock:
+            entrada = self._entradas.get(funcionario_id)
+            if entrada is not None:
+                version_guardada, vence, datos = entrada
+                if version_guardada == version and time.monotonic() < vence:
+                    self._entradas.move_to_end(funcionario_id)
+                    self._contadores['aciertos'] += 1
+                    return json.loads(datos)
+                del self._entradas[funcionario_id]
+                self._contadores['obsoletas' if version_guardada != version else 'vencidas'] += 1
+
+        datos = self._leer_compartida(funcionario_id, version)
+        if datos is not None:
+            self._guardar_local(funcionario_id, version, datos)
+            self._contar('aciertos_compartidos')
+            return json.loads(datos)
+
+        self._contar('fallos')
+        return None
+
+    def guardar(self, funcionario_id, version, ficha):
+        """Guardar la ficha armada para esa versión"""
+        datos = json.dumps(ficha, ensure_ascii=False)
+        self._guardar_local(funcionario_id, version, datos)
+        self._escribir_compartida(funcionario_id, version, datos)
+
+    def _guardar_local(self, funcionario_id, version, datos):
+        with self._lock:
+            self._entradas[funcionario_id] = (version, time.monotonic() + self.ttl, datos)
+            self._entradas.move_to_end(funcionario_id)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self._contadores['desalojos'] += 1
+
+    def _compartida(self):
+        """Conexión al archivo compartido (una por proceso, se reabre tras fork)"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.ruta_compartida, timeout=1, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fichas (
+                    funcionario_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    vence REAL NOT NULL,
+                    datos TEXT NOT NULL
+                )
+            """)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _leer_compartida(self, funcionario_id, version):
+        if not self.ruta_compartida:
+            return None
+        try:
+            with self._lock_compartida:
+                fila = self._compartida().execute(
+                    "SELECT datos FROM fichas WHERE funcionario_id = ? AND version = ? AND vence > ?",
+                    (funcionario_id, version, time.time())).fetchone()
+        except sqlite3.Error:
+            return None  # La caché compartida es opcional: ante errores se lee de la base
+        return fila[0] if fila else None
+
+    def _escribir_compartida(self, funcionario_id, version, datos):
+        if not self.ruta_compartida:
+            return
+        try:
+            with self._lock_compartida:
+                conn = self._compartida()
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO fichas VALUES (?, ?, ?, ?)",
+                                 (funcionario_id, version, time.time() + self.ttl, datos))
+        except sqlite3.Error:
+            pass
+
+    def limpiar(self):
+        """Vaciar la caché local"""
+        with self._lock:
+            self._entradas.clear()
+
+    def metricas(self):
+        """Contadores de aciertos, fallos y desalojos, y entradas actuales"""
+        with self._lock:
+            metricas = dict(self._contadores, entradas=len(self._entradas))
+        consultas = metricas['aciertos'] + metricas['aciertos_compartidos'] + metricas['fallos']
+        metricas['tasa_aciertos'] = ((metricas['aciertos'] + metricas['aciertos_compartidos']) / consultas
+                                     if consultas else 0.0)
+        return metricas
@@ -1,496 +1,600 @@
 import sqlite3
 import os
-import hashlib  # <-- AÑADE ESTO
+import base64
+import json
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+import migraciones
+from cache import CacheCatalogos, CacheFichas
+from escritura_diferida import BufferEscritura
+from hashing import calcular_hash
+from metricas import CursorInstrumentado
+
+
+class ConexionPool(sqlite3.Connection):
+    """Conexión SQLite que vuelve al pool al cerrarse"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.devuelta = False  # True mientras espera libre en el pool
+        self.ultimo_uso = time.monotonic()
+
+    def close(self):
+        """Devolver la conexión al pool en lugar de cerrarla"""
+        if self.devuelta:
+            return  # Un segundo close() no debe cerrar una conexión que ya está en el pool
+        if self.pool is not None:
+            self.pool.devolver(self)
+        else:
+            super().close()
+
+    def cerrar_definitivamente(self):
+        """Cerrar la conexión real con SQLite"""
+        self.pool = None
+        super().close()
+
+
+class ConexionInstrumentada(ConexionPool):
+    """Conexión del pool que registra cada sentencia en `metricas`
+
+    Solo se usa cuando la instrumentación está activa; sin métricas el
+    pool crea conexiones ConexionPool sin ningún envoltorio.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = None
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, params):
+        return self.cursor().executemany(sql, params)
+
+    def commit(self):
+        inicio = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self.metricas.observar('talento_sql_commit_segundos', time.perf_counter() - inicio,
+                                   ayuda='Duración de los commits')
+
+
+class PoolConexiones:
+    """Pool de conexiones SQLite reutilizables entre peticiones"""
+
+    def __init__(self, db_path, tamano=5, pragmas=None, verificar_tras=30, metricas=None):
+        self.db_path = db_path
+        self.metricas = metricas
+        self.tamano = tamano
+        self.pragmas = pragmas or {}
+        self.verificar_tras = verificar_tras  # Segundos inactiva antes de verificar
+        self._libres = queue.LifoQueue(maxsize=tamano)
+        self._lock = threading.Lock()
+        self._cerrado = False
+
+    def _crear(self):
+        """Abrir una conexión nueva y aplicar los pragmas una sola vez"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               factory=ConexionInstrumentada if self.metricas else ConexionPool)
+        if self.metricas:
+            conn.metricas = self.metricas
+        conn.row_factory = sqlite3.Row  # Para acceso por nombre de columna
+        for pragma, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {valor}")
+        return conn
+
+    def _es_valida(self, conn):
+        """Verificar que una conexión inactiva siga respondiendo"""
+        if time.monotonic() - conn.ultimo_uso < self.verificar_tras:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def obtener(self):
+        """Tomar una conexión libre del pool o crear una nueva"""
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                conn = self._crear()
+                break
+            if self._es_valida(conn):
+                break
+            conn.cerrar_definitivamente()
+
+        conn.pool = self
+        conn.devuelta = False
+        return conn
+
+    def devolver(self, conn):
+        """Regresar una conexión al pool (o cerrarla si el pool está lleno)"""
+        conn.pool = None
+        conn.devuelta = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()  # Descartar cambios no confirmados
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            conn.cerrar_definitivamente()
+            return
+
+        conn.ultimo_uso = time.monotonic()
+        with self._lock:
+            if not self._cerrado:
+                try:
+                    self._libres.put_nowait(conn)
+                    return
+                except queue.Full:
+                    pass
+        conn.cerrar_definitivamente()
+
+    def cerrar(self):
+        """Cerrar todas las conexiones libres del pool"""
+        with self._lock:
+            self._cerrado = True
+            while True:
+                try:
+                    self._libres.get_nowait().cerrar_definitivamente()
+                except queue.Empty:
+                    break
+
+
+# Columnas de las tablas con varias filas por funcionario (sin id ni funcionario_id)
+COLUMNAS_FILAS = {
+    'parientes': [
+        'parentesco', 'primer_apellido', 'segundo_apellido', 'nombres',
+        'nacionalidad', 'telefono', 'genero', 'fecha_nacimiento',
+        'tipo_identificacion', 'numero_identificacion'
+    ],
+    'formacion_academica': [
+        'pais_estudio', 'estado_instruccion', 'nivel_instruccion', 'area',
+        'tipo_entidad_academica', 'institucion_academica', 'nombre_institucion',
+        'carrera', 'titulado', 'documento_respaldo', 'detalle_documento',
+        'fecha_inicio', 'fecha_final', 'nro_titulo_academico', 'fecha_emision_titulo'
+    ],
+    'cursos': [
+        'nivel_instruccion', 'area', 'nombre_curso', 'tipo_entidad_academica',
+        'institucion_academica', 'nro_horas', 'fecha_inicio', 'fecha_final',
+        'documento_respaldo', 'detalle_documento', 'pais_estudio',
+        'depto_estudio', 'capacitacion'
+    ],
+    'idiomas': ['idioma', 'habla', 'escribe', 'lee'],
+}
+
+
+def sql_insertar_fila(tabla):
+    """INSERT con todas las columnas de una tabla de COLUMNAS_FILAS"""
+    campos = ['funcionario_id'] + COLUMNAS_FILAS[tabla]
+    return f"INSERT INTO {tabla} ({', '.join(campos)}) VALUES ({', '.join(['?'] * len(campos))})"
+
+
+def valores_fila(tabla, funcionario_id, datos):
+    """Valores en el orden de sql_insertar_fila (None si el campo falta)"""
+    return [funcionario_id] + [datos.get(campo) for campo in COLUMNAS_FILAS[tabla]]
+
+
+# Toda escritura sobre la ficha de un funcionario incrementa su versión
+# (la caché de fichas no entrega entradas de otra versión)
+SQL_NUEVA_VERSION_FICHA = "UPDATE funcionarios SET version_ficha = version_ficha + 1 WHERE id = ?"
+
+
+class UnidadDeTrabajo:
+    """Cambios de un formulario del funcionario aplicados en una sola transacción
+
+    Acumula inserciones, eliminaciones y actualizaciones en memoria y las
+    escribe juntas con executemany al salir del bloque `with` (un solo
+    commit). Si el bloque lanza una excepción no se escribe nada.
+
+        with db.unidad_de_trabajo(funcionario_id) as cambios:
+            cambios.insertar('parientes', pariente)
+            cambios.eliminar('parientes', pariente_id)
+    """
+
+    def __init__(self, db, funcionario_id):
+        self.db = db
+        self.funcionario_id = funcionario_id
+        self._inserciones = {}    # tabla -> [valores]
+        self._eliminaciones = {}  # tabla -> [(id, funcionario_id)]
+        self._datos_adicionales = None
+        self._bachillerato = None
+        self._estado = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.aplicar()
+        return False
+
+    def insertar(self, tabla, datos):
+        """Agregar una fila nueva (parientes, formacion_academica, cursos, idiomas)"""
+        if tabla not in COLUMNAS_FILAS:
+            raise ValueError(f"Tabla no soportada: {tabla}")
+        self._inserciones.setdefault(tabla, []).append(
+            valores_fila(tabla, self.funcionario_id, datos))
+
+    def eliminar(self, tabla, fila_id):
+        """Eliminar una fila, solo si pertenece a este funcionario"""
+        if tabla not in COLUMNAS_FILAS:
+            raise ValueError(f"Tabla no soportada: {tabla}")
+        self._eliminaciones.setdefault(tabla, []).append((fila_id, self.funcionario_id))
+
+    def guardar_datos_adicionales(self, datos):
+        """Guardar o actualizar la fila de datos adicionales"""
+        self._datos_adicionales = datos
+
+    def guardar_bachillerato(self, datos):
+        """Guardar o actualizar la fila de bachillerato"""
+        self._bachillerato = datos
+
+    def actualizar_estado(self, estado):
+        """Cambiar el estado del funcionario junto con el resto de cambios"""
+        self._estado = estado
+
+    def aplicar(self):
+        """Escribir todos los cambios acumulados en una transacción"""
+        with self.db.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_NUEVA_VERSION_FICHA, (self.funcionario_id,))
+            for tabla, claves in self._eliminaciones.items():
+                cursor.executemany(f"DELETE FROM {tabla} WHERE id = ? AND funcionario_id = ?", claves)
+            if self._datos_adicionales is not None:
+                self.db._upsert_datos_adicionales(cursor, self.funcionario_id, self._datos_adicionales)
+            if self._bachillerato is not None:
+                self.db._upsert_bachillerato(cursor, self.funcionario_id, self._bachillerato)
+            for tabla, filas in self._inserciones.items():
+                cursor.executemany(sql_insertar_fila(tabla), filas)
+            if self._estado is not None:
+                cursor.execute("UPDATE funcionarios SET estado = ? WHERE id = ?",
+                               (self._estado, self.funcionario_id))
+
+        self._inserciones.clear()
+        self._eliminaciones.clear()
+        self._datos_adicionales = self._bachillerato = self._estado = None
+
+
+DOMINIO_CORREO = 'gobierno.talento.bo'
+
+
+def base_username(primer_nombre, primer_apellido):
+    """Nombre de usuario base: nombre.apellido en minúsculas"""
+    return f"{primer_nombre.lower()}.{primer_apellido.lower()}"
+
+
+def siguiente_username(base, segundo_apellido, ocupados, contadores=None):
+    """Primer nombre de usuario libre: base, luego base.inicial, luego base1, base2...
+
+    `ocupados` es el conjunto de usernames ya tomados que empiezan con `base`.
+    `contadores` (opcional) guarda el último sufijo numérico usado por cada
+    base, para no recorrer desde 1 cuando muchos funcionarios comparten nombre.
+    """
+    if base not in ocupados:
+        return base
+    if segundo_apellido:
+        candidato = f"{base}.{segundo_apellido[0].lower()}"
+        if candidato not in ocupados:
+            return candidato
+    contadores = {} if contadores is None else contadores
+    contador = contadores.get(base, 0) + 1
+    while f"{base}{contador}" in ocupados:
+        contador += 1
+    contadores[base] = contador
+    return f"{base}{contador}"
+
+
+# Estados que puede tener un funcionario (en el orden en que se muestran)
+ESTADOS_FUNCIONARIO = ['pendiente', 'en_proceso', 'activo', 'inactivo', 'baja']
+
+# Conteos por estado materializados en estadisticas_estado: 'total' (valor
+# vacío) y desgloses por columna de funcionarios (ver migración 0006)
+DIMENSIONES_ESTADISTICAS = ['total', 'unidad_organizacional', 'administracion']
+
+# Peso de cada columna del índice busqueda_funcionarios en el ranking bm25
+# (nombres, ci, cargo, unidad, formacion; ver migración 0007)
+PESOS_BUSQUEDA = [10.0, 10.0, 3.0, 2.0, 1.0]
+
+
 class Database:
-    def __init__(self, db_path='instance/talento.db'):
+    # Perfiles de almacenamiento: pragmas aplicados una sola vez al abrir
+    # cada conexión del pool
+    PERFILES_ALMACENAMIENTO = {
+        # Modo por defecto de SQLite (rollback journal): un commit bloquea lectores
+        'clasico': {
+            'journal_mode': 'DELETE',
+            'synchronous': 'FULL',
+            'busy_timeout': 5000,
+            'temp_store': 'MEMORY',
+        },
+        # WAL: lectores y escritor trabajan en paralelo, fsync solo en checkpoint
+        'wal': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024,  # 256MB
+            'cache_size': -16000,            # ~16MB por conexión
+            'temp_store': 'MEMORY',
+        },
+    }
+
+    # Catálogos disponibles (tablas parametros_<tipo>)
+    TIPOS_PARAMETROS = ['genero', 'departamentos', 'paises', 'estado_civil',
+                        'tipo_sangre', 'gestora', 'parentesco', 'nacionalidad']
+
+    def __init__(self, db_path='instance/talento.db', pool_size=5, perfil='wal',
+                 pragmas=None, intervalo_checkpoint=60, catalogos_ttl=300,
+                 intervalo_escritura=0.5, fichas_capacidad=1000, fichas_ttl=300,
+                 fichas_compartidas=None, metricas=None):
+        if perfil not in self.PERFILES_ALMACENAMIENTO:
+            raise ValueError(f"Perfil de almacenamiento desconocido: {perfil}")
+
         self.db_path = db_path
+        self.perfil = perfil
+        self.pragmas = dict(self.PERFILES_ALMACENAMIENTO[perfil], **(pragmas or {}))
+        self.metricas = metricas
+        self.pool = PoolConexiones(db_path, tamano=pool_size, pragmas=self.pragmas, metricas=metricas)
+        self.catalogos = CacheCatalogos(self._cargar_parametros, ttl=catalogos_ttl)
+        self._columnas_ficha = None  # Columnas de las tablas de la ficha (ver _sql_ficha_completa)
+        self.fichas = CacheFichas(capacidad=fichas_capacidad, ttl=fichas_ttl,
+                                  ruta_compartida=fichas_compartidas)
         self.init_db()
+        self._cerrada = False
+        self._preparada_fork = False
+
+        # Último acceso y auditoría se escriben en diferido, en lotes
+        self.escrituras = BufferEscritura(self, intervalo=intervalo_escritura)
+
+        if metricas:
+            metricas.agregar_recolector(self._valores_metricas)
+
+        # Checkpoint periódico del WAL en segundo plano
+        self.intervalo_checkpoint = intervalo_checkpoint
+        self._iniciar_checkpoint()
+
+    def _iniciar_checkpoint(self):
+        self._detener_checkpoint = threading.Event()
+        self._hilo_checkpoint = None
+        if self.pragmas['journal_mode'].upper() == 'WAL' and self.intervalo_checkpoint:
+            self._hilo_checkpoint = threading.Thread(
+                target=self._checkpoint_periodico, args=(self.intervalo_checkpoint,),
+                name='talento-checkpoint', daemon=True)
+            self._hilo_checkpoint.start()
+
+    def _detener_hilos(self):
+        """Escribir lo pendiente y detener los hilos de fondo"""
+        self.escrituras.cerrar()
+        self._detener_checkpoint.set()
+        if self._hilo_checkpoint is not None:
+            self._hilo_checkpoint.join()
+            self._hilo_checkpoint = None
+            self.checkpoint('TRUNCATE')
+
+    def preparar_fork(self):
+        """Antes de crear procesos hijos (servidor con preload): sin hilos ni conexiones abiertas
+
+        SQLite no admite usar en el hijo una conexión abierta antes del fork y
+        los hilos no sobreviven al fork, así que el proceso padre los detiene.
+        """
+        if self._preparada_fork:
+            return
+        self._preparada_fork = True
+        self._detener_hilos()
+        self.pool.cerrar()
+
+    def reiniciar_tras_fork(self):
+        """En el proceso hijo: pool, escritura diferida y checkpoint propios"""
+        self._preparada_fork = False
+        self.pool = PoolConexiones(self.db_path, tamano=self.pool.tamano, pragmas=self.pragmas,
+                                   metricas=self.metricas)
+        self.escrituras = BufferEscritura(self, intervalo=self.escrituras.intervalo)
+        self._iniciar_checkpoint()
     
     def get_connection(self):
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Para acceso por nombre de columna
-        return conn
+        """Obtener conexión a la base de datos (desde el pool)"""
+        if self.metricas:
+            self.metricas.registrar_conexion()
+        return self.pool.obtener()
+
+    def _valores_metricas(self):
+        """Valores instantáneos del pool, la escritura diferida y las cachés"""
+        escrituras = self.escrituras.metricas()
+        fichas = self.fichas.metricas()
+        return [
+            ('talento_pool_conexiones_libres', 'Conexiones libres en el pool',
+             {(): self.pool._libres.qsize()}),
+            ('talento_escritura_pendientes', 'Escrituras diferidas en espera',
+             {(): escrituras['pendientes']}),
+            ('talento_escritura_vaciado_ms', 'Duración de los vaciados de escrituras diferidas',
+             {(('medida', 'ultimo'),): escrituras['ultimo_vaciado_ms'],
+              (('medida', 'maximo'),): escrituras['max_vaciado_ms'],
+              (('medida', 'promedio'),): escrituras['promedio_vaciado_ms']}),
+            ('talento_escritura_eventos', 'Totales de la escritura diferida',
+             {(('tipo', clave),): escrituras[clave]
+              for clave in ('vaciados', 'filas_escritas', 'errores', 'eventos_descartados')}),
+            ('talento_cache_fichas', 'Contadores y tamaño de la caché de fichas',
+             {(('tipo', clave),): valor for clave, valor in fichas.items()}),
+        ]
+
+    @contextmanager
+    def conexion(self):
+        """Conexión del pool que confirma al salir o revierte si hay error"""
+        conn = self.get_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def checkpoint(self, modo='PASSIVE'):
+        """Copiar las páginas del WAL a la base de datos principal"""
+        conn = self.get_connection()
+        try:
+            return tuple(conn.execute(f"PRAGMA wal_checkpoint({modo})").fetchone())
+        finally:
+            conn.close()
+
+    def _checkpoint_periodico(self, intervalo):
+        """Hilo que ejecuta checkpoints PASSIVE cada `intervalo` segundos"""
+        while not self._detener_checkpoint.wait(intervalo):
+            try:
+                self.checkpoint()
+            except sqlite3.Error as e:
+                print(f"⚠️ Error en checkpoint WAL: {e}")
+
+    def cerrar(self):
+        """Escribir lo pendiente, detener el checkpoint y cerrar el pool"""
+        if self._cerrada:
+            return
+        self._cerrada = True
+        self._detener_hilos()
+        self.pool.cerrar()
     
     def hash_password(self, password):
         """Función para hashear contraseñas"""
-        salt = "talento_humano_2025"
-        return hashlib.sha256((password + salt).encode()).hexdigest()
+        return calcular_hash(password)
     
     def init_db(self):
-        """Inicializar base de datos con tablas necesarias"""
-        # Crear directorio instance si no existe
-        os.makedirs('instance', exist_ok=True)
-        
+        """Llevar el esquema a la última migración (ver paquete migraciones)
+
+        Con el esquema al día solo se lee PRAGMA user_version; el bloqueo de
+        archivo y las transacciones se usan únicamente si hay pendientes.
+        """
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Tabla de usuarios
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ci TEXT UNIQUE NOT NULL,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            rol TEXT NOT NULL DEFAULT 'funcionario',
-            activo INTEGER DEFAULT 1,
-            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            ultimo_acceso TIMESTAMP
-        )
-        ''')
-        
-        # Tabla de funcionarios (según documento R-100)
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS funcionarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ci TEXT UNIQUE NOT NULL,
-            primer_apellido TEXT NOT NULL,
-            segundo_apellido TEXT,
-            tercer_apellido TEXT,
-            primer_nombre TEXT NOT NULL,
-            segundo_nombre TEXT,
-            tercer_nombre TEXT,
-            tipo_identificacion TEXT DEFAULT 'CI',
-            
-            -- Campos básicos del sistema
-            estado TEXT DEFAULT 'pendiente',
-            fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            fecha_actualizacion TIMESTAMP,
-            
-            -- === NUEVOS CAMPOS SEGÚN DOCUMENTO R-100 ===
-            -- Datos de resolución
-            nro_resolucion TEXT,
-            fecha_resolucion DATE,
-            fecha_posesion DATE,
-            nro_memorandum_designacion TEXT,
-            fecha_memorandum DATE,
-            
-            -- Datos de ítem
-            nro_item TEXT,
-            administracion TEXT,
-            jerarquia TEXT,
-            depende_de TEXT,
-            unidad_organizacional TEXT,
-            cargo TEXT,
-            puesto TEXT,
-            direccion_oficina TEXT,
-            piso_interno TEXT,
-            
-            -- Archivos (rutas)
-            firma_path TEXT,
-            foto_path TEXT,
-            huella_path TEXT,
-            
-            -- Datos generados
-            usuario_aplicacion TEXT,
-            clave_generada TEXT,
-            correo_interno TEXT
-        )
-        ''')
-        
-        # Tabla para documentos de respaldo
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS documentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            funcionario_id INTEGER NOT NULL,
-            tipo_documento TEXT NOT NULL,
-            nombre_archivo TEXT NOT NULL,
-            ruta_archivo TEXT NOT NULL,
-            fecha_subida TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-        )
-        ''')
-        
-        cursor.execute('''
-    CREATE TABLE IF NOT EXISTS datos_adicionales (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    funcionario_id INTEGER NOT NULL,
-    genero TEXT,
-    expedido_en TEXT,
-    fecha_nacimiento DATE,
-    pais_nacimiento TEXT,
-    depto_nacimiento TEXT,
-    provincia_nacimiento TEXT,
-    lugar_nacimiento TEXT,
-    nro_libreta_militar TEXT,
-    afp TEXT,
-    nro_nua TEXT,
-    tipo_sangre TEXT,
-    fecha_caducidad_ci DATE,
-    estado_civil TEXT,
-    nro_hijos INTEGER DEFAULT 0,
-    nro_dependientes INTEGER DEFAULT 0,
-    direccion_domicilio TEXT,
-    nro_domicilio TEXT,
-    zona_domicilio TEXT,
-    ciudad_localidad TEXT,
-    tipo_vivienda TEXT,
-    nombre_tipo_vivienda TEXT,
-    piso TEXT,
-    depto TEXT,
-    casilla TEXT,
-    correo_electronico1 TEXT,
-    correo_electronico2 TEXT,
-    telefono_fijo1 TEXT,
-    telefono_fijo2 TEXT,
-    telefono_celular1 TEXT,
-    telefono_celular2 TEXT,
-    nro_carrera_administrativa TEXT,
-    fecha_cas DATE,
-    anos_cas INTEGER,
-    meses_cas INTEGER,
-    dias_cas INTEGER,
-    licencia_conducir TEXT,
-    categoria_licencia TEXT,
-    emergencia_contacto TEXT,
-    nro_declaracion_jurada TEXT,
-    fecha_declaracion_jurada DATE,
-    FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-)
-''')
-
-# Tabla para parientes
-        cursor.execute('''
-CREATE TABLE IF NOT EXISTS parientes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    funcionario_id INTEGER NOT NULL,
-    parentesco TEXT,
-    primer_apellido TEXT,
-    segundo_apellido TEXT,
-    nombres TEXT,
-    nacionalidad TEXT,
-    telefono TEXT,
-    genero TEXT,
-    fecha_nacimiento DATE,
-    tipo_identificacion TEXT,
-    numero_identificacion TEXT,
-    FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-)
-''')
-
-# Tabla para formación académica
-        cursor.execute('''
-CREATE TABLE IF NOT EXISTS formacion_academica (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    funcionario_id INTEGER NOT NULL,
-    pais_estudio TEXT,
-    estado_instruccion TEXT,
-    nivel_instruccion TEXT,
-    area TEXT,
-    tipo_entidad_academica TEXT,
-    institucion_academica TEXT,
-    nombre_institucion TEXT,
-    carrera TEXT,
-    titulado TEXT,
-    documento_respaldo TEXT,
-    detalle_documento TEXT,
-    fecha_inicio DATE,
-    fecha_final DATE,
-    nro_titulo_academico TEXT,
-    fecha_emision_titulo DATE,
-    FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-)
-''')
-
-# Tabla para bachillerato
-        cursor.execute('''
-CREATE TABLE IF NOT EXISTS bachillerato (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    funcionario_id INTEGER NOT NULL,
-    es_bachiller TEXT,
-    ano INTEGER,
-    unidad_educativa TEXT,
-    ultimo_curso_vencido TEXT,
-    FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-)
-''')
-
-# Tabla para cursos
-        cursor.execute('''
-CREATE TABLE IF NOT EXISTS cursos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    funcionario_id INTEGER NOT NULL,
-    nivel_instruccion TEXT,
-    area TEXT,
-    nombre_curso TEXT,
-    tipo_entidad_academica TEXT,
-    institucion_academica TEXT,
-    nro_horas INTEGER,
-    fecha_inicio DATE,
-    fecha_final DATE,
-    documento_respaldo TEXT,
-    detalle_documento TEXT,
-    pais_estudio TEXT,
-    depto_estudio TEXT,
-    capacitacion TEXT,
-    FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-)
-''')
-
-# Tabla para idiomas
-        cursor.execute('''
-CREATE TABLE IF NOT EXISTS idiomas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    funcionario_id INTEGER NOT NULL,
-    idioma TEXT,
-    habla TEXT,
-    escribe TEXT,
-    lee TEXT,
-    FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-)
-''')
-
-# Tabla para experiencia laboral
-        cursor.execute('''
-CREATE TABLE IF NOT EXISTS experiencia_laboral (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    funcionario_id INTEGER NOT NULL,
-    entidad_empresa TEXT,
-    area_departamento TEXT,
-    tipo_entidad TEXT,
-    puesto TEXT,
-    jerarquia TEXT,
-    cargo_mando TEXT,
-    nro_dependientes INTEGER,
-    fecha_inicio DATE,
-    fecha_final DATE,
-    forma_ingreso TEXT,
-    causa_retiro TEXT,
-    nit_empresa TEXT,
-    haber_basico REAL,
-    pais TEXT,
-    descripcion_labores TEXT,
-    FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-)
-''')
-
-# Tabla para capacitaciones impartidas
-        cursor.execute('''
-CREATE TABLE IF NOT EXISTS capacitaciones_impartidas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    funcionario_id INTEGER NOT NULL,
-    tipo_entidad_academica TEXT,
-    institucion_academica TEXT,
-    nombre_institucion TEXT,
-    tipo_capacitacion TEXT,
-    carrera TEXT,
-    asignatura_tema TEXT,
-    nro_horas INTEGER,
-    fecha_desde DATE,
-    fecha_hasta DATE,
-    FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-)
-''')
-
-        print("✅ Tablas de datos de funcionario creadas")
-        
-        # Insertar usuario admin por defecto
-        cursor.execute("SELECT * FROM usuarios WHERE username = 'admin'")
-        if not cursor.fetchone():
-            # Calcular hash de la contraseña
-            password_hash = self.hash_password("admin123")
-            
-            cursor.execute('''
-            INSERT INTO usuarios (ci, username, email, password_hash, rol, activo)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', ('0000000', 'admin', 'admin@gobierno.talento.bo', 
-                  password_hash, 'admin', 1))
-            print(f"✅ Usuario admin creado con hash: {password_hash[:20]}...")
-        
-        # Tablas de parámetros (catálogos)
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS parametros_genero (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            codigo TEXT UNIQUE NOT NULL,
-            nombre TEXT NOT NULL,
-            activo INTEGER DEFAULT 1
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS parametros_departamentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            codigo TEXT UNIQUE NOT NULL,
-            nombre TEXT NOT NULL,
-            activo INTEGER DEFAULT 1
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS parametros_paises (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            codigo TEXT UNIQUE NOT NULL,
-            nombre TEXT NOT NULL,
-            activo INTEGER DEFAULT 1
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS parametros_estado_civil (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            codigo TEXT UNIQUE NOT NULL,
-            nombre TEXT NOT NULL,
-            activo INTEGER DEFAULT 1
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS parametros_tipo_sangre (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            codigo TEXT UNIQUE NOT NULL,
-            nombre TEXT NOT NULL,
-            activo INTEGER DEFAULT 1
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS parametros_gestora (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            codigo TEXT UNIQUE NOT NULL,
-            nombre TEXT NOT NULL,
-            activo INTEGER DEFAULT 1
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS parametros_parentesco (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            codigo TEXT UNIQUE NOT NULL,
-            nombre TEXT NOT NULL,
-            activo INTEGER DEFAULT 1
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS parametros_nacionalidad (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            codigo TEXT UNIQUE NOT NULL,
-            nombre TEXT NOT NULL,
-            activo INTEGER DEFAULT 1
-        )
-        ''')
-
-        # Insertar datos básicos en parámetros
-        parametros_basicos = {
-            'genero': [
-                ('M', 'MASCULINO'),
-                ('F', 'FEMENINO')
-            ],
-            'departamentos': [
-                ('LP', 'LA PAZ'),
-                ('CB', 'COCHABAMBA'),
-                ('SC', 'SANTA CRUZ'),
-                ('OR', 'ORURO'),
-                ('PT', 'POTOSÍ'),
-                ('TJ', 'TARIJA'),
-                ('CH', 'CHUQUISACA'),
-                ('BN', 'BENI'),
-                ('PD', 'PANDO')
-            ],
-            'paises': [
-                ('BOL', 'BOLIVIA'),
-                ('ARG', 'ARGENTINA'),
-                ('BRA', 'BRASIL'),
-                ('CHL', 'CHILE'),
-                ('PER', 'PERÚ')
-            ],
-            'estado_civil': [
-                ('S', 'SOLTERO(A)'),
-                ('C', 'CASADO(A)'),
-                ('D', 'DIVORCIADO(A)'),
-                ('V', 'VIUDO(A)'),
-                ('U', 'UNIÓN LIBRE')
-            ],
-            'tipo_sangre': [
-                ('A+', 'A+'),
-                ('A-', 'A-'),
-                ('B+', 'B+'),
-                ('B-', 'B-'),
-                ('AB+', 'AB+'),
-                ('AB-', 'AB-'),
-                ('O+', 'O+'),
-                ('O-', 'O-')
-            ],
-            'gestora': [
-                ('CSS', 'CAJA DE SALUD DE SEGUROS SOCIALES'),
-                ('CPS', 'CAJA PETROLERA DE SALUD'),
-                ('CNS', 'CAJA NACIONAL DE SALUD'),
-                ('CSM', 'CAJA DE SALUD DE LA MUJER'),
-                ('CSR', 'CAJA DE SALUD RURAL')
-            ],
-            'parentesco': [
-                ('PAD', 'PADRE'),
-                ('MAD', 'MADRE'),
-                ('CON', 'CÓNYUGUE'),
-                ('HIJ', 'HIJO(A)'),
-                ('HER', 'HERMANO(A)'),
-                ('OTR', 'OTRO')
-            ],
-            'nacionalidad': [
-                ('BOL', 'BOLIVIANA'),
-                ('ARG', 'ARGENTINA'),
-                ('BRA', 'BRASILEÑA'),
-                ('CHL', 'CHILENA'),
-                ('PER', 'PERUANA'),
-                ('OTR', 'OTRA')
-            ]
-        }
+        try:
+            if self.get_version_esquema(conn) < migraciones.ultima_version():
+                migraciones.migrar(conn, self.db_path)
+        finally:
+            conn.close()
 
-        for tabla, datos in parametros_basicos.items():
-            cursor.execute(f"SELECT COUNT(*) FROM parametros_{tabla}")
-            if cursor.fetchone()[0] == 0:
-                for codigo, nombre in datos:
-                    cursor.execute(f"INSERT INTO parametros_{tabla} (codigo, nombre) VALUES (?, ?)", (codigo, nombre))
-                print(f"✅ Datos insertados en: parametros_{tabla}")
+    def get_version_esquema(self, conn):
+        """Versión de esquema registrada en PRAGMA user_version"""
+        return migraciones.version_actual(conn)
 
-        conn.commit()
-        conn.close()
-        print("✅ Tablas de parámetros creadas e inicializadas")
+    def plan_consulta(self, query, params=()):
+        """Plan de ejecución (EXPLAIN QUERY PLAN) de una consulta"""
+        conn = self.get_connection()
+        try:
+            filas = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        finally:
+            conn.close()
+        return [fila['detail'] for fila in filas]
     
+    def _cargar_parametros(self):
+        """Leer todos los catálogos activos en una sola consulta"""
+        union = ' UNION ALL '.join(
+            f"SELECT '{tipo}' AS tipo, codigo, nombre FROM parametros_{tipo} WHERE activo = 1"
+            for tipo in self.TIPOS_PARAMETROS)
+
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"{union} ORDER BY tipo, nombre")
+            resultados = cursor.fetchall()
+
+        parametros = {tipo: [] for tipo in self.TIPOS_PARAMETROS}
+        for row in resultados:
+            parametros[row['tipo']].append({'codigo': row['codigo'], 'nombre': row['nombre']})
+        return parametros
+
+    def get_all_parametros(self):
+        """Obtener todos los catálogos {tipo: [{codigo, nombre}]} desde la caché"""
+        return self.catalogos.get_todos()
+
     def get_parametros(self, tipo):
         """Obtener lista de parámetros por tipo"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        tablas_validas = ['genero', 'departamentos', 'paises', 'estado_civil', 
-                        'tipo_sangre', 'gestora', 'parentesco', 'nacionalidad']
-        
-        if tipo not in tablas_validas:
-            conn.close()
-            return []
-        
-        cursor.execute(f"SELECT codigo, nombre FROM parametros_{tipo} WHERE activo = 1 ORDER BY nombre")
-        resultados = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in resultados]
+        return self.get_all_parametros().get(tipo, [])
+
+    def get_mapa_parametros(self, tipo):
+        """Obtener diccionario código -> nombre de un catálogo"""
+        return self.catalogos.get_mapa(tipo)
+
+    # Columnas guardadas como código de catálogo: tabla -> {columna: tipo}
+    COLUMNAS_CATALOGO = {
+        'datos_adicionales': {
+            'genero': 'genero',
+            'expedido_en': 'departamentos',
+            'pais_nacimiento': 'paises',
+            'depto_nacimiento': 'departamentos',
+            'estado_civil': 'estado_civil',
+            'tipo_sangre': 'tipo_sangre',
+            'gestora': 'gestora',
+        },
+        'parientes': {
+            'parentesco': 'parentesco',
+            'nacionalidad': 'nacionalidad',
+            'genero': 'genero',
+        },
+        'formacion_academica': {'pais_estudio': 'paises'},
+        'cursos': {'pais_estudio': 'paises', 'depto_estudio': 'departamentos'},
+        'experiencia_laboral': {'pais': 'paises'},
+    }
+
+    def enriquecer_codigos(self, filas, tabla):
+        """Agregar '<columna>_nombre' a cada fila con el nombre de su código
+
+        Resuelve en una sola pasada todas las columnas de catálogo de la tabla
+        usando los diccionarios código -> nombre de la caché. Si el código no
+        existe en el catálogo se deja el código tal cual.
+        """
+        mapas = {columna: self.get_mapa_parametros(tipo)
+                 for columna, tipo in self.COLUMNAS_CATALOGO.get(tabla, {}).items()}
+        for fila in filas:
+            for columna, mapa in mapas.items():
+                codigo = fila.get(columna)
+                fila[f'{columna}_nombre'] = mapa.get(codigo, codigo or '')
+        return filas
+
+    def guardar_parametro(self, tipo, codigo, nombre, activo=1):
+        """Crear o actualizar un valor de catálogo e invalidar la caché"""
+        if tipo not in self.TIPOS_PARAMETROS:
+            raise ValueError(f"Catálogo desconocido: {tipo}")
+
+        with self.conexion() as conn:
+            conn.execute(f'''
+            INSERT INTO parametros_{tipo} (codigo, nombre, activo) VALUES (?, ?, ?)
+            ON CONFLICT(codigo) DO UPDATE SET nombre = excluded.nombre, activo = excluded.activo
+            ''', (codigo, nombre, activo))
+        self.catalogos.invalidar()
+        return True
 
     def get_datos_adicionales(self, funcionario_id):
         """Obtener datos adicionales del funcionario"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM datos_adicionales WHERE funcionario_id = ?", (funcionario_id,))
-        datos = cursor.fetchone()
-        conn.close()
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM datos_adicionales WHERE funcionario_id = ?", (funcionario_id,))
+            datos = cursor.fetchone()
         return datos
 
     def get_parientes(self, funcionario_id):
         """Obtener parientes del funcionario"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM parientes WHERE funcionario_id = ? ORDER BY parentesco", (funcionario_id,))
-        parientes = cursor.fetchall()
-        conn.close()
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM parientes WHERE funcionario_id = ? ORDER BY parentesco", (funcionario_id,))
+            parientes = cursor.fetchall()
         return [dict(p) for p in parientes]
 
-    def guardar_datos_adicionales(self, funcionario_id, datos):
-        """Guardar o actualizar datos adicionales"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+    def unidad_de_trabajo(self, funcionario_id):
+        """Agrupar los cambios de un formulario en una sola transacción"""
+        return UnidadDeTrabajo(self, funcionario_id)
+
+    def _upsert_datos_adicionales(self, cursor, funcionario_id, datos):
+        """Insertar o actualizar datos adicionales usando el cursor dado"""
         # Verificar si ya existen datos
         cursor.execute("SELECT id FROM datos_adicionales WHERE funcionario_id = ?", (funcionario_id,))
         existe = cursor.fetchone()
@@ -504,6 +608,8 @@ CREATE TABLE IF NOT EXISTS capacitaciones_impartidas (
                     campos.append(f"{campo} = ?")
                     valores.append(valor)
             
+            if not campos:
+                return
             valores.append(funcionario_id)
             query = f"UPDATE datos_adicionales SET {', '.join(campos)} WHERE funcionario_id = ?"
             cursor.execute(query, valores)
@@ -515,98 +621,96 @@ CREATE TABLE IF NOT EXISTS capacitaciones_impartidas (
             
             query = f"INSERT INTO datos_adicionales ({', '.join(campos)}) VALUES ({', '.join(placeholders)})"
             cursor.execute(query, valores)
-        
-        conn.commit()
-        conn.close()
+
+    def guardar_datos_adicionales(self, funcionario_id, datos):
+        """Guardar o actualizar datos adicionales"""
+        with self.conexion() as conn:
+            self._upsert_datos_adicionales(conn.cursor(), funcionario_id, datos)
+            conn.execute(SQL_NUEVA_VERSION_FICHA, (funcionario_id,))
+        return True
+
+    def _insertar_fila(self, tabla, funcionario_id, datos):
+        """Insertar una fila en una tabla hija y devolver su id"""
+        with self.conexion() as conn:
+            cursor = conn.execute(sql_insertar_fila(tabla), valores_fila(tabla, funcionario_id, datos))
+            conn.execute(SQL_NUEVA_VERSION_FICHA, (funcionario_id,))
+            return cursor.lastrowid
+
+    def _eliminar_fila(self, tabla, fila_id):
+        """Eliminar una fila de una tabla hija por id"""
+        with self.conexion() as conn:
+            conn.execute(f"UPDATE funcionarios SET version_ficha = version_ficha + 1 "
+                         f"WHERE id = (SELECT funcionario_id FROM {tabla} WHERE id = ?)", (fila_id,))
+            conn.execute(f"DELETE FROM {tabla} WHERE id = ?", (fila_id,))
         return True
 
     def guardar_pariente(self, funcionario_id, datos_pariente):
         """Guardar un pariente"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        campos = ['funcionario_id'] + list(datos_pariente.keys())
-        placeholders = ['?'] * len(campos)
-        valores = [funcionario_id] + list(datos_pariente.values())
-        
-        query = f"INSERT INTO parientes ({', '.join(campos)}) VALUES ({', '.join(placeholders)})"
-        cursor.execute(query, valores)
-        
-        pariente_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return pariente_id
+        return self._insertar_fila('parientes', funcionario_id, datos_pariente)
 
     def eliminar_pariente(self, pariente_id):
         """Eliminar un pariente"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM parientes WHERE id = ?", (pariente_id,))
-        conn.commit()
-        conn.close()
-        return True    
+        return self._eliminar_fila('parientes', pariente_id)
           
     # Métodos CRUD para usuarios
     def get_usuario_by_username(self, username):
         """Obtener usuario por nombre de usuario"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM usuarios WHERE username = ? AND activo = 1", (username,))
-        usuario = cursor.fetchone()
-        conn.close()
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM usuarios WHERE username = ? AND activo = 1", (username,))
+            usuario = cursor.fetchone()
         return usuario
     
+    def get_usuario_by_id(self, user_id):
+        """Obtener usuario activo por id"""
+        with self.conexion() as conn:
+            return conn.execute("SELECT * FROM usuarios WHERE id = ? AND activo = 1",
+                                (user_id,)).fetchone()
+    
     def get_usuario_by_ci(self, ci):
         """Obtener usuario por CI"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM usuarios WHERE ci = ? AND activo = 1", (ci,))
-        usuario = cursor.fetchone()
-        conn.close()
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM usuarios WHERE ci = ? AND activo = 1", (ci,))
+            usuario = cursor.fetchone()
         return usuario
     
     def crear_usuario(self, ci, username, email, password_hash, rol='funcionario'):
         """Crear nuevo usuario"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
         try:
-            cursor.execute('''
-            INSERT INTO usuarios (ci, username, email, password_hash, rol)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (ci, username, email, password_hash, rol))
-            conn.commit()
-            user_id = cursor.lastrowid
-            conn.close()
-            return user_id
+            with self.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                INSERT INTO usuarios (ci, username, email, password_hash, rol)
+                VALUES (?, ?, ?, ?, ?)
+                ''', (ci, username, email, password_hash, rol))
+                return cursor.lastrowid
         except sqlite3.IntegrityError as e:
-            conn.close()
             raise Exception(f"Error al crear usuario: {str(e)}")
     
     # Métodos CRUD para funcionarios
     
     def get_formacion_academica(self, funcionario_id):
         """Obtener formación académica del funcionario"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Obtener bachillerato
-        cursor.execute("SELECT * FROM bachillerato WHERE funcionario_id = ?", (funcionario_id,))
-        bachillerato = cursor.fetchone()
-        
-        # Obtener estudios superiores
-        cursor.execute("SELECT * FROM formacion_academica WHERE funcionario_id = ?", (funcionario_id,))
-        estudios_superiores = cursor.fetchall()
-        
-        # Obtener cursos
-        cursor.execute("SELECT * FROM cursos WHERE funcionario_id = ?", (funcionario_id,))
-        cursos = cursor.fetchall()
-        
-        # Obtener idiomas
-        cursor.execute("SELECT * FROM idiomas WHERE funcionario_id = ?", (funcionario_id,))
-        idiomas = cursor.fetchall()
-        
-        conn.close()
-        
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+
+            # Obtener bachillerato
+            cursor.execute("SELECT * FROM bachillerato WHERE funcionario_id = ?", (funcionario_id,))
+            bachillerato = cursor.fetchone()
+
+            # Obtener estudios superiores
+            cursor.execute("SELECT * FROM formacion_academica WHERE funcionario_id = ?", (funcionario_id,))
+            estudios_superiores = cursor.fetchall()
+
+            # Obtener cursos
+            cursor.execute("SELECT * FROM cursos WHERE funcionario_id = ?", (funcionario_id,))
+            cursos = cursor.fetchall()
+
+            # Obtener idiomas
+            cursor.execute("SELECT * FROM idiomas WHERE funcionario_id = ?", (funcionario_id,))
+            idiomas = cursor.fetchall()
+
         return {
             'bachillerato': dict(bachillerato) if bachillerato else None,
             'estudios_superiores': [dict(e) for e in estudios_superiores],
@@ -614,11 +718,96 @@ CREATE TABLE IF NOT EXISTS capacitaciones_impartidas (
             'idiomas': [dict(i) for i in idiomas]
         }
 
-    def guardar_bachillerato(self, funcionario_id, datos):
-        """Guardar o actualizar bachillerato"""
+    # Partes de la ficha TALENTO: (clave, tabla, una sola fila, orden)
+    PARTES_FICHA = [
+        ('datos_adicionales', 'datos_adicionales', True, 'id'),
+        ('parientes', 'parientes', False, 'parentesco, id'),
+        ('bachillerato', 'bachillerato', True, 'id'),
+        ('estudios_superiores', 'formacion_academica', False, 'id'),
+        ('cursos', 'cursos', False, 'id'),
+        ('idiomas', 'idiomas', False, 'id'),
+        ('experiencia_laboral', 'experiencia_laboral', False, 'fecha_inicio, id'),
+        ('capacitaciones_impartidas', 'capacitaciones_impartidas', False, 'fecha_desde, id'),
+    ]
+
+    def _sql_ficha_completa(self, cantidad):
+        """SELECT de funcionarios con cada parte de la ficha como columna JSON"""
+        columnas = self._columnas_ficha
+        if columnas is None:
+            with self.conexion() as conn:
+                columnas = {tabla: [fila['name'] for fila in conn.execute(f"PRAGMA table_info({tabla})")]
+                            for _, tabla, _, _ in self.PARTES_FICHA}
+            self._columnas_ficha = columnas
+
+        subconsultas = []
+        for clave, tabla, unica, orden in self.PARTES_FICHA:
+            objeto = 'json_object(' + ', '.join(f"'{c}', t.{c}" for c in columnas[tabla]) + ')'
+            agregado = objeto if unica else f"json_group_array({objeto})"
+            subconsultas.append(
+                f"(SELECT {agregado} FROM (SELECT * FROM {tabla} WHERE funcionario_id = f.id "
+                f"ORDER BY {orden}{' LIMIT 1' if unica else ''}) t) AS ficha_{clave}")
+
+        return (f"SELECT f.*, {', '.join(subconsultas)} FROM funcionarios f "
+                f"WHERE f.id IN ({', '.join('?' * cantidad)})")
+
+    def get_fichas_completas(self, funcionario_ids, lote=500):
+        """Fichas TALENTO completas de varios funcionarios {id: ficha}
+
+        Cada lote de ids se resuelve con una sola consulta: las tablas hijas
+        llegan agregadas como JSON (json_object / json_group_array) en la
+        misma fila del funcionario.
+        """
+        ids = list(dict.fromkeys(funcionario_ids))
+        fichas = {}
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        try:
+            for inicio in range(0, len(ids), lote):
+                parte = ids[inicio:inicio + lote]
+                for fila in conn.execute(self._sql_ficha_completa(len(parte)), parte):
+                    fila = dict(fila)
+                    ficha = {}
+                    for clave, _, _, _ in self.PARTES_FICHA:
+                        valor = fila.pop(f'ficha_{clave}')  # NULL si no hay fila única
+                        ficha[clave] = json.loads(valor) if valor is not None else None
+                    ficha['funcionario'] = fila
+                    fichas[fila['id']] = ficha
+        finally:
+            conn.close()
+        return fichas
+
+    def get_version_ficha(self, funcionario_id):
+        """Versión actual de la ficha (None si el funcionario no existe)"""
+        with self.conexion() as conn:
+            fila = conn.execute("SELECT version_ficha FROM funcionarios WHERE id = ?",
+                                (funcionario_id,)).fetchone()
+        return fila[0] if fila else None
+
+    def get_ficha_completa(self, funcionario_id):
+        """Ficha TALENTO completa de un funcionario (o None si no existe)
+
+        Lectura a través de la caché de fichas: se consulta solo la versión
+        y, si la ficha de esa versión ya está armada, no se toca el resto.
+        """
+        version = self.get_version_ficha(funcionario_id)
+        if version is None:
+            return None
+        ficha = self.fichas.obtener(funcionario_id, version)
+        if ficha is None:
+            ficha = self.get_fichas_completas([funcionario_id]).get(funcionario_id)
+            if ficha is not None:
+                # Guardar con la versión realmente leída (pudo cambiar entre consultas)
+                self.fichas.guardar(funcionario_id, ficha['funcionario']['version_ficha'], ficha)
+        return ficha
+
+    def enriquecer_ficha(self, ficha):
+        """Agregar los nombres de catálogo a todas las partes de la ficha"""
+        for clave, tabla, unica, _ in self.PARTES_FICHA:
+            if ficha[clave]:
+                self.enriquecer_codigos([ficha[clave]] if unica else ficha[clave], tabla)
+        return ficha
+
+    def _upsert_bachillerato(self, cursor, funcionario_id, datos):
+        """Insertar o actualizar bachillerato usando el cursor dado"""
         # Verificar si ya existe
         cursor.execute("SELECT id FROM bachillerato WHERE funcionario_id = ?", (funcionario_id,))
         existe = cursor.fetchone()
@@ -652,266 +841,627 @@ CREATE TABLE IF NOT EXISTS capacitaciones_impartidas (
                 datos.get('unidad_educativa'),
                 datos.get('ultimo_curso_vencido')
             ))
-        
-        conn.commit()
-        conn.close()
+
+    def guardar_bachillerato(self, funcionario_id, datos):
+        """Guardar o actualizar bachillerato"""
+        with self.conexion() as conn:
+            self._upsert_bachillerato(conn.cursor(), funcionario_id, datos)
+            conn.execute(SQL_NUEVA_VERSION_FICHA, (funcionario_id,))
         return True
 
     def guardar_estudio_superior(self, funcionario_id, datos):
         """Guardar un estudio superior"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        INSERT INTO formacion_academica (
-            funcionario_id, pais_estudio, estado_instruccion, nivel_instruccion,
-            area, tipo_entidad_academica, institucion_academica, nombre_institucion,
-            carrera, titulado, documento_respaldo, detalle_documento,
-            fecha_inicio, fecha_final, nro_titulo_academico, fecha_emision_titulo
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            funcionario_id,
-            datos.get('pais_estudio'),
-            datos.get('estado_instruccion'),
-            datos.get('nivel_instruccion'),
-            datos.get('area'),
-            datos.get('tipo_entidad_academica'),
-            datos.get('institucion_academica'),
-            datos.get('nombre_institucion'),
-            datos.get('carrera'),
-            datos.get('titulado'),
-            datos.get('documento_respaldo'),
-            datos.get('detalle_documento'),
-            datos.get('fecha_inicio'),
-            datos.get('fecha_final'),
-            datos.get('nro_titulo_academico'),
-            datos.get('fecha_emision_titulo')
-        ))
-        
-        estudio_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return estudio_id
+        return self._insertar_fila('formacion_academica', funcionario_id, datos)
 
     def guardar_curso(self, funcionario_id, datos):
         """Guardar un curso o capacitación"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        INSERT INTO cursos (
-            funcionario_id, nivel_instruccion, area, nombre_curso,
-            tipo_entidad_academica, institucion_academica, nro_horas,
-            fecha_inicio, fecha_final, documento_respaldo, detalle_documento,
-            pais_estudio, depto_estudio, capacitacion
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            funcionario_id,
-            datos.get('nivel_instruccion'),
-            datos.get('area'),
-            datos.get('nombre_curso'),
-            datos.get('tipo_entidad_academica'),
-            datos.get('institucion_academica'),
-            datos.get('nro_horas'),
-            datos.get('fecha_inicio'),
-            datos.get('fecha_final'),
-            datos.get('documento_respaldo'),
-            datos.get('detalle_documento'),
-            datos.get('pais_estudio'),
-            datos.get('depto_estudio'),
-            datos.get('capacitacion')
-        ))
-        
-        curso_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return curso_id
+        return self._insertar_fila('cursos', funcionario_id, datos)
 
     def guardar_idioma(self, funcionario_id, datos):
         """Guardar un idioma"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        INSERT INTO idiomas (
-            funcionario_id, idioma, habla, escribe, lee
-        ) VALUES (?, ?, ?, ?, ?)
-        ''', (
-            funcionario_id,
-            datos.get('idioma'),
-            datos.get('habla'),
-            datos.get('escribe'),
-            datos.get('lee')
-        ))
-        
-        idioma_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return idioma_id
+        return self._insertar_fila('idiomas', funcionario_id, datos)
 
     def eliminar_estudio_superior(self, estudio_id):
         """Eliminar un estudio superior"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM formacion_academica WHERE id = ?", (estudio_id,))
-        conn.commit()
-        conn.close()
-        return True
+        return self._eliminar_fila('formacion_academica', estudio_id)
 
     def eliminar_curso(self, curso_id):
         """Eliminar un curso"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM cursos WHERE id = ?", (curso_id,))
-        conn.commit()
-        conn.close()
-        return True
+        return self._eliminar_fila('cursos', curso_id)
 
     def eliminar_idioma(self, idioma_id):
         """Eliminar un idioma"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM idiomas WHERE id = ?", (idioma_id,))
-        conn.commit()
-        conn.close()
-        return True
+        return self._eliminar_fila('idiomas', idioma_id)
     
-    def crear_funcionario(self, datos):
-        """Crear nuevo funcionario según formulario R-100"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    # Lista completa de campos según el documento R-100
+    CAMPOS_FUNCIONARIO = [
+        # Datos personales
+        'ci', 'primer_apellido', 'segundo_apellido', 'tercer_apellido',
+        'primer_nombre', 'segundo_nombre', 'tercer_nombre', 'tipo_identificacion',
         
-        # Lista completa de campos según el documento
-        campos = [
-            # Datos personales
-            'ci', 'primer_apellido', 'segundo_apellido', 'tercer_apellido',
-            'primer_nombre', 'segundo_nombre', 'tercer_nombre', 'tipo_identificacion',
-            
-            # Datos de resolución
-            'nro_resolucion', 'fecha_resolucion', 'fecha_posesion',
-            'nro_memorandum_designacion', 'fecha_memorandum',
-            
-            # Datos de ítem
-            'nro_item', 'administracion', 'jerarquia', 'depende_de',
-            'unidad_organizacional', 'cargo', 'puesto',
-            'direccion_oficina', 'piso_interno',
-            
-            # Archivos (solo rutas por ahora)
-            'firma_path', 'foto_path', 'huella_path',
-            
-            # Datos generados
-            'usuario_aplicacion', 'clave_generada', 'correo_interno'
-        ]
+        # Datos de resolución
+        'nro_resolucion', 'fecha_resolucion', 'fecha_posesion',
+        'nro_memorandum_designacion', 'fecha_memorandum',
         
-        # Asegurar que todos los campos existan en el diccionario datos
-        valores = [datos.get(campo) for campo in campos]
+        # Datos de ítem
+        'nro_item', 'administracion', 'jerarquia', 'depende_de',
+        'unidad_organizacional', 'cargo', 'puesto',
+        'direccion_oficina', 'piso_interno',
         
-        cursor.execute(f'''
-        INSERT INTO funcionarios ({', '.join(campos)})
-        VALUES ({', '.join(['?'] * len(campos))})
-        ''', valores)
+        # Archivos (solo rutas por ahora)
+        'firma_path', 'foto_path', 'huella_path',
         
-        funcionario_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Datos generados
+        'usuario_aplicacion', 'clave_generada', 'correo_interno'
+    ]
+
+    def crear_funcionario(self, datos):
+        """Crear nuevo funcionario según formulario R-100"""
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+
+            campos = self.CAMPOS_FUNCIONARIO
+
+            # Asegurar que todos los campos existan en el diccionario datos
+            valores = [datos.get(campo) for campo in campos]
+
+            cursor.execute(f'''
+            INSERT INTO funcionarios ({', '.join(campos)})
+            VALUES ({', '.join(['?'] * len(campos))})
+            ''', valores)
+
+            funcionario_id = cursor.lastrowid
         return funcionario_id
-    
-    
+
+    def crear_funcionarios_lote(self, registros):
+        """Crear funcionarios y sus usuarios en bloque, en una transacción
+
+        Cada registro tiene los CAMPOS_FUNCIONARIO más 'estado',
+        'password_hash' y 'rol'. Si alguna fila viola una restricción se
+        revierte el lote completo y se propaga sqlite3.IntegrityError.
+        """
+        campos = self.CAMPOS_FUNCIONARIO + ['estado']
+        with self.conexion() as conn:
+            conn.executemany(f'''
+            INSERT INTO funcionarios ({', '.join(campos)})
+            VALUES ({', '.join(['?'] * len(campos))})
+            ''', ([datos.get(campo) for campo in campos] for datos in registros))
+            
+            conn.executemany('''
+            INSERT INTO usuarios (ci, username, email, password_hash, rol)
+            VALUES (?, ?, ?, ?, ?)
+            ''', ((datos['ci'], datos['usuario_aplicacion'], datos['correo_interno'],
+                   datos['password_hash'], datos.get('rol', 'funcionario')) for datos in registros))
+        return len(registros)
+
+    def get_cis_existentes(self, cis):
+        """De una lista de CIs, devolver los que ya tienen funcionario o usuario"""
+        cis = list(cis)
+        existentes = set()
+        conn = self.get_connection()
+        try:
+            for i in range(0, len(cis), 500):
+                lote = cis[i:i + 500]
+                marcas = ', '.join(['?'] * len(lote))
+                cursor = conn.execute(f'''
+                SELECT ci FROM funcionarios WHERE ci IN ({marcas})
+                UNION SELECT ci FROM usuarios WHERE ci IN ({marcas})
+                ''', lote + lote)
+                existentes.update(row['ci'] for row in cursor)
+        finally:
+            conn.close()
+        return existentes
+
+    def get_usernames_con_prefijo(self, prefijo):
+        """Usernames (activos o no) que empiezan con `prefijo`
+
+        Equivale a LIKE 'prefijo%' pero como rango sobre el índice único de
+        username, que LIKE no puede usar (es insensible a mayúsculas).
+        """
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT username FROM usuarios WHERE username >= ? AND username < ?",
+                           (prefijo, prefijo + '\U0010ffff'))
+            usernames = {row['username'] for row in cursor.fetchall()}
+        return usernames
+
+    def asignar_username(self, primer_nombre, primer_apellido, segundo_apellido=None, excluir=()):
+        """Elegir un username libre con una sola consulta por prefijo"""
+        base = base_username(primer_nombre, primer_apellido)
+        ocupados = self.get_usernames_con_prefijo(base) | set(excluir)
+        return siguiente_username(base, segundo_apellido, ocupados)
+
+    def crear_funcionario_con_usuario(self, datos, password_hash, rol='funcionario', intentos=5):
+        """Crear funcionario y usuario en una transacción con username generado
+
+        Si otro registro simultáneo toma el mismo username, la restricción
+        UNIQUE lo detecta y se reintenta con el siguiente libre.
+        Devuelve (funcionario_id, username).
+        """
+        tomados = set()
+        for _ in range(intentos):
+            username = self.asignar_username(datos['primer_nombre'], datos['primer_apellido'],
+                                             datos.get('segundo_apellido'), excluir=tomados)
+            registro = dict(datos,
+                            usuario_aplicacion=username,
+                            correo_interno=f"{username}@{DOMINIO_CORREO}")
+            valores = [registro.get(campo) for campo in self.CAMPOS_FUNCIONARIO]
+            try:
+                with self.conexion() as conn:
+                    cursor = conn.execute(f'''
+                    INSERT INTO funcionarios ({', '.join(self.CAMPOS_FUNCIONARIO)})
+                    VALUES ({', '.join(['?'] * len(self.CAMPOS_FUNCIONARIO))})
+                    ''', valores)
+                    funcionario_id = cursor.lastrowid
+                    conn.execute('''
+                    INSERT INTO usuarios (ci, username, email, password_hash, rol)
+                    VALUES (?, ?, ?, ?, ?)
+                    ''', (registro['ci'], username, registro['correo_interno'], password_hash, rol))
+                return funcionario_id, username
+            except sqlite3.IntegrityError as e:
+                if 'usuarios.username' not in str(e) and 'usuarios.email' not in str(e):
+                    raise
+                tomados.add(username)  # Lo tomó otro registro concurrente
+        raise Exception(f"No se pudo asignar un usuario libre tras {intentos} intentos")
+
+    def get_all_usernames(self):
+        """Todos los nombres de usuario registrados (activos o no)"""
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT username FROM usuarios")
+            usernames = {row['username'] for row in cursor.fetchall()}
+        return usernames
     
     def get_funcionario_by_ci(self, ci):
         """Obtener funcionario por CI"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM funcionarios WHERE ci = ?", (ci,))
-        funcionario = cursor.fetchone()
-        conn.close()
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM funcionarios WHERE ci = ?", (ci,))
+            funcionario = cursor.fetchone()
         return funcionario
     
     def get_all_funcionarios(self):
         """Obtener todos los funcionarios"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM funcionarios ORDER BY fecha_registro DESC")
-        funcionarios = cursor.fetchall()
-        conn.close()
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM funcionarios ORDER BY fecha_registro DESC")
+            funcionarios = cursor.fetchall()
         return funcionarios
     
-    def contar_funcionarios_por_estado(self):
-        """Contar funcionarios por estado"""
+    # Columnas que muestra el listado de administración
+    COLUMNAS_LISTADO = [
+        'id', 'ci', 'primer_apellido', 'segundo_apellido', 'primer_nombre',
+        'cargo', 'unidad_organizacional', 'usuario_aplicacion', 'estado',
+        'fecha_registro', 'foto_path'
+    ]
+
+    # Ordenamientos permitidos en el listado: columna -> dirección
+    ORDENES_LISTADO = {
+        'fecha_registro': 'DESC',
+        'primer_apellido': 'ASC',
+        'ci': 'ASC',
+    }
+
+    # Filtros del listado: parámetro -> columna
+    FILTROS_LISTADO = {
+        'estado': 'estado',
+        'unidad': 'unidad_organizacional',
+        'cargo': 'cargo',
+    }
+
+    @staticmethod
+    def _codificar_cursor(fila, orden):
+        """Cursor opaco (valor de orden, id) para la paginación por clave"""
+        return base64.urlsafe_b64encode(json.dumps([fila[orden], fila['id']]).encode()).decode()
+
+    @staticmethod
+    def _decodificar_cursor(cursor):
+        """Inverso de _codificar_cursor; None si el cursor no es válido"""
+        try:
+            valor, fila_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            return None
+        # Solo valores que SQLite puede comparar; cualquier otra cosa es un cursor manipulado
+        if type(fila_id) is not int or not isinstance(valor, (str, int, float, type(None))) \
+                or isinstance(valor, bool):
+            return None
+        if any(type(n) is int and not -2 ** 63 <= n < 2 ** 63 for n in (valor, fila_id)):
+            return None
+        return valor, fila_id
+
+    def listar_funcionarios(self, tamano=50, orden='fecha_registro', despues=None,
+                            antes=None, **filtros):
+        """Página de funcionarios con paginación por clave (keyset)
+
+        `despues`/`antes` son los cursores devueltos en una llamada anterior.
+        Devuelve (filas, cursor_siguiente, cursor_anterior); un cursor es None
+        cuando no hay más páginas en esa dirección.
+        """
+        if orden not in self.ORDENES_LISTADO:
+            orden = 'fecha_registro'
+        direccion = self.ORDENES_LISTADO[orden]
+
+        condiciones = []
+        valores = []
+        for parametro, columna in self.FILTROS_LISTADO.items():
+            if filtros.get(parametro):
+                condiciones.append(f"{columna} = ?")
+                valores.append(filtros[parametro])
+
+        # Hacia atrás se recorre en orden inverso y luego se da vuelta la página
+        retroceder = antes is not None and despues is None
+        clave = self._decodificar_cursor(antes if retroceder else despues or '')
+        if retroceder:
+            direccion = 'ASC' if direccion == 'DESC' else 'DESC'
+        if clave:
+            comparador = '<' if direccion == 'DESC' else '>'
+            condiciones.append(f"({orden}, id) {comparador} (?, ?)")
+            valores.extend(clave)
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+            SELECT {', '.join(self.COLUMNAS_LISTADO)}
+            FROM funcionarios
+            {where}
+            ORDER BY {orden} {direccion}, id {direccion}
+            LIMIT ?
+            ''', valores + [tamano + 1])
+            filas = cursor.fetchall()
+
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano]
+        if retroceder:
+            filas.reverse()
+
+        if not filas:
+            return [], None, None
+        primera = self._codificar_cursor(filas[0], orden)
+        ultima = self._codificar_cursor(filas[-1], orden)
+        if retroceder:
+            return filas, ultima, primera if hay_mas else None
+        return filas, ultima if hay_mas else None, primera if clave else None
+
+    @staticmethod
+    def consulta_fts(texto, max_terminos=8):
+        """Convertir el texto del usuario en una consulta FTS5 por prefijos
+
+        Cada palabra se busca como prefijo ("per" encuentra "Pérez") y todas
+        deben aparecer. Las comillas evitan que la sintaxis de FTS5 (AND,
+        NEAR, *, :) escrita por el usuario se interprete.
+        """
+        terminos = re.findall(r'\w+', texto or '')[:max_terminos]
+        return ' '.join(f'"{termino}"*' for termino in terminos)
+
+    def buscar_funcionarios(self, texto, pagina=1, tamano=20, **filtros):
+        """Búsqueda por texto completo, ordenada por relevancia (bm25)
+
+        Devuelve (filas, hay_mas). Busca en nombres y apellidos, CI,
+        cargo/puesto, unidad y carrera/institución de la formación académica.
+        Acepta los mismos filtros exactos que listar_funcionarios.
+        """
+        consulta = self.consulta_fts(texto)
+        if not consulta:
+            return [], False
+
+        where = "busqueda_funcionarios MATCH ?"
+        valores = [consulta]
+        for parametro, columna in self.FILTROS_LISTADO.items():
+            if filtros.get(parametro):
+                where += f" AND f.{columna} = ?"
+                valores.append(filtros[parametro])
+
+        columnas = ', '.join(f"f.{columna}" for columna in self.COLUMNAS_LISTADO)
+        pesos = ', '.join(str(peso) for peso in PESOS_BUSQUEDA)
+        with self.conexion() as conn:
+            filas = conn.execute(f"""
+                SELECT {columnas}
+                FROM busqueda_funcionarios
+                JOIN funcionarios f ON f.id = busqueda_funcionarios.rowid
+                WHERE {where}
+                ORDER BY bm25(busqueda_funcionarios, {pesos}), f.id
+                LIMIT ? OFFSET ?
+            """, valores + [tamano + 1, (max(pagina, 1) - 1) * tamano]).fetchall()
+
+        return filas[:tamano], len(filas) > tamano
+
+    def sugerir_funcionarios(self, texto, limite=10):
+        """Sugerencias mientras se escribe: por prefijo de CI o de primer apellido
+
+        Si el texto empieza con un dígito se busca por CI; si no, por
+        primer apellido sin distinguir mayúsculas. Ambas consultas son un
+        rango sobre un índice de cobertura (no leen la tabla).
+        """
+        texto = (texto or '').strip()
+        if not texto:
+            return []
+
+        if texto[0].isdigit():
+            columna, colacion = 'ci', ''
+        else:
+            columna, colacion = 'primer_apellido', ' COLLATE NOCASE'
+        with self.conexion() as conn:
+            filas = conn.execute(f"""
+                SELECT ci, primer_apellido, segundo_apellido, primer_nombre, cargo, estado
+                FROM funcionarios
+                WHERE {columna} >= ?{colacion} AND {columna} < ?{colacion}
+                ORDER BY {columna}{colacion}
+                LIMIT ?
+            """, (texto, texto + '\U0010ffff', limite)).fetchall()
+        return [dict(fila) for fila in filas]
+
+    # Columnas internas que no se exportan (clave inicial, rutas de archivos)
+    COLUMNAS_NO_EXPORTABLES = {'clave_generada', 'version_ficha', 'firma_path', 'foto_path', 'huella_path'}
+
+    def columnas_exportacion(self):
+        """Columnas exportables {nombre: expresión SQL}, en orden
+
+        Funcionarios (f), datos adicionales (da, con prefijo 'da_' si el
+        nombre se repite) y un resumen de la formación académica.
+        """
+        with self.conexion() as conn:
+            funcionario = [fila['name'] for fila in conn.execute("PRAGMA table_info(funcionarios)")]
+            adicionales = [fila['name'] for fila in conn.execute("PRAGMA table_info(datos_adicionales)")]
+
+        columnas = {c: f"f.{c}" for c in funcionario if c not in self.COLUMNAS_NO_EXPORTABLES}
+        for c in adicionales:
+            if c not in ('id', 'funcionario_id'):
+                columnas[f"da_{c}" if c in columnas else c] = f"da.{c}"
+        columnas['formacion_academica'] = (
+            "(SELECT group_concat(COALESCE(fa.carrera, '') || ' - ' || "
+            "COALESCE(fa.nombre_institucion, fa.institucion_academica, '') || "
+            "CASE WHEN fa.titulado IS NOT NULL THEN ' (' || fa.titulado || ')' ELSE '' END, '; ') "
+            "FROM formacion_academica fa WHERE fa.funcionario_id = f.id)")
+        columnas['formacion_cantidad'] = (
+            "(SELECT COUNT(*) FROM formacion_academica fa WHERE fa.funcionario_id = f.id)")
+        return columnas
+
+    def iterar_exportacion(self, columnas=None, lote=1000, **filtros):
+        """Generador de filas para exportar: primero los nombres de columna
+
+        Recorre el cursor por lotes (fetchmany), así la memoria no depende
+        de la cantidad de funcionarios. Los códigos de catálogo de datos
+        adicionales se reemplazan por sus nombres. La conexión vuelve al
+        pool cuando el generador termina o se cierra.
+        """
+        disponibles = self.columnas_exportacion()
+        columnas = [c for c in (columnas or disponibles) if c in disponibles]
+        if not columnas:
+            raise ValueError("No se seleccionó ninguna columna válida")
+
+        condiciones = []
+        valores = []
+        for parametro, columna in self.FILTROS_LISTADO.items():
+            if filtros.get(parametro):
+                condiciones.append(f"f.{columna} = ?")
+                valores.append(filtros[parametro])
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+
+        mapas = {i: self.get_mapa_parametros(tipo)
+                 for i, columna in enumerate(columnas)
+                 for nombre, tipo in self.COLUMNAS_CATALOGO['datos_adicionales'].items()
+                 if columna == nombre and disponibles[columna] == f"da.{nombre}"}
+
+        yield columnas
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT estado, COUNT(*) as cantidad FROM funcionarios GROUP BY estado")
-        resultados = cursor.fetchall()
-        
-        # Crear diccionario con todos los estados
-        conteo = {
-            'pendiente': 0,
-            'activo': 0,
-            'inactivo': 0,
-            'baja': 0
-        }
-        
-        for row in resultados:
-            estado = row['estado']
-            if estado in conteo:
-                conteo[estado] = row['cantidad']
-        
-        conn.close()
-        return conteo
+        try:
+            cursor = conn.execute(f"""
+                SELECT {', '.join(disponibles[c] for c in columnas)}
+                FROM funcionarios f
+                LEFT JOIN datos_adicionales da ON da.funcionario_id = f.id
+                {where}
+                ORDER BY f.id
+            """, valores)
+            while True:
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    break
+                for fila in filas:
+                    fila = list(fila)
+                    for i, mapa in mapas.items():
+                        fila[i] = mapa.get(fila[i], fila[i])
+                    yield fila
+        finally:
+            conn.close()
+
+    def get_valores_filtro(self, columna):
+        """Valores distintos de una columna filtrable del listado"""
+        if columna not in self.FILTROS_LISTADO.values():
+            return []
+        with self.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT DISTINCT {columna} FROM funcionarios WHERE {columna} IS NOT NULL AND {columna} != '' ORDER BY {columna}")
+            valores = [row[0] for row in cursor.fetchall()]
+        return valores
+
+    def contar_funcionarios_por_estado(self):
+        """Contar funcionarios por estado (todos los estados, incluso en 0)"""
+        return self.get_estadisticas('total').get('', dict.fromkeys(ESTADOS_FUNCIONARIO, 0))
+
+    def get_estadisticas(self, dimension):
+        """Conteos por estado de cada valor de la dimensión {valor: {estado: cantidad}}
+
+        Se leen de estadisticas_estado, que los triggers de funcionarios
+        mantienen al día; no se recorre la tabla de funcionarios.
+        """
+        if dimension not in DIMENSIONES_ESTADISTICAS:
+            raise ValueError(f"Dimensión desconocida: {dimension}")
+
+        with self.conexion() as conn:
+            filas = conn.execute("""
+                SELECT valor, estado, cantidad FROM estadisticas_estado
+                WHERE dimension = ? AND cantidad <> 0
+                ORDER BY valor
+            """, (dimension,)).fetchall()
+
+        estadisticas = {}
+        for fila in filas:
+            conteo = estadisticas.setdefault(fila['valor'], dict.fromkeys(ESTADOS_FUNCIONARIO, 0))
+            conteo[fila['estado']] = fila['cantidad']
+        return estadisticas
     
-    # Agrega este método en database.py para calcular progreso
+    # Secciones de la ficha TALENTO y la condición SQL que las da por completadas
+    SECCIONES_FICHA = {
+        'datos_personales': "EXISTS (SELECT 1 FROM datos_adicionales WHERE funcionario_id = f.id)",
+        # Formación académica: bachillerato O estudios superiores
+        'formacion': "EXISTS (SELECT 1 FROM bachillerato WHERE funcionario_id = f.id) "
+                     "OR EXISTS (SELECT 1 FROM formacion_academica WHERE funcionario_id = f.id)",
+        # Seguro social aún no tiene tabla propia
+        'seguro_social': "0",
+        'experiencia': "EXISTS (SELECT 1 FROM experiencia_laboral WHERE funcionario_id = f.id)",
+    }
+
     def calcular_progreso_funcionario(self, funcionario_id):
         """Calcular progreso de completado de ficha TALENTO"""
+        progresos = self.calcular_progreso_funcionarios([funcionario_id])
+        if funcionario_id in progresos:
+            return progresos[funcionario_id]
+        return 0, {seccion: False for seccion in self.SECCIONES_FICHA}
+
+    def calcular_progreso_funcionarios(self, funcionario_ids, lote=500):
+        """Calcular el progreso de varios funcionarios con una consulta por lote"""
+        columnas = ', '.join(f"({condicion}) AS {seccion}"
+                             for seccion, condicion in self.SECCIONES_FICHA.items())
+        funcionario_ids = list(funcionario_ids)
+        total = len(self.SECCIONES_FICHA)
+        progresos = {}
+
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Verificar qué tablas tienen datos
-        secciones = {
-            'datos_personales': False,
-            'formacion': False,
-            'seguro_social': False,
-            'experiencia': False
-        }
-        
-        # Verificar datos personales
-        cursor.execute("SELECT COUNT(*) FROM datos_adicionales WHERE funcionario_id = ?", (funcionario_id,))
-        if cursor.fetchone()[0] > 0:
-            secciones['datos_personales'] = True
-        
-        # Verificar formación académica (bachillerato O estudios superiores)
-        cursor.execute("SELECT COUNT(*) FROM bachillerato WHERE funcionario_id = ?", (funcionario_id,))
-        tiene_bachillerato = cursor.fetchone()[0] > 0
-        
-        cursor.execute("SELECT COUNT(*) FROM formacion_academica WHERE funcionario_id = ?", (funcionario_id,))
-        tiene_formacion = cursor.fetchone()[0] > 0
-        
-        if tiene_bachillerato or tiene_formacion:
-            secciones['formacion'] = True
-        
-        # Verificar seguro social (necesitamos crear esta tabla)
-        # Por ahora asumimos que no está implementado
-        
-        # Verificar experiencia laboral
-        cursor.execute("SELECT COUNT(*) FROM experiencia_laboral WHERE funcionario_id = ?", (funcionario_id,))
-        if cursor.fetchone()[0] > 0:
-            secciones['experiencia'] = True
-        
-        conn.close()
-        
-        # Calcular porcentaje
-        completadas = sum(1 for sec in secciones.values() if sec)
-        total = len(secciones)
-        progreso = int((completadas / total) * 100) if total > 0 else 0
-        
-        return progreso, secciones
+        try:
+            for i in range(0, len(funcionario_ids), lote):
+                ids = funcionario_ids[i:i + lote]
+                cursor = conn.execute(f'''
+                SELECT f.id, {columnas}
+                FROM funcionarios f
+                WHERE f.id IN ({', '.join(['?'] * len(ids))})
+                ''', ids)
+
+                for row in cursor:
+                    secciones = {seccion: bool(row[seccion]) for seccion in self.SECCIONES_FICHA}
+                    completadas = sum(1 for sec in secciones.values() if sec)
+                    progresos[row['id']] = (int((completadas / total) * 100), secciones)
+        finally:
+            conn.close()
+
+        return progresos
     
+    def actualizar_password_hash(self, user_id, password_hash):
+        """Reemplazar el hash de contraseña (p. ej. al actualizar el formato)"""
+        with self.conexion() as conn:
+            conn.execute("UPDATE usuarios SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+        return True
+
     def actualizar_ultimo_acceso(self, user_id):
-        """Actualizar último acceso del usuario"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE usuarios SET ultimo_acceso = CURRENT_TIMESTAMP WHERE id = ?", (user_id,))
-        conn.commit()
-        conn.close()
-        
-    
\ No newline at end of file
+        """Actualizar último acceso del usuario (escritura diferida)"""
+        self.escrituras.registrar_acceso(user_id)
+
+    def registrar_evento(self, usuario_id, accion, detalle=None):
+        """Registrar un evento de auditoría (escritura diferida)"""
+        self.escrituras.registrar_evento(usuario_id, accion, detalle)
+
+    # Campos del funcionario que el administrador puede modificar
+    CAMPOS_ACTUALIZABLES = [
+        'primer_apellido', 'segundo_apellido', 'tercer_apellido',
+        'primer_nombre', 'segundo_nombre', 'tercer_nombre',
+        'tipo_identificacion', 'nro_resolucion', 'fecha_resolucion',
+        'fecha_posesion', 'nro_memorandum_designacion', 'fecha_memorandum',
+        'nro_item', 'administracion', 'jerarquia', 'depende_de',
+        'unidad_organizacional', 'cargo', 'puesto', 'direccion_oficina',
+        'piso_interno', 'estado'
+    ]
+
+    def actualizar_funcionario(self, ci, datos):
+        """Actualizar los campos modificables de un funcionario"""
+        set_clause = []
+        valores = []
+
+        for campo in self.CAMPOS_ACTUALIZABLES:
+            valor = datos.get(campo)
+            if valor is not None:
+                set_clause.append(f"{campo} = ?")
+                valores.append(valor)
+
+        # Agregar fecha de actualización y nueva versión de la ficha
+        set_clause.append("fecha_actualizacion = CURRENT_TIMESTAMP")
+        set_clause.append("version_ficha = version_ficha + 1")
+        valores.append(ci)
+
+        with self.conexion() as conn:
+            conn.execute(f"UPDATE funcionarios SET {', '.join(set_clause)} WHERE ci = ?", valores)
+        return True
+
+    def cambiar_estado_funcionario(self, ci, estado, usuario_activo):
+        """Cambiar estado del funcionario y (des)activar su usuario"""
+        with self.conexion() as conn:
+            conn.execute('''
+            UPDATE funcionarios 
+            SET estado = ?, 
+                fecha_actualizacion = CURRENT_TIMESTAMP,
+                version_ficha = version_ficha + 1
+            WHERE ci = ?
+            ''', (estado, ci))
+
+            conn.execute("UPDATE usuarios SET activo = ? WHERE ci = ?",
+                         (1 if usuario_activo else 0, ci))
+        return True
+
+    def dar_baja_funcionario(self, ci):
+        """Dar de baja al funcionario y desactivar su usuario"""
+        return self.cambiar_estado_funcionario(ci, 'baja', usuario_activo=False)
+
+    def activar_funcionario(self, ci):
+        """Reactivar al funcionario y a su usuario"""
+        return self.cambiar_estado_funcionario(ci, 'activo', usuario_activo=True)
+
+    # Documentos que además quedan como imagen en el registro del funcionario
+    CAMPOS_IMAGEN = {'foto': 'foto_path', 'firma': 'firma_path', 'huella': 'huella_path'}
+
+    def registrar_documento(self, funcionario_id, tipo_documento, nombre_archivo, archivo):
+        """Registrar una subida ya guardada en el almacén (resultado de AlmacenArchivos.guardar)"""
+        with self.conexion() as conn:
+            cursor = conn.execute('''
+            INSERT INTO documentos (funcionario_id, tipo_documento, nombre_archivo, ruta_archivo,
+                                    sha256, tamano, tipo_mime)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (funcionario_id, tipo_documento, nombre_archivo, archivo['ruta'],
+                  archivo['sha256'], archivo['tamano'], archivo['tipo_mime']))
+
+            campo = self.CAMPOS_IMAGEN.get(tipo_documento)
+            if campo:
+                conn.execute(f'''
+                UPDATE funcionarios
+                SET {campo} = ?, fecha_actualizacion = CURRENT_TIMESTAMP, version_ficha = version_ficha + 1
+                WHERE id = ?
+                ''', (archivo['ruta'], funcionario_id))
+        return cursor.lastrowid
+
+    def get_documentos(self, funcionario_id):
+        """Documentos subidos por (o para) un funcionario, del más reciente al más antiguo"""
+        with self.conexion() as conn:
+            return [dict(fila) for fila in conn.execute(
+                "SELECT * FROM documentos WHERE funcionario_id = ? ORDER BY fecha_subida DESC, id DESC",
+                (funcionario_id,))]
+
+    def get_tipo_imagen(self, sha256, funcionario_id=None):
+        """Tipo MIME de una foto, firma o huella registrada con ese contenido (None si no hay)
+
+        Con `funcionario_id` solo cuenta si pertenece a ese funcionario.
+        """
+        sql = f'''
+        SELECT tipo_mime FROM documentos
+        WHERE sha256 = ? AND tipo_documento IN ({', '.join('?' * len(self.CAMPOS_IMAGEN))})
+        '''
+        valores = [sha256, *self.CAMPOS_IMAGEN]
+        if funcionario_id is not None:
+            sql += " AND funcionario_id = ?"
+            valores.append(funcionario_id)
+        with self.conexion() as conn:
+            fila = conn.execute(sql + " LIMIT 1", valores).fetchone()
+        return fila[0] if fila else None
+
+    def get_documento(self, documento_id):
+        """Obtener un documento por id"""
+        with self.conexion() as conn:
+            fila = conn.execute("SELECT * FROM documentos WHERE id = ?", (documento_id,)).fetchone()
+        return dict(fila) if fila else None
@@ -0,0 +1,150 @@
+"""
+Derivados de las imágenes del registro (foto, firma y huella).
+
+Cada imagen subida se reduce una sola vez a tamaños fijos: la miniatura
+de las filas del listado, la vista de la ficha y la variante de impresión
+del formulario R-100 (~300 ppp). Los derivados se generan en un pool de
+hilos en segundo plano apenas se sube la imagen y se guardan en disco
+junto al almacén, con el sha256 del original en el nombre: el mismo
+contenido nunca se procesa dos veces y la URL de un derivado no cambia
+nunca (se sirve como inmutable). Si falta un derivado (almacén copiado,
+variante nueva) se genera en el momento en que se pide.
+
+Pillow es opcional: sin él no hay derivados y se sirve el original.
+"""
+import contextlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Variante -> (ancho, alto, recortar al tamaño exacto o solo encajar)
+VARIANTES = {
+    'miniatura': (64, 64, True),      # filas del listado de funcionarios
+    'ficha': (240, 240, False),       # funcionario_ver
+    'impresion': (600, 600, False),   # formulario R-100 impreso
+}
+
+EXTENSIONES = {'image/jpeg': 'jpg', 'image/png': 'png'}
+
+# Límite de píxeles del original (una foto de celular de 50 MP entra holgada)
+MAX_PIXELES = 80_000_000
+
+
+class GeneradorDerivados:
+    """Miniaturas y variantes de impresión cacheadas en disco por sha256"""
+
+    def __init__(self, almacen, hilos=2):
+        self.almacen = almacen
+        self.directorio = os.path.join(almacen.raiz, 'derivados')
+        self.hilos = hilos
+        self._pool = None
+        self._lock = threading.RLock()
+        self._en_curso = {}  # (sha256, variante) -> Future
+
+    @property
+    def disponible(self):
+        """True si Pillow está instalado"""
+        return Image is not None
+
+    def _ejecutor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='derivados')
+        return self._pool
+
+    def ruta(self, sha256, variante, tipo_mime):
+        """Ruta absoluta del derivado (exista o no)"""
+        relativa = self.almacen.ruta_relativa(sha256)
+        return os.path.abspath(os.path.join(self.directorio, variante, *relativa.split('/'))
+                               + '.' + EXTENSIONES[tipo_mime])
+
+    def _generar(self, sha256, variante, tipo_mime):
+        """Escribir el derivado en disco (renombrando un temporal: nunca queda a medias)"""
+        destino = self.ruta(sha256, variante, tipo_mime)
+        if os.path.exists(destino):
+            return destino
+
+        ancho, alto, recortar = VARIANTES[variante]
+        with Image.open(self.almacen.ruta(sha256)) as imagen:
+            if imagen.width * imagen.height > MAX_PIXELES:
+                raise ValueError(f"Imagen demasiado grande: {imagen.width}x{imagen.height}")
+            # JPEG: decodificar directamente a una escala reducida (mucho menos trabajo)
+            imagen.draft('RGB', (ancho * 2, alto * 2))
+            imagen = ImageOps.exif_transpose(imagen)
+            if recortar:
+                imagen = ImageOps.fit(imagen, (ancho, alto), Image.LANCZOS)
+            else:
+                imagen.thumbnail((ancho, alto), Image.LANCZOS)
+
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            fd, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), prefix='.derivado_')
+            try:
+                with os.fdopen(fd, 'wb') as archivo:
+                    if tipo_mime == 'image/jpeg':
+                        imagen.convert('RGB').save(archivo, 'JPEG', quality=85, optimize=True, progressive=True)
+                    else:
+                        # Firmas y huellas: PNG conserva trazos y transparencia
+                        imagen.save(archivo, 'PNG', optimize=True)
+                os.chmod(temporal, 0o644)
+                os.replace(temporal, destino)
+            except BaseException:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(temporal)
+                raise
+        return destino
+
+    def _enviar(self, sha256, variante, tipo_mime):
+        """Future de la generación; una sola por derivado aunque lo pidan varias peticiones"""
+        clave = (sha256, variante)
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            if futuro is None:
+                futuro = self._ejecutor().submit(self._generar, sha256, variante, tipo_mime)
+                self._en_curso[clave] = futuro
+                futuro.add_done_callback(lambda f: self._terminar(clave, f))
+        return futuro
+
+    def _terminar(self, clave, futuro):
+        with self._lock:
+            self._en_curso.pop(clave, None)
+        if not futuro.cancelled() and futuro.exception() is not None:
+            print(f"⚠️ No se pudo generar {clave[1]} de {clave[0][:12]}: {futuro.exception()}")
+
+    def programar(self, sha256, tipo_mime):
+        """Generar en segundo plano todas las variantes de una imagen recién subida"""
+        if not self.disponible or tipo_mime not in EXTENSIONES:
+            return
+        for variante in VARIANTES:
+            self._enviar(sha256, variante, tipo_mime)
+
+    def obtener(self, sha256, variante, tipo_mime, espera=30):
+        """Ruta del derivado, generándolo si falta; None si no se puede generar
+
+        Con None (sin Pillow o imagen ilegible) se sirve el original.
+        """
+        if not self.disponible or tipo_mime not in EXTENSIONES:
+            return None
+        destino = self.ruta(sha256, variante, tipo_mime)
+        if os.path.exists(destino):
+            return destino
+        try:
+            return self._enviar(sha256, variante, tipo_mime).result(timeout=espera)
+        except Exception:
+            return None  # Ya informado al terminar la generación (o todavía en curso)
+
+    def reiniciar_tras_fork(self):
+        """En un proceso hijo: los hilos del pool heredado no existen aquí"""
+        self._pool = None
+        self._lock = threading.RLock()
+        self._en_curso = {}
+
+    def cerrar(self):
+        """Esperar las generaciones pendientes y terminar el pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
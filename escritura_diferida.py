@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+
+def _ahora():
+    """Marca de tiempo UTC en el mismo formato que CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class BufferEscritura:
+    """Escrituras pequeñas y frecuentes diferidas (write-behind)
+
+    Las actualizaciones de último acceso y los eventos de auditoría se
+    acumulan en memoria y un hilo en segundo plano los escribe juntos, en
+    una sola transacción, cada `intervalo` segundos o al llegar a
+    `max_pendientes`. Así los logins simultáneos no compiten por el bloqueo
+    de escritura de SQLite. Los accesos del mismo usuario se combinan (solo
+    importa el último). Con intervalo=0 cada registro se escribe de
+    inmediato (útil en scripts).
+    """
+
+    def __init__(self, db, intervalo=0.5, max_pendientes=500, max_eventos=50000):
+        self.db = db
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        self.max_eventos = max_eventos  # Tope de eventos en memoria si la base falla
+        self._lock = threading.Lock()
+        self._lock_vaciado = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._accesos = {}  # user_id -> fecha del último acceso
+        self._eventos = deque(maxlen=max_eventos)  # (usuario_id, accion, detalle, fecha)
+        self._metricas = {
+            'vaciados': 0,
+            'filas_escritas': 0,
+            'errores': 0,
+            'eventos_descartados': 0,
+            'ultimo_vaciado_ms': 0.0,
+            'max_vaciado_ms': 0.0,
+            'total_vaciado_ms': 0.0,
+        }
+
+        self._hilo = None
+        if intervalo:
+            self._hilo = threading.Thread(target=self._vaciar_periodico,
+                                          name='talento-escritura', daemon=True)
+            self._hilo.start()
+
+    def pendientes(self):
+        """Cantidad de escrituras en espera (profundidad de la cola)"""
+        with self._lock:
+            return len(self._accesos) + len(self._eventos)
+
+    def registrar_acceso(self, user_id):
+        """Anotar el último acceso de un usuario"""
+        with self._lock:
+            self._accesos[user_id] = _ahora()
+        self._avisar()
+
+    def registrar_evento(self, usuario_id, accion, detalle=None):
+        """Anotar un evento de auditoría"""
+        with self._lock:
+            if len(self._eventos) == self._eventos.maxlen:
+                self._metricas['eventos_descartados'] += 1  # append descarta el más antiguo
+            self._eventos.append((usuario_id, accion, detalle, _ahora()))
+        self._avisar()
+
+    def _avisar(self):
+        if not self.intervalo or self._hilo is None:
+            self.vaciar()
+        elif self.pendientes() >= self.max_pendientes:
+            self._hay_trabajo.set()
+
+    def _vaciar_periodico(self):
+        """Hilo que escribe lo pendiente cada `intervalo` segundos o al llenarse"""
+        while not self._detener.is_set():
+            self._hay_trabajo.wait(self.intervalo)
+            self._hay_trabajo.clear()
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribir todo lo pendiente en una transacción; devuelve filas escritas"""
+        with self._lock_vaciado:
+            with self._lock:
+                accesos, self._accesos = self._accesos, {}
+                eventos, self._eventos = self._eventos, deque(maxlen=self.max_eventos)
+            if not accesos and not eventos:
+                return 0
+
+            inicio = time.perf_counter()
+            try:
+                with self.db.conexion() as conn:
+                    conn.executemany("UPDATE usuarios SET ultimo_acceso = ? WHERE id = ?",
+                                     [(fecha, user_id) for user_id, fecha in accesos.items()])
+                    conn.executemany("""
+                        INSERT INTO auditoria (usuario_id, accion, detalle, fecha)
+                        VALUES (?, ?, ?, ?)
+                    """, eventos)
+            except sqlite3.Error as e:
+                # Devolver lo tomado a la cola para el próximo intento
+                with self._lock:
+                    for user_id, fecha in accesos.items():
+                        if fecha > self._accesos.get(user_id, ''):
+                            self._accesos[user_id] = fecha
+                    # Los tomados van antes que los llegados durante el intento;
+                    # si entre ambos superan el tope se descartan los más antiguos
+                    sobrantes = len(eventos) + len(self._eventos) - self.max_eventos
+                    eventos.extend(self._eventos)
+                    self._eventos = eventos
+                    if sobrantes > 0:
+                        self._metricas['eventos_descartados'] += sobrantes
+                    self._metricas['errores'] += 1
+                print(f"⚠️ Error al escribir pendientes: {e}")
+                return 0
+
+            duracion = (time.perf_counter() - inicio) * 1000
+            filas = len(accesos) + len(eventos)
+            with self._lock:
+                metricas = self._metricas
+                metricas['vaciados'] += 1
+                metricas['filas_escritas'] += filas
+                metricas['ultimo_vaciado_ms'] = duracion
+                metricas['max_vaciado_ms'] = max(metricas['max_vaciado_ms'], duracion)
+                metricas['total_vaciado_ms'] += duracion
+            return filas
+
+    def metricas(self):
+        """Profundidad de la cola y latencia de los vaciados"""
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['pendientes'] = len(self._accesos) + len(self._eventos)
+        metricas['promedio_vaciado_ms'] = (metricas['total_vaciado_ms'] / metricas['vaciados']
+                                           if metricas['vaciados'] else 0.0)
+        return metricas
+
+    def cerrar(self):
+        """Detener el hilo y escribir lo que quede pendiente"""
+        self._detener.set()
+        self._hay_trabajo.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        self.vaciar()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Exportación de funcionarios a CSV o XLSX (registro completo y datos R-100).
+
+Las filas se leen de la base por lotes y se escriben a medida que llegan:
+ni la consulta ni el archivo se arman completos en memoria, así que el
+consumo es el mismo para cien o cien mil funcionarios. El XLSX se escribe
+directamente como ZIP (hoja con cadenas en línea), sin librerías externas.
+
+Uso:
+    python exportacion.py funcionarios.csv
+    python exportacion.py activos.xlsx --estado activo --columnas ci,primer_apellido,primer_nombre,cargo
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import zipfile
+from xml.sax.saxutils import escape
+
+from database import Database
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Caracteres de control que XML no admite
+_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Un texto que empieza así Excel lo ejecuta como fórmula al abrir el CSV
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _valor_csv(valor):
+    """Valor de una celda CSV; los textos con forma de fórmula van precedidos de '"""
+    if valor is None:
+        return ''
+    if isinstance(valor, str) and valor.startswith(_INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def exportar_csv(filas, filas_por_bloque=500):
+    """Generador de bloques de bytes CSV (UTF-8 con BOM para Excel)"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    for nro, fila in enumerate(filas, 1):
+        escritor.writerow([_valor_csv(valor) for valor in fila])
+        if nro % filas_por_bloque == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _SalidaEnBloques:
+    """Destino de escritura no posicionable para zipfile: acumula bytes
+    que el generador va entregando"""
+
+    def __init__(self):
+        self._bloques = []
+
+    def write(self, datos):
+        self._bloques.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._bloques)
+        self._bloques.clear()
+        return datos
+
+
+def _celda(valor):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_INVALIDOS_XML.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>')
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>')
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets></workbook>')
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>')
+
+
+def exportar_xlsx(filas, hoja='Funcionarios', filas_por_bloque=500):
+    """Generador de bloques de bytes de un libro XLSX de una sola hoja"""
+    salida = _SalidaEnBloques()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        libro.writestr('_rels/.rels', _RELS)
+        libro.writestr('xl/workbook.xml', _WORKBOOK.format(hoja=escape(hoja)))
+        libro.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield salida.vaciar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja_xml:
+            hoja_xml.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                           b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                           b'<sheetData>')
+            for nro, fila in enumerate(filas, 1):
+                hoja_xml.write(('<row>' + ''.join(map(_celda, fila)) + '</row>').encode('utf-8'))
+                if nro % filas_por_bloque == 0:
+                    yield salida.vaciar()
+            hoja_xml.write(b'</sheetData></worksheet>')
+    yield salida.vaciar()
+
+
+def exportar(filas, formato):
+    """Generador de bytes del archivo en el formato pedido"""
+    if formato == 'csv':
+        return exportar_csv(filas)
+    if formato == 'xlsx':
+        return exportar_xlsx(filas)
+    raise ValueError(f"Formato no soportado: {formato}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archivo', help='Archivo de salida (.csv o .xlsx)')
+    parser.add_argument('--formato', choices=list(FORMATOS), help='Por defecto según la extensión')
+    parser.add_argument('--columnas', help='Columnas separadas por coma (por defecto todas)')
+    parser.add_argument('--estado', help='Solo funcionarios en este estado')
+    parser.add_argument('--unidad', help='Solo esta unidad organizacional')
+    parser.add_argument('--cargo', help='Solo este cargo')
+    parser.add_argument('--listar-columnas', action='store_true', help='Mostrar las columnas disponibles')
+    parser.add_argument('--db', default='instance/talento.db', help='Ruta de la base de datos')
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        if args.listar_columnas:
+            print('\n'.join(db.columnas_exportacion()))
+            return 0
+
+        formato = args.formato or ('xlsx' if os.path.splitext(args.archivo)[1].lower() == '.xlsx' else 'csv')
+        columnas = args.columnas.split(',') if args.columnas else None
+        filas = db.iterar_exportacion(columnas, estado=args.estado, unidad=args.unidad, cargo=args.cargo)
+
+        contador = {'filas': -1}  # La primera fila es el encabezado
+
+        def contar(filas):
+            for fila in filas:
+                contador['filas'] += 1
+                yield fila
+
+        with open(args.archivo, 'wb') as salida:
+            for bloque in exportar(contar(filas), formato):
+                salida.write(bloque)
+    finally:
+        db.cerrar()
+
+    print(f"✅ {contador['filas']} funcionarios exportados a {args.archivo}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
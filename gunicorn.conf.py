@@ -0,0 +1,53 @@
+"""
+Configuración de gunicorn para producción.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Variables de entorno: GUNICORN_BIND, GUNICORN_WORKERS, GUNICORN_THREADS,
+GUNICORN_WORKER_CLASS, GUNICORN_PRELOAD, GUNICORN_TIMEOUT, GUNICORN_ACCESSLOG.
+Con varios workers conviene FICHAS_CACHE_COMPARTIDA (caché de fichas
+compartida entre procesos de la misma máquina).
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', min(4, multiprocessing.cpu_count() * 2 + 1)))
+
+# gthread: cada worker atiende varias peticiones con hilos que comparten el
+# pool de conexiones y las cachés del proceso. gevent/eventlet no convienen:
+# las llamadas a sqlite3 y a scrypt bloquean el loop de eventos.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))  # No más que DB_POOL_SIZE
+
+# preload: el maestro importa la aplicación una vez (migraciones incluidas)
+# y los workers se crean con fork
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+max_requests = 5000          # Reciclar workers para acotar la memoria
+max_requests_jitter = 500
+accesslog = os.environ.get('GUNICORN_ACCESSLOG')  # '-' para stdout
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    # Sin hilos ni conexiones SQLite abiertas en el maestro al hacer fork
+    if server.cfg.preload_app:
+        import app
+        app.preparar_fork()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        import app
+        app.reiniciar_tras_fork()
+
+
+def worker_exit(server, worker):
+    # Escribir las escrituras diferidas pendientes y terminar los derivados en curso
+    import app
+    app.db.cerrar()
+    app.derivados.cerrar()
@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+
+# Formato actual: scrypt$<log2 N>$<r>$<p>$<sal base64>$<hash base64>
+# Formato anterior (v0): sha256 hexadecimal con sal fija, sin prefijo
+ESQUEMA_ACTUAL = 'scrypt'
+COSTO_POR_DEFECTO = 14  # N = 2^14, ~16MB de memoria por hash con r = 8
+# Contraseñas iniciales importadas en bloque: son el CI (no es un secreto) y el
+# hash se actualiza a COSTO_POR_DEFECTO en el primer login; ~64 veces más barato
+COSTO_IMPORTACION = 8
+SAL_LEGADO = "talento_humano_2025"
+ESPERA_MAXIMA = 30  # Segundos que una petición espera un hash del pool
+
+
+def _b64(datos):
+    return base64.b64encode(datos).decode().rstrip('=')
+
+
+def _de_b64(texto):
+    return base64.b64decode(texto + '=' * (-len(texto) % 4))
+
+
+def _scrypt(password, sal, costo, r, p):
+    n = 2 ** costo
+    return hashlib.scrypt(password.encode(), salt=sal, n=n, r=r, p=p,
+                          maxmem=2 * 128 * r * n, dklen=32)
+
+
+def calcular_hash(password, costo=COSTO_POR_DEFECTO, r=8, p=1):
+    """Hash scrypt con sal aleatoria por usuario, en formato versionado"""
+    sal = secrets.token_bytes(16)
+    digest = _scrypt(password, sal, costo, r, p)
+    return f"{ESQUEMA_ACTUAL}${costo}${r}${p}${_b64(sal)}${_b64(digest)}"
+
+
+def verificar_hash(password, password_hash):
+    """Verificar una contraseña contra un hash en cualquier formato soportado"""
+    if not password_hash:
+        return False
+
+    if '$' not in password_hash:
+        # v0: sha256 con sal fija
+        legado = hashlib.sha256((password + SAL_LEGADO).encode()).hexdigest()
+        return hmac.compare_digest(legado, password_hash)
+
+    try:
+        esquema, costo, r, p, sal, digest = password_hash.split('$')
+        if esquema != ESQUEMA_ACTUAL:
+            return False
+        calculado = _scrypt(password, _de_b64(sal), int(costo), int(r), int(p))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(calculado, _de_b64(digest))
+
+
+def necesita_actualizar(password_hash, costo=COSTO_POR_DEFECTO):
+    """True si el hash usa un formato anterior o un costo menor al configurado"""
+    if not password_hash or '$' not in password_hash:
+        return True
+    partes = password_hash.split('$')
+    return partes[0] != ESQUEMA_ACTUAL or len(partes) != 6 or int(partes[1]) < costo
+
+
+class ServicioHash:
+    """Hash y verificación de contraseñas fuera del hilo de la petición
+
+    scrypt consume CPU y memoria a propósito; se ejecuta en un pool de
+    procesos acotado para que el login y la creación masiva de cuentas no
+    bloqueen a los demás hilos del servidor. Con procesos=0 se calcula en
+    el mismo proceso (útil en scripts y pruebas).
+    """
+
+    def __init__(self, costo=COSTO_POR_DEFECTO, procesos=None):
+        self.costo = costo
+        self.procesos = min(4, os.cpu_count() or 1) if procesos is None else procesos
+        self._pool = None
+
+    def iniciar(self):
+        """Crear el pool y lanzar sus procesos ahora mismo
+
+        Los procesos se crean con fork, así que debe llamarse antes de
+        arrancar hilos (checkpoint, escrituras diferidas, servidor): un fork
+        con otros hilos en marcha puede dejar al hijo con un lock tomado que
+        nadie liberará.
+        """
+        if self.procesos and self._pool is None:
+            metodo = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+            self._pool = ProcessPoolExecutor(max_workers=self.procesos,
+                                             mp_context=multiprocessing.get_context(metodo))
+            # Con fork, el primer envío lanza todos los procesos de una vez
+            self._pool.submit(int).result(timeout=ESPERA_MAXIMA)
+
+    def _ejecutor(self):
+        if self._pool is None:
+            self.iniciar()  # Tarde: solo seguro si el proceso todavía no tiene hilos
+        return self._pool
+
+    def hash(self, password):
+        """Hash de una contraseña con el costo configurado"""
+        if not self.procesos:
+            return calcular_hash(password, self.costo)
+        return self._ejecutor().submit(calcular_hash, password, self.costo).result(timeout=ESPERA_MAXIMA)
+
+    def verificar(self, password, password_hash):
+        """Verificar una contraseña (sha256 legado o scrypt)"""
+        if not self.procesos or '$' not in (password_hash or ''):
+            return verificar_hash(password, password_hash)
+        return self._ejecutor().submit(verificar_hash, password, password_hash).result(timeout=ESPERA_MAXIMA)
+
+    def necesita_actualizar(self, password_hash):
+        """True si conviene volver a hashear la contraseña en el próximo login"""
+        return necesita_actualizar(password_hash, self.costo)
+
+    def hash_lote(self, passwords, costo=None):
+        """Hashes de varias contraseñas repartidas entre los procesos del pool"""
+        passwords = list(passwords)
+        costos = [costo or self.costo] * len(passwords)
+        if not self.procesos:
+            return list(map(calcular_hash, passwords, costos))
+        chunksize = max(1, len(passwords) // (self.procesos * 4))
+        return list(self._ejecutor().map(calcular_hash, passwords, costos, chunksize=chunksize))
+
+    def reiniciar_tras_fork(self):
+        """En un proceso hijo: no usar el pool heredado (sus hilos no existen aquí)
+        y crear uno propio antes de que el hijo arranque los suyos"""
+        self._pool = None
+        self.iniciar()
+
+    def cerrar(self):
+        """Terminar los procesos del pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
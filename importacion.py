@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Importación masiva de funcionarios (migración de datos del sistema anterior).
+
+Lee registros desde CSV o JSON lines en lotes, valida cada registro,
+genera el usuario de aplicación en memoria, calcula los hashes de las
+contraseñas en el pool de procesos del ServicioHash e inserta funcionarios
+y usuarios con executemany, una transacción por lote.
+
+La contraseña inicial es el CI, así que se importa con un costo de hash
+menor (COSTO_IMPORTACION, --costo); el hash se actualiza al costo normal
+en el primer login del funcionario.
+
+Uso:
+    python importacion.py legado.csv --rechazos rechazos.csv
+    python importacion.py legado.jsonl --formato jsonl --lote 5000 --costo 12
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from itertools import islice
+
+from database import DOMINIO_CORREO, ESTADOS_FUNCIONARIO, Database, base_username, siguiente_username
+from hashing import COSTO_IMPORTACION, ServicioHash
+
+CAMPOS_OBLIGATORIOS = ['ci', 'primer_apellido', 'primer_nombre']
+ESTADOS_VALIDOS = set(ESTADOS_FUNCIONARIO)
+
+
+def leer_registros(archivo, formato='csv'):
+    """Generador de (nro_linea, registro, error) desde un archivo de texto"""
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        for registro in lector:
+            yield lector.line_num, registro, None
+    elif formato == 'jsonl':
+        for nro_linea, linea in enumerate(archivo, 1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                registro = json.loads(linea)
+            except ValueError as e:
+                yield nro_linea, None, f"JSON inválido: {e}"
+                continue
+            if not isinstance(registro, dict):
+                yield nro_linea, None, "El registro no es un objeto JSON"
+                continue
+            yield nro_linea, registro, None
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+
+class ImportadorFuncionarios:
+    """Importa funcionarios con su usuario en lotes transaccionales"""
+
+    def __init__(self, db, servicio_hash, tamano_lote=1000, progreso=None, costo=COSTO_IMPORTACION):
+        self.db = db
+        self.servicio_hash = servicio_hash
+        self.costo = costo  # Costo scrypt de las contraseñas iniciales (ver docstring del módulo)
+        self.tamano_lote = tamano_lote
+        self.progreso = progreso  # Función(resumen) llamada después de cada lote
+
+    def importar(self, archivo, formato='csv'):
+        """Importar todos los registros del archivo y devolver el resumen"""
+        resumen = {'procesados': 0, 'importados': 0, 'rechazados': [], 'segundos': 0.0}
+        inicio = time.monotonic()
+        ocupados = self.db.get_all_usernames()
+        contadores = {}
+        cis_vistos = set()
+        registros = leer_registros(archivo, formato)
+
+        while True:
+            lote = list(islice(registros, self.tamano_lote))
+            if not lote:
+                break
+            resumen['procesados'] += len(lote)
+
+            validos = self._preparar_lote(lote, cis_vistos, ocupados, contadores, resumen)
+            hashes = self.servicio_hash.hash_lote((datos['clave_generada'] for datos in validos),
+                                                  costo=self.costo)
+            for datos, password_hash in zip(validos, hashes):
+                datos['password_hash'] = password_hash
+
+            self._insertar_lote(validos, resumen)
+            resumen['segundos'] = time.monotonic() - inicio
+            if self.progreso:
+                self.progreso(resumen)
+
+        resumen['segundos'] = time.monotonic() - inicio
+        return resumen
+
+    def _preparar_lote(self, lote, cis_vistos, ocupados, contadores, resumen):
+        """Validar los registros del lote y completar los datos generados"""
+        candidatos = []
+        for nro_linea, registro, error in lote:
+            if error:
+                self._rechazar(resumen, nro_linea, None, error)
+                continue
+
+            datos = {campo: (str(valor).strip() if valor is not None else None) or None
+                     for campo, valor in registro.items()
+                     if campo in Database.CAMPOS_FUNCIONARIO or campo == 'estado'}
+            faltantes = [campo for campo in CAMPOS_OBLIGATORIOS if not datos.get(campo)]
+            if faltantes:
+                self._rechazar(resumen, nro_linea, datos.get('ci'), f"Faltan campos: {', '.join(faltantes)}")
+                continue
+            if datos['ci'] in cis_vistos:
+                self._rechazar(resumen, nro_linea, datos['ci'], "CI repetido en el archivo")
+                continue
+            datos['estado'] = datos.get('estado') or 'pendiente'
+            if datos['estado'] not in ESTADOS_VALIDOS:
+                self._rechazar(resumen, nro_linea, datos['ci'], f"Estado inválido: {datos['estado']}")
+                continue
+
+            cis_vistos.add(datos['ci'])
+            candidatos.append((nro_linea, datos))
+
+        # Un solo viaje a la base para saber qué CIs ya existen
+        existentes = self.db.get_cis_existentes(datos['ci'] for _, datos in candidatos)
+
+        validos = []
+        for nro_linea, datos in candidatos:
+            if datos['ci'] in existentes:
+                self._rechazar(resumen, nro_linea, datos['ci'], "CI ya registrado")
+                continue
+
+            username = siguiente_username(base_username(datos['primer_nombre'], datos['primer_apellido']),
+                                          datos.get('segundo_apellido'), ocupados, contadores)
+            ocupados.add(username)
+            datos['tipo_identificacion'] = datos.get('tipo_identificacion') or 'CI'
+            datos['usuario_aplicacion'] = username
+            datos['clave_generada'] = datos['ci']  # Contraseña inicial = CI
+            datos['correo_interno'] = f"{username}@{DOMINIO_CORREO}"
+            datos['nro_linea'] = nro_linea
+            validos.append(datos)
+        return validos
+
+    def _insertar_lote(self, validos, resumen):
+        """Insertar el lote completo; si falla, fila por fila para aislar errores"""
+        if not validos:
+            return
+        try:
+            resumen['importados'] += self.db.crear_funcionarios_lote(validos)
+            return
+        except sqlite3.IntegrityError:
+            pass
+
+        for datos in validos:
+            try:
+                resumen['importados'] += self.db.crear_funcionarios_lote([datos])
+            except sqlite3.IntegrityError as e:
+                self._rechazar(resumen, datos['nro_linea'], datos['ci'], f"Restricción de base de datos: {e}")
+
+    @staticmethod
+    def _rechazar(resumen, nro_linea, ci, motivo):
+        resumen['rechazados'].append({'linea': nro_linea, 'ci': ci, 'motivo': motivo})
+
+
+def formato_por_nombre(nombre):
+    """Deducir el formato a partir de la extensión del archivo"""
+    return 'jsonl' if os.path.splitext(nombre)[1].lower() in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archivo', help='Archivo CSV o JSON lines con los registros')
+    parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Por defecto según la extensión')
+    parser.add_argument('--lote', type=int, default=1000, help='Registros por transacción')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos para hashear (0 = sin pool)')
+    parser.add_argument('--costo', type=int, default=COSTO_IMPORTACION,
+                        help='Costo scrypt (log2 N) de las contraseñas iniciales')
+    parser.add_argument('--rechazos', help='Guardar los registros rechazados en este CSV')
+    parser.add_argument('--db', default='instance/talento.db', help='Ruta de la base de datos')
+    args = parser.parse_args()
+
+    def mostrar_progreso(resumen):
+        print(f"\r⏳ {resumen['procesados']} procesados | {resumen['importados']} importados | "
+              f"{len(resumen['rechazados'])} rechazados | {resumen['segundos']:.1f}s", end='', flush=True)
+
+    # El pool de hash antes que los hilos de la base (ver ServicioHash.iniciar)
+    servicio_hash = ServicioHash(costo=args.costo, procesos=args.procesos)
+    servicio_hash.iniciar()
+    db = Database(args.db)
+    importador = ImportadorFuncionarios(db, servicio_hash, tamano_lote=args.lote,
+                                        progreso=mostrar_progreso, costo=args.costo)
+    with open(args.archivo, encoding='utf-8-sig', newline='') as archivo:
+        resumen = importador.importar(archivo, args.formato or formato_por_nombre(args.archivo))
+    servicio_hash.cerrar()
+    db.cerrar()
+    print()
+
+    if args.rechazos and resumen['rechazados']:
+        with open(args.rechazos, 'w', encoding='utf-8', newline='') as salida:
+            escritor = csv.DictWriter(salida, fieldnames=['linea', 'ci', 'motivo'])
+            escritor.writeheader()
+            escritor.writerows(resumen['rechazados'])
+        print(f"📄 Rechazos guardados en: {args.rechazos}")
+
+    print(f"✅ Importación terminada: {resumen['importados']} de {resumen['procesados']} "
+          f"registros en {resumen['segundos']:.1f}s")
+    return 0 if not resumen['rechazados'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+# Límites de los histogramas: latencias en segundos y cantidades por petición
+LIMITES_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CANTIDAD = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+SENTENCIAS_ESCRITURA = {'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'BEGIN'}
+
+# Contadores de la petición en curso (None fuera de una petición)
+_peticion = ContextVar('talento_peticion', default=None)
+
+
+class Histograma:
+    """Histograma acumulativo con límites fijos (formato Prometheus)"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    return '{' + ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas) + '}'
+
+
+class Metricas:
+    """Registro de métricas de peticiones HTTP y de SQL
+
+    Se activa solo si se crea una instancia y se pasa a Database y a
+    instrumentar(); sin ella no se envuelve ninguna conexión ni petición.
+    """
+
+    def __init__(self, lenta_ms=100, max_lentas=50):
+        self.lenta = lenta_ms / 1000
+        self._lock = threading.Lock()
+        self._histogramas = {}  # (nombre, etiquetas) -> Histograma
+        self._contadores = {}   # (nombre, etiquetas) -> valor
+        self._ayudas = {}
+        self._lentas = deque(maxlen=max_lentas)
+        self._recolectores = []  # Funciones que devuelven [(nombre, ayuda, {etiquetas: valor})]
+
+    # ---- Registro ----
+
+    def observar(self, nombre, valor, limites=LIMITES_SEGUNDOS, ayuda='', **etiquetas):
+        clave = (nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items())))
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma(limites)
+                self._ayudas.setdefault(nombre, ayuda)
+            histograma.observar(valor)
+
+    def incrementar(self, nombre, valor=1, ayuda='', **etiquetas):
+        clave = (nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+            self._ayudas.setdefault(nombre, ayuda)
+
+    def agregar_recolector(self, recolector):
+        """Registrar una función que aporta valores instantáneos (gauges)"""
+        self._recolectores.append(recolector)
+
+    # ---- Peticiones ----
+
+    def inicio_peticion(self):
+        """Empezar a contar SQL y conexiones de la petición actual"""
+        return _peticion.set({'consultas': 0, 'conexiones': 0, 'segundos_sql': 0.0})
+
+    def fin_peticion(self, token, endpoint, metodo, estado, duracion):
+        """Registrar la petición terminada y devolver sus contadores"""
+        datos = _peticion.get() or {}
+        _peticion.reset(token)
+        self.observar('talento_http_duracion_segundos', duracion,
+                      ayuda='Latencia de las peticiones por endpoint', endpoint=endpoint, metodo=metodo)
+        self.incrementar('talento_http_peticiones_total', ayuda='Peticiones atendidas',
+                         endpoint=endpoint, metodo=metodo, estado=estado)
+        self.observar('talento_sql_consultas_por_peticion', datos.get('consultas', 0), LIMITES_CANTIDAD,
+                      ayuda='Sentencias SQL ejecutadas por petición', endpoint=endpoint)
+        self.observar('talento_sql_conexiones_por_peticion', datos.get('conexiones', 0), LIMITES_CANTIDAD,
+                      ayuda='Conexiones tomadas del pool por petición', endpoint=endpoint)
+        return datos
+
+    # ---- SQL ----
+
+    def registrar_conexion(self):
+        datos = _peticion.get()
+        if datos is not None:
+            datos['conexiones'] += 1
+
+    def registrar_sql(self, sql, duracion, conn=None, params=(), inicio_escritura=False):
+        """Registrar una sentencia ejecutada (y su plan si fue lenta)"""
+        tipo = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+        datos = _peticion.get()
+        if datos is not None:
+            datos['consultas'] += 1
+            datos['segundos_sql'] += duracion
+        self.observar('talento_sql_duracion_segundos', duracion,
+                      ayuda='Duración de las sentencias SQL por tipo', tipo=tipo)
+        if inicio_escritura:
+            # La primera escritura de la transacción espera el bloqueo de escritura
+            self.observar('talento_sql_espera_bloqueo_segundos', duracion,
+                          ayuda='Tiempo hasta obtener el bloqueo de escritura de SQLite')
+
+        if duracion >= self.lenta:
+            plan = []
+            if conn is not None and tipo in ('SELECT', 'WITH'):
+                try:
+                    plan = [fila[3] for fila in sqlite3.Connection.execute(
+                        conn, f"EXPLAIN QUERY PLAN {sql}", params)]
+                except sqlite3.Error:
+                    pass
+            self.incrementar('talento_sql_lentas_total', ayuda='Sentencias más lentas que el umbral')
+            with self._lock:
+                self._lentas.append({'sql': ' '.join(sql.split()), 'ms': round(duracion * 1000, 2),
+                                     'plan': plan, 'fecha': time.time()})
+
+    def consultas_lentas(self):
+        """Últimas consultas lentas con su plan de ejecución"""
+        with self._lock:
+            return list(self._lentas)
+
+    # ---- Exposición ----
+
+    def exponer(self):
+        """Texto en formato de exposición de Prometheus"""
+        lineas = []
+        with self._lock:
+            histogramas = sorted(self._histogramas.items())
+            contadores = sorted(self._contadores.items())
+            ayudas = dict(self._ayudas)
+
+        declarados = set()
+
+        def declarar(nombre, tipo):
+            if nombre not in declarados:
+                declarados.add(nombre)
+                lineas.append(f"# HELP {nombre} {ayudas.get(nombre) or nombre}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+
+        for (nombre, etiquetas), valor in contadores:
+            declarar(nombre, 'counter')
+            lineas.append(f"{nombre}{_etiquetas(etiquetas)} {valor}")
+
+        for (nombre, etiquetas), histograma in histogramas:
+            declarar(nombre, 'histogram')
+            acumulado = 0
+            for limite, cuenta in zip(histograma.limites, histograma.cuentas):
+                acumulado += cuenta
+                lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas + (('le', limite),))} {acumulado}")
+            lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas + (('le', '+Inf'),))} {histograma.total}")
+            lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {histograma.suma}")
+            lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {histograma.total}")
+
+        for recolector in self._recolectores:
+            for nombre, ayuda, valores in recolector():
+                ayudas.setdefault(nombre, ayuda)
+                declarar(nombre, 'gauge')
+                for etiquetas, valor in valores.items():
+                    lineas.append(f"{nombre}{_etiquetas(etiquetas)} {valor}")
+        return '\n'.join(lineas) + '\n'
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que mide cada sentencia en el registro de su conexión"""
+
+    def _antes(self, sql):
+        """True si la sentencia abre la transacción de escritura"""
+        return (not self.connection.in_transaction
+                and sql.lstrip()[:7].upper().startswith(tuple(SENTENCIAS_ESCRITURA)))
+
+    def execute(self, sql, params=()):
+        inicio_escritura = self._antes(sql)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self.connection.metricas.registrar_sql(sql, time.perf_counter() - inicio, self.connection,
+                                                   params, inicio_escritura)
+
+    def executemany(self, sql, params):
+        inicio_escritura = self._antes(sql)
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, params)
+        finally:
+            self.connection.metricas.registrar_sql(sql, time.perf_counter() - inicio, self.connection,
+                                                   (), inicio_escritura)
+
+
+def instrumentar(app, metricas, cabecera_debug=False):
+    """Medir cada petición de la aplicación Flask
+
+    Con cabecera_debug=True cada respuesta incluye X-Talento-Debug con la
+    duración, las sentencias SQL, el tiempo en SQL y las conexiones usadas.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _inicio_metricas():
+        g.metricas_token = metricas.inicio_peticion()
+        g.metricas_inicio = time.perf_counter()
+
+    @app.after_request
+    def _fin_metricas(respuesta):
+        if 'metricas_token' not in g:
+            return respuesta
+        duracion = time.perf_counter() - g.metricas_inicio
+        datos = metricas.fin_peticion(g.pop('metricas_token'), request.endpoint or 'desconocido',
+                                      request.method, respuesta.status_code, duracion)
+        if cabecera_debug:
+            respuesta.headers['X-Talento-Debug'] = (
+                f"t={duracion * 1000:.1f}ms; sql={datos.get('consultas', 0)}; "
+                f"sql_ms={datos.get('segundos_sql', 0) * 1000:.1f}; conexiones={datos.get('conexiones', 0)}")
+        return respuesta
+
+    return app
@@ -0,0 +1,356 @@
+"""Esquema base: tablas del registro R-100, catálogos y usuario admin
+
+Es el esquema que init_db creaba en cada arranque. Todo es idempotente
+(IF NOT EXISTS, datos solo en tablas vacías) porque también se aplica
+sobre bases creadas antes de que existieran las migraciones.
+"""
+from hashing import calcular_hash
+
+DESCRIPCION = 'Esquema base (tablas R-100, catálogos y usuario admin)'
+
+TABLAS = [
+    """CREATE TABLE IF NOT EXISTS usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ci TEXT UNIQUE NOT NULL,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        rol TEXT NOT NULL DEFAULT 'funcionario',
+        activo INTEGER DEFAULT 1,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ultimo_acceso TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS funcionarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ci TEXT UNIQUE NOT NULL,
+        primer_apellido TEXT NOT NULL,
+        segundo_apellido TEXT,
+        tercer_apellido TEXT,
+        primer_nombre TEXT NOT NULL,
+        segundo_nombre TEXT,
+        tercer_nombre TEXT,
+        tipo_identificacion TEXT DEFAULT 'CI',
+
+        -- Campos básicos del sistema
+        estado TEXT DEFAULT 'pendiente',
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        fecha_actualizacion TIMESTAMP,
+
+        -- === NUEVOS CAMPOS SEGÚN DOCUMENTO R-100 ===
+        -- Datos de resolución
+        nro_resolucion TEXT,
+        fecha_resolucion DATE,
+        fecha_posesion DATE,
+        nro_memorandum_designacion TEXT,
+        fecha_memorandum DATE,
+
+        -- Datos de ítem
+        nro_item TEXT,
+        administracion TEXT,
+        jerarquia TEXT,
+        depende_de TEXT,
+        unidad_organizacional TEXT,
+        cargo TEXT,
+        puesto TEXT,
+        direccion_oficina TEXT,
+        piso_interno TEXT,
+
+        -- Archivos (rutas)
+        firma_path TEXT,
+        foto_path TEXT,
+        huella_path TEXT,
+
+        -- Datos generados
+        usuario_aplicacion TEXT,
+        clave_generada TEXT,
+        correo_interno TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS documentos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        tipo_documento TEXT NOT NULL,
+        nombre_archivo TEXT NOT NULL,
+        ruta_archivo TEXT NOT NULL,
+        fecha_subida TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS datos_adicionales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        genero TEXT,
+        expedido_en TEXT,
+        fecha_nacimiento DATE,
+        pais_nacimiento TEXT,
+        depto_nacimiento TEXT,
+        provincia_nacimiento TEXT,
+        lugar_nacimiento TEXT,
+        nro_libreta_militar TEXT,
+        afp TEXT,
+        nro_nua TEXT,
+        tipo_sangre TEXT,
+        fecha_caducidad_ci DATE,
+        estado_civil TEXT,
+        nro_hijos INTEGER DEFAULT 0,
+        nro_dependientes INTEGER DEFAULT 0,
+        direccion_domicilio TEXT,
+        nro_domicilio TEXT,
+        zona_domicilio TEXT,
+        ciudad_localidad TEXT,
+        tipo_vivienda TEXT,
+        nombre_tipo_vivienda TEXT,
+        piso TEXT,
+        depto TEXT,
+        casilla TEXT,
+        correo_electronico1 TEXT,
+        correo_electronico2 TEXT,
+        telefono_fijo1 TEXT,
+        telefono_fijo2 TEXT,
+        telefono_celular1 TEXT,
+        telefono_celular2 TEXT,
+        nro_carrera_administrativa TEXT,
+        fecha_cas DATE,
+        anos_cas INTEGER,
+        meses_cas INTEGER,
+        dias_cas INTEGER,
+        licencia_conducir TEXT,
+        categoria_licencia TEXT,
+        emergencia_contacto TEXT,
+        nro_declaracion_jurada TEXT,
+        fecha_declaracion_jurada DATE,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS parientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        parentesco TEXT,
+        primer_apellido TEXT,
+        segundo_apellido TEXT,
+        nombres TEXT,
+        nacionalidad TEXT,
+        telefono TEXT,
+        genero TEXT,
+        fecha_nacimiento DATE,
+        tipo_identificacion TEXT,
+        numero_identificacion TEXT,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS formacion_academica (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        pais_estudio TEXT,
+        estado_instruccion TEXT,
+        nivel_instruccion TEXT,
+        area TEXT,
+        tipo_entidad_academica TEXT,
+        institucion_academica TEXT,
+        nombre_institucion TEXT,
+        carrera TEXT,
+        titulado TEXT,
+        documento_respaldo TEXT,
+        detalle_documento TEXT,
+        fecha_inicio DATE,
+        fecha_final DATE,
+        nro_titulo_academico TEXT,
+        fecha_emision_titulo DATE,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS bachillerato (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        es_bachiller TEXT,
+        ano INTEGER,
+        unidad_educativa TEXT,
+        ultimo_curso_vencido TEXT,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS cursos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        nivel_instruccion TEXT,
+        area TEXT,
+        nombre_curso TEXT,
+        tipo_entidad_academica TEXT,
+        institucion_academica TEXT,
+        nro_horas INTEGER,
+        fecha_inicio DATE,
+        fecha_final DATE,
+        documento_respaldo TEXT,
+        detalle_documento TEXT,
+        pais_estudio TEXT,
+        depto_estudio TEXT,
+        capacitacion TEXT,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS idiomas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        idioma TEXT,
+        habla TEXT,
+        escribe TEXT,
+        lee TEXT,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS experiencia_laboral (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        entidad_empresa TEXT,
+        area_departamento TEXT,
+        tipo_entidad TEXT,
+        puesto TEXT,
+        jerarquia TEXT,
+        cargo_mando TEXT,
+        nro_dependientes INTEGER,
+        fecha_inicio DATE,
+        fecha_final DATE,
+        forma_ingreso TEXT,
+        causa_retiro TEXT,
+        nit_empresa TEXT,
+        haber_basico REAL,
+        pais TEXT,
+        descripcion_labores TEXT,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS capacitaciones_impartidas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        funcionario_id INTEGER NOT NULL,
+        tipo_entidad_academica TEXT,
+        institucion_academica TEXT,
+        nombre_institucion TEXT,
+        tipo_capacitacion TEXT,
+        carrera TEXT,
+        asignatura_tema TEXT,
+        nro_horas INTEGER,
+        fecha_desde DATE,
+        fecha_hasta DATE,
+        FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS parametros_genero (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS parametros_departamentos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS parametros_paises (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS parametros_estado_civil (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS parametros_tipo_sangre (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS parametros_gestora (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS parametros_parentesco (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS parametros_nacionalidad (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo TEXT UNIQUE NOT NULL,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1
+    )""",
+]
+
+# Datos iniciales de los catálogos (solo si la tabla está vacía)
+PARAMETROS_BASICOS = {
+    'genero': [
+        ('M', 'MASCULINO'),
+        ('F', 'FEMENINO')
+    ],
+    'departamentos': [
+        ('LP', 'LA PAZ'),
+        ('CB', 'COCHABAMBA'),
+        ('SC', 'SANTA CRUZ'),
+        ('OR', 'ORURO'),
+        ('PT', 'POTOSÍ'),
+        ('TJ', 'TARIJA'),
+        ('CH', 'CHUQUISACA'),
+        ('BN', 'BENI'),
+        ('PD', 'PANDO')
+    ],
+    'paises': [
+        ('BOL', 'BOLIVIA'),
+        ('ARG', 'ARGENTINA'),
+        ('BRA', 'BRASIL'),
+        ('CHL', 'CHILE'),
+        ('PER', 'PERÚ')
+    ],
+    'estado_civil': [
+        ('S', 'SOLTERO(A)'),
+        ('C', 'CASADO(A)'),
+        ('D', 'DIVORCIADO(A)'),
+        ('V', 'VIUDO(A)'),
+        ('U', 'UNIÓN LIBRE')
+    ],
+    'tipo_sangre': [
+        ('A+', 'A+'),
+        ('A-', 'A-'),
+        ('B+', 'B+'),
+        ('B-', 'B-'),
+        ('AB+', 'AB+'),
+        ('AB-', 'AB-'),
+        ('O+', 'O+'),
+        ('O-', 'O-')
+    ],
+    'gestora': [
+        ('CSS', 'CAJA DE SALUD DE SEGUROS SOCIALES'),
+        ('CPS', 'CAJA PETROLERA DE SALUD'),
+        ('CNS', 'CAJA NACIONAL DE SALUD'),
+        ('CSM', 'CAJA DE SALUD DE LA MUJER'),
+        ('CSR', 'CAJA DE SALUD RURAL')
+    ],
+    'parentesco': [
+        ('PAD', 'PADRE'),
+        ('MAD', 'MADRE'),
+        ('CON', 'CÓNYUGUE'),
+        ('HIJ', 'HIJO(A)'),
+        ('HER', 'HERMANO(A)'),
+        ('OTR', 'OTRO')
+    ],
+    'nacionalidad': [
+        ('BOL', 'BOLIVIANA'),
+        ('ARG', 'ARGENTINA'),
+        ('BRA', 'BRASILEÑA'),
+        ('CHL', 'CHILENA'),
+        ('PER', 'PERUANA'),
+        ('OTR', 'OTRA')
+    ]
+}
+
+
+def aplicar(conn):
+    for sentencia in TABLAS:
+        conn.execute(sentencia)
+
+    if not conn.execute("SELECT 1 FROM usuarios WHERE username = 'admin'").fetchone():
+        conn.execute("""
+            INSERT INTO usuarios (ci, username, email, password_hash, rol, activo)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, ('0000000', 'admin', 'admin@gobierno.talento.bo', calcular_hash('admin123'), 'admin', 1))
+
+    for tabla, datos in PARAMETROS_BASICOS.items():
+        if not conn.execute(f"SELECT 1 FROM parametros_{tabla} LIMIT 1").fetchone():
+            conn.executemany(f"INSERT INTO parametros_{tabla} (codigo, nombre) VALUES (?, ?)", datos)
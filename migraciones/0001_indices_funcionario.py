@@ -0,0 +1,24 @@
+"""Índices por funcionario_id y columnas de búsqueda de funcionarios"""
+
+DESCRIPCION = 'Índices por funcionario_id y columnas de búsqueda de funcionarios'
+
+# Tablas hijas de funcionarios (una o varias filas por funcionario_id)
+TABLAS_POR_FUNCIONARIO = [
+    'datos_adicionales', 'parientes', 'formacion_academica', 'bachillerato',
+    'cursos', 'idiomas', 'experiencia_laboral', 'capacitaciones_impartidas',
+    'documentos'
+]
+
+
+def aplicar(conn):
+    for tabla in TABLAS_POR_FUNCIONARIO:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_funcionario_id ON {tabla}(funcionario_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_funcionarios_estado ON funcionarios(estado)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_funcionarios_fecha_registro ON funcionarios(fecha_registro)")
+
+
+def revertir(conn):
+    for tabla in TABLAS_POR_FUNCIONARIO:
+        conn.execute(f"DROP INDEX IF EXISTS idx_{tabla}_funcionario_id")
+    conn.execute("DROP INDEX IF EXISTS idx_funcionarios_estado")
+    conn.execute("DROP INDEX IF EXISTS idx_funcionarios_fecha_registro")
@@ -0,0 +1,23 @@
+"""Índices compuestos para el listado paginado de funcionarios"""
+
+DESCRIPCION = 'Índices compuestos para el listado paginado de funcionarios'
+
+INDICES = {
+    'idx_funcionarios_estado_fecha': 'funcionarios(estado, fecha_registro)',
+    'idx_funcionarios_unidad_fecha': 'funcionarios(unidad_organizacional, fecha_registro)',
+    'idx_funcionarios_cargo_fecha': 'funcionarios(cargo, fecha_registro)',
+    'idx_funcionarios_primer_apellido': 'funcionarios(primer_apellido)',
+}
+
+
+def aplicar(conn):
+    # (estado, fecha_registro) reemplaza al índice simple por estado
+    conn.execute("DROP INDEX IF EXISTS idx_funcionarios_estado")
+    for nombre, definicion in INDICES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}")
+
+
+def revertir(conn):
+    for nombre in INDICES:
+        conn.execute(f"DROP INDEX IF EXISTS {nombre}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_funcionarios_estado ON funcionarios(estado)")
@@ -0,0 +1,11 @@
+"""Columna gestora en datos_adicionales"""
+
+DESCRIPCION = 'Columna gestora en datos_adicionales (campo del formulario de datos personales)'
+
+
+def aplicar(conn):
+    conn.execute("ALTER TABLE datos_adicionales ADD COLUMN gestora TEXT")
+
+
+def revertir(conn):
+    conn.execute("ALTER TABLE datos_adicionales DROP COLUMN gestora")
@@ -0,0 +1,18 @@
+"""Tabla de auditoría"""
+
+DESCRIPCION = 'Tabla de auditoría (eventos escritos en diferido por BufferEscritura)'
+
+
+def aplicar(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS auditoria (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario_id INTEGER,
+        accion TEXT NOT NULL,
+        detalle TEXT,
+        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_auditoria_usuario_fecha ON auditoria(usuario_id, fecha)")
+
+
+def revertir(conn):
+    conn.execute("DROP TABLE IF EXISTS auditoria")
@@ -0,0 +1,11 @@
+"""Versión de la ficha por funcionario"""
+
+DESCRIPCION = 'Versión de la ficha por funcionario (invalidación de la caché de fichas)'
+
+
+def aplicar(conn):
+    conn.execute("ALTER TABLE funcionarios ADD COLUMN version_ficha INTEGER NOT NULL DEFAULT 0")
+
+
+def revertir(conn):
+    conn.execute("ALTER TABLE funcionarios DROP COLUMN version_ficha")
@@ -0,0 +1,61 @@
+"""Conteos por estado materializados y mantenidos por triggers"""
+
+DESCRIPCION = 'Conteos por estado materializados y mantenidos por triggers'
+
+# Conteos 'total' (valor vacío) y desgloses por columna de funcionarios
+DIMENSIONES = ['total', 'unidad_organizacional', 'administracion']
+
+TRIGGERS = ['trg_estadisticas_insert', 'trg_estadisticas_delete', 'trg_estadisticas_update']
+
+
+def valor_estadistica(fila, dimension):
+    """Expresión SQL del valor de una dimensión para `fila` (tabla, NEW u OLD)"""
+    return "''" if dimension == 'total' else f"COALESCE({fila}.{dimension}, '')"
+
+
+def sql_cambio_estadisticas(fila, signo):
+    """Sentencias de trigger que suman (+) o restan (-) `fila` de los conteos"""
+    return '\n            '.join(
+        f"INSERT INTO estadisticas_estado (dimension, valor, estado, cantidad) "
+        f"VALUES ('{dimension}', {valor_estadistica(fila, dimension)}, COALESCE({fila}.estado, ''), {signo}1) "
+        f"ON CONFLICT(dimension, valor, estado) DO UPDATE SET cantidad = cantidad {signo} 1;"
+        for dimension in DIMENSIONES)
+
+
+def aplicar(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS estadisticas_estado (
+        dimension TEXT NOT NULL,
+        valor TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        cantidad INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, valor, estado)
+    ) WITHOUT ROWID""")
+    for dimension in DIMENSIONES:
+        conn.execute(f"""INSERT INTO estadisticas_estado (dimension, valor, estado, cantidad)
+            SELECT '{dimension}', {valor_estadistica('funcionarios', dimension)},
+                   COALESCE(estado, ''), COUNT(*)
+            FROM funcionarios GROUP BY 2, 3""")
+
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_estadisticas_insert AFTER INSERT ON funcionarios
+        BEGIN
+            {sql_cambio_estadisticas('NEW', '+')}
+        END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_estadisticas_delete AFTER DELETE ON funcionarios
+        BEGIN
+            {sql_cambio_estadisticas('OLD', '-')}
+        END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_estadisticas_update
+        AFTER UPDATE OF estado, unidad_organizacional, administracion ON funcionarios
+        WHEN OLD.estado IS NOT NEW.estado
+          OR OLD.unidad_organizacional IS NOT NEW.unidad_organizacional
+          OR OLD.administracion IS NOT NEW.administracion
+        BEGIN
+            {sql_cambio_estadisticas('OLD', '-')}
+            {sql_cambio_estadisticas('NEW', '+')}
+        END""")
+
+
+def revertir(conn):
+    for trigger in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS estadisticas_estado")
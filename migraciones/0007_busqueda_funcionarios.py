@@ -0,0 +1,82 @@
+"""Búsqueda de texto completo (FTS5) de funcionarios"""
+
+DESCRIPCION = 'Búsqueda de texto completo (FTS5) de funcionarios'
+
+# Columna del índice -> expresión sobre una fila de funcionarios
+# ({f} = funcionarios, NEW u OLD)
+COLUMNAS_BUSQUEDA = {
+    'nombres': "COALESCE({f}.primer_apellido, '') || ' ' || COALESCE({f}.segundo_apellido, '') || ' ' || "
+               "COALESCE({f}.tercer_apellido, '') || ' ' || COALESCE({f}.primer_nombre, '') || ' ' || "
+               "COALESCE({f}.segundo_nombre, '') || ' ' || COALESCE({f}.tercer_nombre, '')",
+    'ci': "{f}.ci",
+    'cargo': "COALESCE({f}.cargo, '') || ' ' || COALESCE({f}.puesto, '')",
+    'unidad': "{f}.unidad_organizacional",
+    'formacion': "(SELECT group_concat(COALESCE(carrera, '') || ' ' || COALESCE(nombre_institucion, '') || ' ' || "
+                 "COALESCE(institucion_academica, ''), ' ') FROM formacion_academica WHERE funcionario_id = {f}.id)",
+}
+
+# Columnas de funcionarios que alimentan el índice de búsqueda
+CAMPOS_BUSQUEDA = ['primer_apellido', 'segundo_apellido', 'tercer_apellido', 'primer_nombre',
+                   'segundo_nombre', 'tercer_nombre', 'ci', 'cargo', 'puesto', 'unidad_organizacional']
+
+TRIGGERS = ['trg_busqueda_insert', 'trg_busqueda_update', 'trg_busqueda_delete',
+            'trg_busqueda_formacion_insert', 'trg_busqueda_formacion_update', 'trg_busqueda_formacion_delete']
+
+
+def sql_insertar_busqueda(fila):
+    """INSERT del documento de búsqueda del funcionario `fila`"""
+    return (f"INSERT INTO busqueda_funcionarios (rowid, {', '.join(COLUMNAS_BUSQUEDA)}) "
+            f"SELECT {fila}.id, {', '.join(expr.format(f=fila) for expr in COLUMNAS_BUSQUEDA.values())}")
+
+
+def sql_formacion_busqueda(funcionario_id):
+    """UPDATE de la columna formacion del documento de un funcionario"""
+    return (f"UPDATE busqueda_funcionarios SET formacion = "
+            f"{COLUMNAS_BUSQUEDA['formacion'].format(f='funcionarios')} "
+            f"FROM funcionarios WHERE funcionarios.id = {funcionario_id} "
+            f"AND busqueda_funcionarios.rowid = {funcionario_id}")
+
+
+def aplicar(conn):
+    # unicode61 + remove_diacritics: "Pérez" y "perez" son el mismo término;
+    # los índices de prefijo aceleran la búsqueda mientras se escribe
+    conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_funcionarios USING fts5(
+        {', '.join(COLUMNAS_BUSQUEDA)},
+        tokenize = "unicode61 remove_diacritics 2",
+        prefix = '2 3'
+    )""")
+    conn.execute(sql_insertar_busqueda('funcionarios') + " FROM funcionarios")
+
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_busqueda_insert AFTER INSERT ON funcionarios
+        BEGIN
+            {sql_insertar_busqueda('NEW')};
+        END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_busqueda_update
+        AFTER UPDATE OF {', '.join(CAMPOS_BUSQUEDA)} ON funcionarios
+        BEGIN
+            DELETE FROM busqueda_funcionarios WHERE rowid = OLD.id;
+            {sql_insertar_busqueda('NEW')};
+        END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS trg_busqueda_delete AFTER DELETE ON funcionarios
+        BEGIN
+            DELETE FROM busqueda_funcionarios WHERE rowid = OLD.id;
+        END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_busqueda_formacion_insert AFTER INSERT ON formacion_academica
+        BEGIN
+            {sql_formacion_busqueda('NEW.funcionario_id')};
+        END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_busqueda_formacion_update AFTER UPDATE ON formacion_academica
+        BEGIN
+            {sql_formacion_busqueda('OLD.funcionario_id')};
+            {sql_formacion_busqueda('NEW.funcionario_id')};
+        END""")
+    conn.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_busqueda_formacion_delete AFTER DELETE ON formacion_academica
+        BEGIN
+            {sql_formacion_busqueda('OLD.funcionario_id')};
+        END""")
+
+
+def revertir(conn):
+    for trigger in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS busqueda_funcionarios")
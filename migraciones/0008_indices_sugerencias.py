@@ -0,0 +1,15 @@
+"""Índices de cobertura para sugerencias por prefijo de CI y de apellido"""
+
+DESCRIPCION = 'Índices de cobertura para sugerencias por prefijo de CI y de apellido'
+
+
+def aplicar(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_funcionarios_ci_sugerencias "
+                 "ON funcionarios(ci, primer_apellido, segundo_apellido, primer_nombre, cargo, estado)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_funcionarios_apellido_sugerencias "
+                 "ON funcionarios(primer_apellido COLLATE NOCASE, segundo_apellido, primer_nombre, ci, cargo, estado)")
+
+
+def revertir(conn):
+    conn.execute("DROP INDEX IF EXISTS idx_funcionarios_ci_sugerencias")
+    conn.execute("DROP INDEX IF EXISTS idx_funcionarios_apellido_sugerencias")
@@ -0,0 +1,17 @@
+"""Columnas de contenido en documentos (almacén direccionado por sha256)"""
+
+DESCRIPCION = 'Hash, tamaño y tipo de cada documento subido (almacén direccionado por contenido)'
+
+
+def aplicar(conn):
+    conn.execute("ALTER TABLE documentos ADD COLUMN sha256 TEXT")
+    conn.execute("ALTER TABLE documentos ADD COLUMN tamano INTEGER")
+    conn.execute("ALTER TABLE documentos ADD COLUMN tipo_mime TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_documentos_sha256 ON documentos(sha256)")
+
+
+def revertir(conn):
+    conn.execute("DROP INDEX IF EXISTS idx_documentos_sha256")
+    conn.execute("ALTER TABLE documentos DROP COLUMN tipo_mime")
+    conn.execute("ALTER TABLE documentos DROP COLUMN tamano")
+    conn.execute("ALTER TABLE documentos DROP COLUMN sha256")
@@ -0,0 +1,190 @@
+"""
+Migraciones de esquema versionadas con PRAGMA user_version.
+
+Cada migración es un archivo NNNN_descripcion.py de este paquete con:
+    DESCRIPCION  texto corto que se muestra al aplicarla
+    aplicar(conn)   cambios de esquema o de datos
+    revertir(conn)  (opcional) deshace aplicar; sin ella no se puede revertir
+
+user_version guarda el número de la última migración aplicada. La 0000 es
+el esquema base: se aplica solo cuando user_version es 0 y es idempotente
+(CREATE ... IF NOT EXISTS), así que también sirve para bases creadas antes
+de existir las migraciones. Nunca modificar una migración ya publicada;
+agregar una nueva con el siguiente número.
+
+Al arrancar basta con comparar user_version con la última migración; solo
+si hay pendientes se toma un bloqueo de archivo (varios workers que arrancan
+a la vez se esperan) y cada migración corre en su transacción BEGIN IMMEDIATE.
+"""
+import importlib
+import os
+import re
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_PATRON_ARCHIVO = re.compile(r'^(\d{4})_(\w+)\.py$')
+_migraciones = None
+
+
+class Migracion:
+    """Un archivo de migración numerado"""
+
+    def __init__(self, numero, nombre, modulo):
+        self.numero = numero
+        self.nombre = nombre
+        self.modulo = modulo
+        self.descripcion = getattr(modulo, 'DESCRIPCION', nombre)
+
+    @property
+    def reversible(self):
+        return hasattr(self.modulo, 'revertir')
+
+    def aplicar(self, conn):
+        self.modulo.aplicar(conn)
+
+    def revertir(self, conn):
+        self.modulo.revertir(conn)
+
+
+def cargar_migraciones():
+    """Migraciones del paquete ordenadas por número (se leen una sola vez)"""
+    global _migraciones
+    if _migraciones is None:
+        encontradas = []
+        for archivo in os.listdir(os.path.dirname(__file__)):
+            coincidencia = _PATRON_ARCHIVO.match(archivo)
+            if coincidencia:
+                modulo = importlib.import_module(f"{__name__}.{archivo[:-3]}")
+                encontradas.append(Migracion(int(coincidencia.group(1)), coincidencia.group(2), modulo))
+        encontradas.sort(key=lambda migracion: migracion.numero)
+        numeros = [migracion.numero for migracion in encontradas]
+        if numeros != list(range(len(numeros))):
+            raise RuntimeError(f"Numeración de migraciones no consecutiva: {numeros}")
+        _migraciones = encontradas
+    return _migraciones
+
+
+def ultima_version():
+    """Número de la última migración disponible"""
+    return cargar_migraciones()[-1].numero
+
+
+def version_actual(conn):
+    """Versión de esquema registrada en PRAGMA user_version"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _tiene_esquema_base(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usuarios'").fetchone() is not None
+
+
+@contextmanager
+def bloqueo_archivo(db_path):
+    """Bloqueo exclusivo entre procesos sobre <db_path>.migraciones.lock"""
+    if not db_path or db_path == ':memory:':
+        yield
+        return
+    with open(f"{db_path}.migraciones.lock", 'a+b') as archivo:
+        if fcntl:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+        else:
+            archivo.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK se rinde tras ~10 s
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+            else:
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _en_transaccion(conn, cambio, comprobar):
+    """Ejecutar cambio(conn) en BEGIN IMMEDIATE si comprobar(conn) sigue siendo cierto"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not comprobar(conn):
+            conn.rollback()  # Otro proceso ya hizo el cambio
+            return False
+        cambio(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+
+def pendientes(conn):
+    """Migraciones que faltan aplicar"""
+    version = version_actual(conn)
+    return [migracion for migracion in cargar_migraciones()
+            if migracion.numero > version or (migracion.numero == 0 and version == 0)]
+
+
+def migrar(conn, db_path=None, hasta=None, mostrar=print):
+    """Aplicar en orden las migraciones pendientes; devuelve las aplicadas"""
+    aplicadas = []
+    with bloqueo_archivo(db_path):
+        for migracion in pendientes(conn):
+            if hasta is not None and migracion.numero > hasta:
+                break
+
+            def cambio(conn, migracion=migracion):
+                migracion.aplicar(conn)
+                conn.execute(f"PRAGMA user_version = {migracion.numero}")
+
+            def comprobar(conn, numero=migracion.numero):
+                version = version_actual(conn)
+                return version < numero or version == numero == 0
+
+            if _en_transaccion(conn, cambio, comprobar):
+                aplicadas.append(migracion)
+                if mostrar:
+                    mostrar(f"✅ Migración {migracion.numero:04d} aplicada: {migracion.descripcion}")
+    return aplicadas
+
+
+def revertir(conn, hasta, db_path=None, mostrar=print):
+    """Revertir las migraciones posteriores a `hasta`, de la última a la primera"""
+    if hasta < 0:
+        raise ValueError("El esquema base (0000) no se puede revertir")
+    version = version_actual(conn)
+    a_revertir = [migracion for migracion in reversed(cargar_migraciones())
+                  if hasta < migracion.numero <= version]
+    irreversibles = [migracion.numero for migracion in a_revertir if not migracion.reversible]
+    if irreversibles:
+        raise ValueError(f"Migraciones sin revertir(): {irreversibles}")
+
+    revertidas = []
+    with bloqueo_archivo(db_path):
+        for migracion in a_revertir:
+            def cambio(conn, migracion=migracion):
+                migracion.revertir(conn)
+                conn.execute(f"PRAGMA user_version = {migracion.numero - 1}")
+
+            if _en_transaccion(conn, cambio, lambda conn, numero=migracion.numero: version_actual(conn) == numero):
+                revertidas.append(migracion)
+                if mostrar:
+                    mostrar(f"↩️ Migración {migracion.numero:04d} revertida: {migracion.descripcion}")
+    return revertidas
+
+
+def estado(conn):
+    """Lista de (migración, aplicada) para mostrar el estado del esquema"""
+    version = version_actual(conn)
+    base = version > 0 or _tiene_esquema_base(conn)
+    return [(migracion, base if migracion.numero == 0 else migracion.numero <= version)
+            for migracion in cargar_migraciones()]
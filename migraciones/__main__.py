@@ -0,0 +1,53 @@
+"""
+Aplicar, inspeccionar y revertir migraciones de esquema.
+
+Uso:
+    python -m migraciones estado
+    python -m migraciones aplicar [--hasta N]
+    python -m migraciones revertir N
+"""
+import argparse
+import sqlite3
+import sys
+
+from migraciones import estado, migrar, revertir, version_actual
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m migraciones', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='instance/talento.db', help='Ruta de la base de datos')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    comandos.add_parser('estado', help='Versión actual y migraciones aplicadas o pendientes')
+    aplicar = comandos.add_parser('aplicar', help='Aplicar las migraciones pendientes')
+    aplicar.add_argument('--hasta', type=int, help='Detenerse en esta versión')
+    revertir_ = comandos.add_parser('revertir', help='Revertir hasta dejar el esquema en la versión N')
+    revertir_.add_argument('version', type=int)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    try:
+        if args.comando == 'estado':
+            print(f"📦 {args.db}: versión de esquema {version_actual(conn)}")
+            for migracion, aplicada in estado(conn):
+                marca = '✅' if aplicada else '⏳'
+                reversible = '' if migracion.reversible or migracion.numero == 0 else ' (irreversible)'
+                print(f"  {marca} {migracion.numero:04d} {migracion.descripcion}{reversible}")
+        elif args.comando == 'aplicar':
+            if not migrar(conn, args.db, hasta=args.hasta):
+                print(f"✅ Esquema al día (versión {version_actual(conn)})")
+        else:
+            try:
+                revertidas = revertir(conn, args.version, args.db)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+            if not revertidas:
+                print(f"✅ Nada que revertir (versión {version_actual(conn)})")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,41 +1,28 @@
 #!/usr/bin/env python3
-import sqlite3
-import hashlib
+import sys
 
-def reset_admin_password():
+from database import Database
+
+
+def reset_admin_password(db_path='instance/talento.db'):
     """Resetear contraseña del admin a 'admin123'"""
-    
-    # Conectar a la base de datos
-    conn = sqlite3.connect('instance/talento.db')
-    cursor = conn.cursor()
-    
-    # Calcular hash
-    salt = "talento_humano_2025"
     password = "admin123"
-    password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    
-    # Actualizar contraseña
-    cursor.execute('''
-    UPDATE usuarios 
-    SET password_hash = ?
-    WHERE username = 'admin'
-    ''', (password_hash,))
-    
-    if cursor.rowcount > 0:
-        print(f"✅ Contraseña de admin actualizada a: {password}")
-        print(f"🔑 Hash generado: {password_hash}")
-    else:
-        print("❌ No se encontró usuario admin")
-        # Crearlo si no existe
-        cursor.execute('''
-        INSERT INTO usuarios (ci, username, email, password_hash, rol, activo)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', ('0000000', 'admin', 'admin@gobierno.talento.bo', 
-              password_hash, 'admin', 1))
-        print("✅ Usuario admin creado")
-    
-    conn.commit()
-    conn.close()
+    db = Database(db_path, intervalo_escritura=0, intervalo_checkpoint=0)
+    try:
+        password_hash = db.hash_password(password)
+        with db.conexion() as conn:
+            actualizado = conn.execute("UPDATE usuarios SET password_hash = ?, activo = 1 WHERE username = 'admin'",
+                                       (password_hash,)).rowcount
+        if actualizado:
+            print(f"✅ Contraseña de admin actualizada a: {password}")
+        else:
+            print("❌ No se encontró usuario admin")
+            # Crearlo si no existe
+            db.crear_usuario('0000000', 'admin', 'admin@gobierno.talento.bo', password_hash, rol='admin')
+            print("✅ Usuario admin creado")
+    finally:
+        db.cerrar()
+
 
 if __name__ == '__main__':
-    reset_admin_password()
\ No newline at end of file
+    reset_admin_password(*sys.argv[1:2])
@@ -33,4 +33,94 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     });
-});
\ No newline at end of file
+    
+    // Autocompletado de funcionarios (CI o apellido) en campos con data-sugerencias
+    document.querySelectorAll('input[data-sugerencias]').forEach(inicializarSugerencias);
+});
+
+// Sugerencias de funcionarios mientras se escribe.
+// data-sugerencias="valor": completa el campo con el funcionario elegido
+// data-sugerencias="ir": abre la ficha del funcionario elegido
+function inicializarSugerencias(campo) {
+    const modo = campo.dataset.sugerencias;
+    const url = campo.dataset.sugerenciasUrl || '/api/funcionarios/sugerencias';
+    const lista = document.createElement('div');
+    lista.className = 'list-group position-absolute w-100 shadow-sm d-none';
+    lista.style.zIndex = 1050;
+    campo.parentNode.classList.add('position-relative');
+    campo.parentNode.appendChild(lista);
+    campo.setAttribute('autocomplete', 'off');
+
+    const cache = new Map();  // texto -> resultados (evita repetir consultas)
+    let temporizador = null;
+    let ultimaConsulta = '';
+
+    const ocultar = () => lista.classList.add('d-none');
+
+    const elegir = (funcionario) => {
+        if (modo === 'ir') {
+            window.location.href = funcionario.url;
+            return;
+        }
+        campo.value = `${funcionario.nombre} (${funcionario.ci})`;
+        ocultar();
+    };
+
+    const mostrar = (resultados) => {
+        lista.innerHTML = '';
+        resultados.forEach(funcionario => {
+            const opcion = document.createElement('button');
+            opcion.type = 'button';
+            opcion.className = 'list-group-item list-group-item-action py-1';
+            const detalle = document.createElement('small');
+            detalle.className = 'text-muted ms-2';
+            detalle.textContent = `CI ${funcionario.ci}${funcionario.cargo ? ' · ' + funcionario.cargo : ''}`;
+            opcion.textContent = funcionario.nombre;
+            opcion.appendChild(detalle);
+            // mousedown se dispara antes del blur del campo
+            opcion.addEventListener('mousedown', e => {
+                e.preventDefault();
+                elegir(funcionario);
+            });
+            lista.appendChild(opcion);
+        });
+        lista.classList.toggle('d-none', resultados.length === 0);
+    };
+
+    const consultar = (texto) => {
+        if (cache.has(texto)) {
+            mostrar(cache.get(texto));
+            return;
+        }
+        ultimaConsulta = texto;
+        fetch(`${url}?q=${encodeURIComponent(texto)}`, {credentials: 'same-origin'})
+            .then(respuesta => respuesta.ok ? respuesta.json() : {resultados: []})
+            .then(datos => {
+                cache.set(texto, datos.resultados);
+                // Ignorar respuestas de consultas ya superadas
+                if (texto === ultimaConsulta) {
+                    mostrar(datos.resultados);
+                }
+            })
+            .catch(ocultar);
+    };
+
+    campo.addEventListener('input', function() {
+        clearTimeout(temporizador);
+        const texto = this.value.trim();
+        if (texto.length < 2) {
+            ocultar();
+            return;
+        }
+        temporizador = setTimeout(() => consultar(texto), 150);
+    });
+    campo.addEventListener('keydown', e => {
+        if (e.key === 'Escape') {
+            ocultar();
+        } else if (e.key === 'Enter' && modo === 'ir' && lista.firstChild && !lista.classList.contains('d-none')) {
+            e.preventDefault();
+            lista.firstChild.dispatchEvent(new MouseEvent('mousedown'));
+        }
+    });
+    campo.addEventListener('blur', ocultar);
+}
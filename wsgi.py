@@ -0,0 +1,8 @@
+"""
+Punto de entrada WSGI para producción.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import crear_app
+
+app = crear_app()